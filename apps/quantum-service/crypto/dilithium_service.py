@@ -12,17 +12,48 @@ This implementation provides a wrapper around the cryptography library's
 Dilithium implementation (when available) or falls back to a compatible
 classical signature scheme for demonstration.
 
+The backend is resolved once at construction, and parsed key objects are
+kept in a KeyCache, so signing and verifying with a hot key costs little
+more than the primitive itself. sign_many / verify_many group a batch by
+key and fan the groups out over a thread pool; the native primitives
+release the GIL, so batches scale with cores.
+
+Keys can also be registered once in the service's KeyStore and referenced
+by an opaque key id, so private keys stop travelling with every request.
+New key pairs are served from a KeypairPool filled in the background.
+
+For high volumes, sign_merkle_batch signs only the Merkle root of a batch
+and returns an inclusion proof per message (see crypto/merkle.py).
+
+Successful verifications are remembered for a TTL in a VerificationCache,
+so re-verifying the same triple further down the pipeline is a hash lookup.
+verify_eip712 also checks the payment nonce against a ReplayIndex without
+recording it, so every hop can re-verify; settle_eip712, called by the hop
+that actually executes the payment, consumes the nonce, so a replayed
+payment request is rejected in-process.
+
 References:
     - Ducas et al. (2018), "CRYSTALS-Dilithium: A Lattice-Based Digital Signature Scheme"
     - NIST Post-Quantum Cryptography Standardization
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
-import json
-from typing import Dict, Any, Tuple
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 import logging
 import secrets
 
+from crypto.key_cache import KeyCache
+from crypto.key_store import KeyStore
+from crypto.replay_index import ACCEPTED, EXPIRED, REPLAYED, ReplayIndex
+from crypto.verification_cache import VerificationCache
+from crypto.keypair_pool import KeypairPool
+from crypto import eip712, merkle
+
 # Try to import post-quantum crypto library
 try:
     from cryptography.hazmat.primitives.asymmetric import ed25519
@@ -33,6 +64,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Items per thread-pool task in sign_many / verify_many
+BATCH_TASK_SIZE = 64
+
 
 class DilithiumService:
     """
@@ -45,9 +79,26 @@ class DilithiumService:
     Attributes:
         algorithm: The signature algorithm being used
         security_level: Dilithium security level (2, 3, or 5)
+        key_cache: Parsed keys of recently used private and public keys
+        key_store: Registered keys, referenced by key id
+        keypair_pool: Pre-generated key pairs served by generate_keypair
+        verification_cache: Recently verified (message, signature, key) triples
+        replay_index: Nonces of accepted EIP-712 payment requests
     """
     
-    def __init__(self, security_level: int = 3):
+    def __init__(
+        self,
+        security_level: int = 3,
+        key_cache_size: int = 1024,
+        batch_workers: Optional[int] = None,
+        key_store_path: Optional[str] = None,
+        key_store_passphrase: Optional[str] = None,
+        keypair_pool_depth: int = 32,
+        background_refill: bool = True,
+        verification_cache_size: int = 65536,
+        verification_cache_ttl: float = 300.0,
+        replay_snapshot_path: Optional[str] = None,
+    ):
         """
         Initialize the Dilithium service.
         
@@ -56,17 +107,49 @@ class DilithiumService:
                 - 2: NIST Level 2 (roughly equivalent to AES-128)
                 - 3: NIST Level 3 (roughly equivalent to AES-192)
                 - 5: NIST Level 5 (roughly equivalent to AES-256)
+            key_cache_size: Number of parsed keys to keep (0 disables the cache)
+            batch_workers: Threads used by sign_many / verify_many (default: CPU count)
+            key_store_path: Encrypted file persisting registered keys (memory only if None)
+            key_store_passphrase: Passphrase for key_store_path
+            keypair_pool_depth: Key pairs kept ready (0 generates on every call)
+            background_refill: Keep the key pair pool topped up from a worker thread
+            verification_cache_size: Valid triples remembered (0 disables the cache)
+            verification_cache_ttl: Seconds a positive verification is trusted
+            replay_snapshot_path: Append-only file restoring used nonces after a restart
         """
         self.security_level = security_level
+        self._dilithium = self._load_dilithium()
         self.algorithm = "CRYSTALS-Dilithium" if self._check_dilithium_available() else "Ed25519-PQ-Fallback"
+        self.key_cache = KeyCache(key_cache_size)
+        self.batch_workers = batch_workers or os.cpu_count() or 4
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.key_store = KeyStore(
+            lambda private_key_bytes: self._signer(private_key_bytes, cached=False),
+            path=key_store_path,
+            passphrase=key_store_passphrase,
+        )
         
-    def _check_dilithium_available(self) -> bool:
-        """Check if native Dilithium implementation is available."""
+        # The pool's worker must not keep the service alive
+        new_keypair = weakref.WeakMethod(self._new_keypair)
+        self.keypair_pool = KeypairPool(lambda: new_keypair()(), depth=keypair_pool_depth)
+        if keypair_pool_depth > 0 and background_refill:
+            self.keypair_pool.start()
+        self.verification_cache = VerificationCache(verification_cache_size, verification_cache_ttl)
+        self.replay_index = ReplayIndex(snapshot_path=replay_snapshot_path)
+        
+    @staticmethod
+    def _load_dilithium():
+        """Import the native Dilithium module, or None if it is unavailable."""
         try:
-            import pqcrypto
-            return hasattr(pqcrypto, 'sign')
+            import pqcrypto.sign.dilithium3 as dilithium
+            return dilithium
         except ImportError:
-            return False
+            return None
+    
+    def _check_dilithium_available(self) -> bool:
+        """Check if native Dilithium implementation is available."""
+        return self._dilithium is not None
     
     def generate_keypair(self) -> Dict[str, str]:
         """
@@ -78,6 +161,12 @@ class DilithiumService:
             - private_key_hex: Hex-encoded private key
             - algorithm: Signature algorithm used
         """
+        if self.keypair_pool.depth > 0:
+            return self.keypair_pool.take()
+        return self._new_keypair()
+    
+    def _new_keypair(self) -> Dict[str, str]:
+        """Generate a key pair now, bypassing the pool."""
         if self._check_dilithium_available():
             return self._generate_dilithium_keypair()
         else:
@@ -86,8 +175,7 @@ class DilithiumService:
     def _generate_dilithium_keypair(self) -> Dict[str, str]:
         """Generate actual Dilithium keys."""
         try:
-            import pqcrypto.sign.dilithium3 as dilithium
-            public_key, private_key = dilithium.generate_keypair()
+            public_key, private_key = self._dilithium.generate_keypair()
             return {
                 "public_key_hex": public_key.hex(),
                 "private_key_hex": private_key.hex(),
@@ -130,39 +218,109 @@ class DilithiumService:
             "algorithm": "Ed25519-PQ-Fallback",
         }
     
-    def sign(self, message: str, private_key_hex: str) -> Dict[str, Any]:
+    def import_key(self, private_key_hex: str, public_key_hex: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Register a private key and return its key id.
+        
+        Args:
+            private_key_hex: Hex-encoded private key
+            public_key_hex: Matching public key (derived for Ed25519 keys if omitted)
+            
+        Returns:
+            key_id, public_key_hex, algorithm, key_size and created_at
+        """
+        private_key_bytes = bytes.fromhex(private_key_hex)
+        if public_key_hex is None:
+            public_key_hex = self._public_key_hex(private_key_bytes)
+        key_id = self.key_store.add(private_key_bytes, public_key_hex, self.algorithm)
+        return self.key_store.describe(key_id)
+    
+    def generate_key(self) -> Dict[str, Any]:
+        """Generate a key pair inside the key store; only the public half is returned."""
+        keypair = self.generate_keypair()
+        key_id = self.key_store.add(
+            bytes.fromhex(keypair["private_key_hex"]), keypair["public_key_hex"], keypair["algorithm"]
+        )
+        return self.key_store.describe(key_id)
+    
+    def list_keys(self) -> List[Dict[str, Any]]:
+        """Fingerprints and public metadata of every registered key (never the key ids)."""
+        return self.key_store.list()
+    
+    def delete_key(self, key_id: str) -> bool:
+        """Remove a registered key; False if the id is unknown."""
+        return self.key_store.delete(key_id)
+    
+    def _public_key_hex(self, private_key_bytes: bytes) -> Optional[str]:
+        """Public key for a fallback private key (None for Dilithium, which cannot derive it)."""
+        if self._check_dilithium_available():
+            return None
+        if not CRYPTO_AVAILABLE:
+            return hashlib.sha256(private_key_bytes).hexdigest()
+        return _parse_ed25519_private(private_key_bytes).public_key().public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw,
+        ).hex()
+    
+    def sign(
+        self,
+        message: str,
+        private_key_hex: Optional[str] = None,
+        key_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         Sign a message using the private key.
         
         Args:
             message: The message to sign
             private_key_hex: Hex-encoded private key
+            key_id: Id of a registered key, used instead of private_key_hex
             
         Returns:
             Dictionary containing:
             - signature_hex: Hex-encoded signature
             - algorithm: Signature algorithm used
             - key_size: Key size in bytes
+            
+        Raises:
+            ValueError: If neither key is given or the key id is unknown
         """
-        message_bytes = message.encode('utf-8')
-        private_key_bytes = bytes.fromhex(private_key_hex)
-        
-        if self._check_dilithium_available():
-            signature = self._sign_dilithium(message_bytes, private_key_bytes)
-        else:
-            signature = self._sign_ed25519(message_bytes, private_key_bytes)
+        signer, key_size = self._resolve_signer(private_key_hex, key_id)
+        signature = signer(message.encode('utf-8'))
         
         return {
             "signature_hex": signature.hex(),
             "algorithm": self.algorithm,
-            "key_size": len(private_key_bytes),
+            "key_size": key_size,
         }
     
+    def _resolve_signer(
+        self,
+        private_key_hex: Optional[str],
+        key_id: Optional[str],
+    ) -> Tuple[Callable[[bytes], bytes], int]:
+        """Signer and key size for a registered key id or a hex-encoded key."""
+        if key_id is not None:
+            return self.key_store.handle(key_id), self.key_store.key_size(key_id)
+        if private_key_hex is None:
+            raise ValueError("Either private_key_hex or key_id is required")
+        private_key_bytes = bytes.fromhex(private_key_hex)
+        return self._signer(private_key_bytes), len(private_key_bytes)
+    
+    def _signer(self, private_key_bytes: bytes, cached: bool = True) -> Callable[[bytes], bytes]:
+        """Resolve the backend and key once; the result signs message bytes."""
+        if self._check_dilithium_available():
+            return lambda message: self._sign_dilithium(message, private_key_bytes)
+        if not CRYPTO_AVAILABLE:
+            return lambda message: self._sign_ed25519(message, private_key_bytes)
+        if not cached:
+            return _parse_ed25519_private(private_key_bytes).sign
+        return self.key_cache.get("ed25519-private", private_key_bytes, _parse_ed25519_private).sign
+    
     def _sign_dilithium(self, message: bytes, private_key: bytes) -> bytes:
         """Sign with Dilithium."""
         try:
-            import pqcrypto.sign.dilithium3 as dilithium
-            return dilithium.sign(message, private_key)
+            return self._dilithium.sign(message, private_key)
         except Exception:
             return self._sign_ed25519(message, private_key)
     
@@ -173,11 +331,7 @@ class DilithiumService:
             signature = hashlib.sha512(private_key_bytes + message).digest()
             return signature
         
-        # Ensure key is correct length
-        if len(private_key_bytes) != 32:
-            private_key_bytes = hashlib.sha256(private_key_bytes).digest()
-        
-        private_key = ed25519.Ed25519PrivateKey.from_private_bytes(private_key_bytes)
+        private_key = self.key_cache.get("ed25519-private", private_key_bytes, _parse_ed25519_private)
         return private_key.sign(message)
     
     def verify(self, message: str, signature_hex: str, public_key_hex: str) -> bool:
@@ -196,21 +350,236 @@ class DilithiumService:
             message_bytes = message.encode('utf-8')
             signature_bytes = bytes.fromhex(signature_hex)
             public_key_bytes = bytes.fromhex(public_key_hex)
-            
-            if self._check_dilithium_available():
-                return self._verify_dilithium(message_bytes, signature_bytes, public_key_bytes)
-            else:
-                return self._verify_ed25519(message_bytes, signature_bytes, public_key_bytes)
-                
+            return self.verification_cache.verify(
+                VerificationCache.key(message_bytes, signature_bytes, public_key_bytes),
+                lambda: self._verifier(public_key_bytes)(message_bytes, signature_bytes),
+            )
         except Exception as e:
             logger.error(f"Signature verification failed: {e}")
             return False
     
+    def _verifier(self, public_key_bytes: bytes) -> Callable[[bytes, bytes], bool]:
+        """Resolve the backend and key once; the result checks (message, signature)."""
+        if self._check_dilithium_available():
+            return lambda message, signature: self._verify_dilithium(message, signature, public_key_bytes)
+        if not CRYPTO_AVAILABLE:
+            return lambda message, signature: self._verify_ed25519(message, signature, public_key_bytes)
+        
+        public_key = self.key_cache.get(
+            "ed25519-public", public_key_bytes, ed25519.Ed25519PublicKey.from_public_bytes
+        )
+        
+        def verify(message: bytes, signature: bytes) -> bool:
+            try:
+                public_key.verify(signature, message)
+                return True
+            except Exception:
+                return False
+        return verify
+    
+    def sign_many(self, items: Sequence[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Sign a batch of messages, possibly under different keys.
+        
+        Items are grouped by key so each key is decoded and resolved once per
+        group, and the groups are signed in parallel on the batch thread pool.
+        
+        Args:
+            items: Dicts with "message" and either "private_key_hex" or "key_id"
+            
+        Returns:
+            One result per item in input order, as returned by sign(), or
+            {"error": message} for an item that could not be signed
+        """
+        def sign_group(key: Tuple[str, str], messages: List[str]) -> List[Dict[str, Any]]:
+            try:
+                kind, value = key
+                signer, key_size = (
+                    self._resolve_signer(None, value) if kind == "key_id" else self._resolve_signer(value, None)
+                )
+            except Exception as e:
+                return [{"error": str(e)}] * len(messages)
+            
+            results = []
+            for message in messages:
+                try:
+                    results.append({
+                        "signature_hex": signer(message.encode('utf-8')).hex(),
+                        "algorithm": self.algorithm,
+                        "key_size": key_size,
+                    })
+                except Exception as e:
+                    results.append({"error": str(e)})
+            return results
+        
+        def key_of(item: Dict[str, str]) -> Tuple[str, Optional[str]]:
+            if item.get("key_id") is not None:
+                return ("key_id", item["key_id"])
+            return ("private_key_hex", item.get("private_key_hex"))
+        
+        return self._run_grouped(items, key_of, lambda item: item["message"], sign_group)
+    
+    def verify_many(self, items: Sequence[Dict[str, str]]) -> List[bool]:
+        """
+        Verify a batch of signatures, grouped by public key and run in parallel.
+        
+        Args:
+            items: Dicts with "message", "signature_hex" and "public_key_hex"
+            
+        Returns:
+            One validity flag per item in input order (False for malformed items)
+        """
+        def verify_group(public_key_hex: str, pairs: List[Tuple[str, str]]) -> List[bool]:
+            try:
+                public_key_bytes = bytes.fromhex(public_key_hex)
+                verifier = self._verifier(public_key_bytes)
+            except Exception as e:
+                logger.error(f"Signature verification failed: {e}")
+                return [False] * len(pairs)
+            
+            results = []
+            for message, signature_hex in pairs:
+                try:
+                    message_bytes = message.encode('utf-8')
+                    signature_bytes = bytes.fromhex(signature_hex)
+                    results.append(self.verification_cache.verify(
+                        VerificationCache.key(message_bytes, signature_bytes, public_key_bytes),
+                        lambda: verifier(message_bytes, signature_bytes),
+                    ))
+                except Exception as e:
+                    logger.error(f"Signature verification failed: {e}")
+                    results.append(False)
+            return results
+        
+        return self._run_grouped(
+            items,
+            lambda item: item["public_key_hex"],
+            lambda item: (item["message"], item["signature_hex"]),
+            verify_group,
+        )
+    
+    def sign_merkle_batch(
+        self,
+        messages: Sequence[str],
+        private_key_hex: Optional[str] = None,
+        key_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Sign a batch of messages with one signature over their Merkle root.
+        
+        Args:
+            messages: Messages (or EIP-712 hashes) to commit to
+            private_key_hex: Hex-encoded private key
+            key_id: Id of a registered key, used instead of private_key_hex
+            
+        Returns:
+            root_hex, root_signature_hex, algorithm, count and one
+            {"index", "proof"} per message in input order
+        """
+        tree = merkle.MerkleTree([m.encode('utf-8') for m in messages])
+        signed = self.sign(merkle.root_message(tree.root), private_key_hex, key_id=key_id)
+        
+        return {
+            "root_hex": tree.root.hex(),
+            "root_signature_hex": signed["signature_hex"],
+            "algorithm": signed["algorithm"],
+            "count": len(tree),
+            "proofs": [{"index": i, "proof": tree.proof(i)} for i in range(len(tree))],
+        }
+    
+    def verify_merkle(
+        self,
+        message: str,
+        proof: Sequence[Dict[str, str]],
+        root_hex: str,
+        root_signature_hex: str,
+        public_key_hex: str,
+    ) -> bool:
+        """
+        Verify a message signed as part of a Merkle batch.
+        
+        The inclusion proof is checked first (hashes only). The root
+        signature goes through verify(), so it is checked once per batch and
+        served from the verification cache for every other message.
+        
+        Returns:
+            True if the proof links the message to the root and the root
+            signature is valid
+        """
+        try:
+            root = bytes.fromhex(root_hex)
+        except ValueError:
+            return False
+        if not merkle.verify_proof(message.encode('utf-8'), proof, root):
+            return False
+        return self.verify(merkle.root_message(root), root_signature_hex, public_key_hex)
+    
+    def _run_grouped(
+        self,
+        items: Sequence[Dict[str, str]],
+        key_of: Callable[[Dict[str, str]], Any],
+        payload_of: Callable[[Dict[str, str]], Any],
+        run_group: Callable[[Any, List[Any]], List[Any]],
+    ) -> List[Any]:
+        """Group items by key, run the groups in BATCH_TASK_SIZE tasks and restore input order."""
+        groups: Dict[Any, List[int]] = {}
+        for i, item in enumerate(items):
+            groups.setdefault(key_of(item), []).append(i)
+        
+        tasks = [
+            (key, indices[start:start + BATCH_TASK_SIZE])
+            for key, indices in groups.items()
+            for start in range(0, len(indices), BATCH_TASK_SIZE)
+        ]
+        
+        def run(key: Any, indices: List[int]) -> List[Any]:
+            return run_group(key, [payload_of(items[i]) for i in indices])
+        
+        if len(tasks) <= 1:
+            outputs = [run(key, indices) for key, indices in tasks]
+        else:
+            executor = self._batch_executor()
+            outputs = [f.result() for f in [executor.submit(run, key, indices) for key, indices in tasks]]
+        
+        results: List[Any] = [None] * len(items)
+        for (_, indices), output in zip(tasks, outputs):
+            for i, result in zip(indices, output):
+                results[i] = result
+        return results
+    
+    def _batch_executor(self) -> ThreadPoolExecutor:
+        """Thread pool for batch calls, created on first use."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.batch_workers, thread_name_prefix="dilithium-batch"
+                )
+            return self._executor
+    
+    def verification_cache_stats(self) -> Dict[str, Any]:
+        """Verification cache hit rate and estimated time saved."""
+        return self.verification_cache.stats()
+    
+    def keypair_pool_stats(self) -> Dict[str, Any]:
+        """Key pair pool level, hit rate and generation latency."""
+        return self.keypair_pool.stats()
+    
+    def close(self):
+        """Stop the worker threads and drop cached, pooled and registered keys from memory."""
+        self.keypair_pool.stop()
+        self.keypair_pool.clear()
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        self.key_cache.clear()
+        self.key_store.clear()
+        self.replay_index.close()
+    
     def _verify_dilithium(self, message: bytes, signature: bytes, public_key: bytes) -> bool:
         """Verify Dilithium signature."""
         try:
-            import pqcrypto.sign.dilithium3 as dilithium
-            dilithium.verify(message, signature, public_key)
+            self._dilithium.verify(message, signature, public_key)
             return True
         except Exception:
             return False
@@ -222,13 +591,24 @@ class DilithiumService:
             return len(signature) == 64
         
         try:
-            public_key = ed25519.Ed25519PublicKey.from_public_bytes(public_key_bytes)
+            public_key = self.key_cache.get(
+                "ed25519-public", public_key_bytes, ed25519.Ed25519PublicKey.from_public_bytes
+            )
             public_key.verify(signature, message)
             return True
         except Exception:
             return False
     
-    def sign_eip712(self, typed_data: Dict[str, Any], private_key_hex: str) -> Dict[str, Any]:
+    def key_cache_stats(self) -> Dict[str, Any]:
+        """Parsed-key cache size and hit rate."""
+        return self.key_cache.stats()
+    
+    def sign_eip712(
+        self,
+        typed_data: Dict[str, Any],
+        private_key_hex: Optional[str] = None,
+        key_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         Sign EIP-712 typed data using post-quantum signature.
         
@@ -238,41 +618,119 @@ class DilithiumService:
         Args:
             typed_data: EIP-712 typed data object
             private_key_hex: Hex-encoded private key
+            key_id: Id of a registered key, used instead of private_key_hex
             
         Returns:
             Dictionary with signature and metadata
+            
+        Raises:
+            ValueError: If the typed data does not match its types
         """
-        # Calculate EIP-712 hash
-        domain_hash = self._hash_domain(typed_data.get("domain", {}))
-        struct_hash = self._hash_struct(typed_data.get("primaryType", ""), typed_data)
-        
-        # Combine with EIP-712 prefix
-        message = b"\x19\x01" + domain_hash + struct_hash
-        message_hash = hashlib.keccak_256(message).digest() if hasattr(hashlib, 'keccak_256') else hashlib.sha256(message).digest()
+        # keccak256(0x1901 || domainSeparator || hashStruct(message)); the
+        # type hashes and domain separator come from eip712's caches
+        hashes = eip712.hash_typed_data(typed_data)
+        message_hash = hashes["digest"]
         
         # Sign the hash
-        sign_result = self.sign(message_hash.hex(), private_key_hex)
+        sign_result = self.sign(message_hash.hex(), private_key_hex, key_id=key_id)
         
         return {
             "message_hash": message_hash.hex(),
+            "domain_separator": hashes["domain_separator"].hex(),
+            "struct_hash": hashes["struct_hash"].hex(),
             "signature": sign_result["signature_hex"],
             "algorithm": sign_result["algorithm"],
             "domain": typed_data.get("domain", {}),
             "eip712_version": "1.0",
         }
     
-    def _hash_domain(self, domain: Dict[str, Any]) -> bytes:
-        """Hash the EIP-712 domain separator."""
-        # Simplified domain hashing
-        domain_str = json.dumps(domain, sort_keys=True)
-        return hashlib.sha256(domain_str.encode()).digest()
-    
-    def _hash_struct(self, primary_type: str, typed_data: Dict[str, Any]) -> bytes:
-        """Hash the structured data."""
-        # Simplified struct hashing
+    def verify_eip712(
+        self,
+        typed_data: Dict[str, Any],
+        signature_hex: str,
+        public_key_hex: str,
+        consume_nonce: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Verify a signed EIP-712 payment request and reject replays.
+        
+        The signature is checked first. If the message carries a nonce and
+        deadline, the nonce is then checked against the replay index: a nonce
+        already settled with the same domain and signer, or a deadline in the
+        past, makes the request invalid. The nonce is only recorded when
+        consume_nonce is set (see settle_eip712), so any number of pipeline
+        hops can verify the same payment.
+        
+        Args:
+            typed_data: EIP-712 typed data object that was signed
+            signature_hex: Signature returned by sign_eip712
+            public_key_hex: Signer's public key
+            consume_nonce: Record the nonce as used (default only checks it)
+            
+        Returns:
+            valid, signature_valid, replay_status ("accepted", "replayed",
+            "expired", "unchecked" or "no_nonce") and message_hash
+            
+        Raises:
+            ValueError: If the typed data does not match its types
+        """
+        hashes = eip712.hash_typed_data(typed_data)
+        message_hash = hashes["digest"].hex()
+        signature_valid = self.verify(message_hash, signature_hex, public_key_hex)
+        
         message = typed_data.get("message", {})
-        message_str = primary_type + json.dumps(message, sort_keys=True)
-        return hashlib.sha256(message_str.encode()).digest()
+        if not signature_valid:
+            replay_status = "unchecked"
+        elif "nonce" not in message or "deadline" not in message:
+            replay_status = "no_nonce"
+        else:
+            # Canonical bytes, so another spelling of the same key or nonce
+            # cannot open a fresh scope
+            scope = hashes["domain_separator"].hex() + bytes.fromhex(public_key_hex).hex()
+            nonce = eip712.encode_message_field(typed_data, "nonce").hex()
+            deadline = int.from_bytes(eip712.encode_message_field(typed_data, "deadline"), "big")
+            if consume_nonce:
+                replay_status = self.replay_index.claim(scope, nonce, deadline)
+            elif deadline <= time.time():
+                replay_status = EXPIRED
+            else:
+                replay_status = REPLAYED if self.replay_index.seen(scope, nonce) else ACCEPTED
+        
+        return {
+            "valid": signature_valid and replay_status in (ACCEPTED, "no_nonce"),
+            "signature_valid": signature_valid,
+            "replay_status": replay_status,
+            "message_hash": message_hash,
+        }
+    
+    def settle_eip712(self, typed_data: Dict[str, Any], signature_hex: str, public_key_hex: str) -> Dict[str, Any]:
+        """
+        Verify a payment request and consume its nonce, exactly once.
+        
+        Meant for the hop that executes the payment; a second settle of the
+        same nonce returns replay_status "replayed" and valid False.
+        """
+        return self.verify_eip712(typed_data, signature_hex, public_key_hex, consume_nonce=True)
+    
+    def replay_index_stats(self) -> Dict[str, Any]:
+        """Used-nonce index size, Bloom filter load and rejection counters."""
+        return self.replay_index.stats()
+    
+    def hash_eip712(self, typed_data: Dict[str, Any]) -> Dict[str, str]:
+        """EIP-712 domain separator, struct hash and signing digest, hex-encoded."""
+        hashes = eip712.hash_typed_data(typed_data)
+        return {
+            "message_hash": hashes["digest"].hex(),
+            "domain_separator": hashes["domain_separator"].hex(),
+            "struct_hash": hashes["struct_hash"].hex(),
+        }
+
+
+def _parse_ed25519_private(private_key_bytes: bytes):
+    """Build an Ed25519 key, deriving a 32-byte seed from keys of other lengths."""
+    if len(private_key_bytes) != 32:
+        private_key_bytes = hashlib.sha256(private_key_bytes).digest()
+    return ed25519.Ed25519PrivateKey.from_private_bytes(private_key_bytes)
 
 
 class EIP712TypedData:
@@ -298,7 +756,7 @@ class EIP712TypedData:
             currency: Token address or symbol
             recipient: Recipient address
             description: Payment description
-            nonce: Unique nonce for replay protection
+            nonce: Unique nonce for replay protection (0x-prefixed 32-byte hex)
             deadline: Unix timestamp for expiration
             chain_id: Blockchain chain ID
             
@@ -0,0 +1,337 @@
+"""
+EIP-712 Typed Structured Data Hashing
+
+Implements encodeType / typeHash / encodeData / hashStruct and the final
+digest keccak256(0x1901 || domainSeparator || hashStruct(message)) exactly
+as specified, so digests match on-chain verifiers (ecrecover-based
+contracts, OpenZeppelin's EIP712, eth_signTypedData_v4).
+
+Everything that depends only on the schema is computed once: encodeType,
+the type hash and the field layout of every struct are compiled per `types`
+schema, and the domain separator is memoized per (schema, domain). Hashing
+a payment struct then costs a keccak per dynamic field plus one for the
+struct and one for the digest.
+
+Keccak-256 (the original Keccak padding, not FIPS 202 SHA3-256, which
+hashlib provides) comes from pycryptodome when installed. Otherwise a
+pure-Python Keccak-f[1600] permutation is used: correct, but at roughly
+0.5 ms per hash it is only meant for development environments.
+
+References:
+    - EIP-712 (2017), "Typed structured data hashing and signing"
+    - Bertoni et al. (2011), "The Keccak reference", version 3.0
+"""
+
+from functools import lru_cache
+import re
+from typing import Any, Dict, List, Tuple
+
+try:
+    from Crypto.Hash import keccak as _pycryptodome_keccak
+    KECCAK_BACKEND = "pycryptodome"
+except ImportError:
+    _pycryptodome_keccak = None
+    KECCAK_BACKEND = "python"
+
+# Schemas and domains memoized per process
+SCHEMA_CACHE_SIZE = 256
+DOMAIN_CACHE_SIZE = 1024
+
+_ARRAY_TYPE = re.compile(r"^(.*)\[(\d*)\]$")
+_INT_TYPE = re.compile(r"^(u?)int(\d*)$")
+_BYTES_TYPE = re.compile(r"^bytes(\d+)$")
+
+
+# === Keccak-256 ===
+
+_MASK = (1 << 64) - 1
+
+
+def _keccak_tables() -> Tuple[List[int], List[Tuple[int, int, int]]]:
+    """Round constants and the combined rho/pi (source lane, target lane, rotation) steps."""
+    round_constants, lfsr = [], 1
+    for _ in range(24):
+        rc = 0
+        for j in range(7):
+            lfsr = ((lfsr << 1) ^ ((lfsr >> 7) * 0x71)) & 0xFF
+            if lfsr & 2:
+                rc ^= 1 << ((1 << j) - 1)
+        round_constants.append(rc)
+
+    # Lane (x, y) moves to (y, 2x + 3y); following that cycle from (1, 0)
+    # visits every lane but (0, 0), which is not rotated
+    rho_pi = [(0, 0, 0)]
+    x, y = 1, 0
+    for t in range(24):
+        source = x + 5 * y
+        x, y = y, (2 * x + 3 * y) % 5
+        rho_pi.append((source, x + 5 * y, ((t + 1) * (t + 2) // 2) % 64))
+    return round_constants, rho_pi
+
+
+_ROUND_CONSTANTS, _RHO_PI = _keccak_tables()
+# chi: b[x, y] ^ (~b[x + 1, y] & b[x + 2, y])
+_CHI1 = [(i + 1) % 5 + 5 * (i // 5) for i in range(25)]
+_CHI2 = [(i + 2) % 5 + 5 * (i // 5) for i in range(25)]
+
+
+def _keccak_f1600(lanes: List[int]) -> List[int]:
+    """The Keccak-f[1600] permutation on 25 64-bit lanes (index x + 5y)."""
+    a = lanes
+    for rc in _ROUND_CONSTANTS:
+        # theta
+        c = [a[x] ^ a[x + 5] ^ a[x + 10] ^ a[x + 15] ^ a[x + 20] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ (((c[(x + 1) % 5] << 1) | (c[(x + 1) % 5] >> 63)) & _MASK) for x in range(5)]
+        a = [a[i] ^ d[i % 5] for i in range(25)]
+        # rho and pi
+        b = [0] * 25
+        for source, target, rotation in _RHO_PI:
+            lane = a[source]
+            b[target] = ((lane << rotation) | (lane >> (64 - rotation))) & _MASK if rotation else lane
+        # chi and iota
+        a = [b[i] ^ (~b[_CHI1[i]] & b[_CHI2[i]]) for i in range(25)]
+        a[0] ^= rc
+    return a
+
+
+def _keccak_256_python(data: bytes, pad: int = 0x01) -> bytes:
+    """Keccak-256 sponge (rate 136 bytes); pad=0x06 gives FIPS 202 SHA3-256 instead."""
+    rate = 136
+    padded = bytearray(data)
+    padded.append(pad)
+    padded.extend(bytes(-len(padded) % rate))
+    padded[-1] |= 0x80
+
+    lanes = [0] * 25
+    for offset in range(0, len(padded), rate):
+        block = padded[offset:offset + rate]
+        for i in range(rate // 8):
+            lanes[i] ^= int.from_bytes(block[8 * i:8 * i + 8], "little")
+        lanes = _keccak_f1600(lanes)
+    return b"".join(lane.to_bytes(8, "little") for lane in lanes[:4])
+
+
+def keccak_256(data: bytes) -> bytes:
+    """Keccak-256 digest (the Ethereum hash)."""
+    if _pycryptodome_keccak is not None:
+        return _pycryptodome_keccak.new(digest_bits=256, data=data).digest()
+    return _keccak_256_python(data)
+
+
+# === Type encoding ===
+
+class EIP712Schema:
+    """
+    A `types` schema compiled once: encodeType, type hash and field layout
+    of every struct.
+    """
+
+    def __init__(self, types: Dict[str, List[Dict[str, str]]]):
+        self.types = types
+        self.encoded_types: Dict[str, str] = {}
+        self.type_hashes: Dict[str, bytes] = {}
+        for name in types:
+            self.encoded_types[name] = self._encode_type(name)
+            self.type_hashes[name] = keccak_256(self.encoded_types[name].encode("utf-8"))
+
+    def _dependencies(self, name: str, found: set) -> set:
+        if name in found or name not in self.types:
+            return found
+        found.add(name)
+        for field in self.types[name]:
+            self._dependencies(_base_type(field["type"]), found)
+        return found
+
+    def _encode_type(self, name: str) -> str:
+        """encodeType: the primary type, then its dependencies sorted by name."""
+        deps = sorted(self._dependencies(name, set()) - {name})
+        return "".join(
+            t + "(" + ",".join(f"{field['type']} {field['name']}" for field in self.types[t]) + ")"
+            for t in [name] + deps
+        )
+
+    def hash_struct(self, name: str, data: Dict[str, Any]) -> bytes:
+        """hashStruct(s) = keccak256(typeHash || encodeData(s))."""
+        encoded = [self.type_hashes[name]]
+        for field in self.types[name]:
+            encoded.append(self.encode_value(field["type"], data.get(field["name"])))
+        return keccak_256(b"".join(encoded))
+
+    def encode_value(self, type_name: str, value: Any) -> bytes:
+        """One 32-byte word of encodeData."""
+        array = _ARRAY_TYPE.match(type_name)
+        if array:
+            item_type, length = array.groups()
+            items = list(value or [])
+            if length and len(items) != int(length):
+                raise ValueError(f"{type_name} expects {length} items, got {len(items)}")
+            return keccak_256(b"".join(self.encode_value(item_type, item) for item in items))
+
+        if type_name in self.types:
+            if value is None:
+                return bytes(32)
+            return self.hash_struct(type_name, value)
+
+        if type_name == "string":
+            return keccak_256((value or "").encode("utf-8"))
+        if type_name == "bytes":
+            return keccak_256(_to_bytes(value))
+        if type_name == "bool":
+            return _int_word(1 if value in (True, "true", 1) else 0)
+        if type_name == "address":
+            address = _to_bytes(value)
+            if len(address) != 20:
+                raise ValueError(f"Invalid address {value!r}")
+            return bytes(12) + address
+
+        fixed = _BYTES_TYPE.match(type_name)
+        if fixed:
+            size = int(fixed.group(1))
+            data = _to_bytes(value)
+            if not 1 <= size <= 32 or len(data) > size:
+                raise ValueError(f"Invalid {type_name} value {value!r}")
+            return data.ljust(32, b"\x00")
+
+        integer = _INT_TYPE.match(type_name)
+        if integer:
+            unsigned, bits = integer.group(1) == "u", int(integer.group(2) or 256)
+            number = _to_int(value)
+            low, high = (0, 1 << bits) if unsigned else (-(1 << (bits - 1)), 1 << (bits - 1))
+            if not low <= number < high:
+                raise ValueError(f"{number} out of range for {type_name}")
+            return _int_word(number)
+
+        raise ValueError(f"Unknown EIP-712 type '{type_name}'")
+
+
+def _base_type(type_name: str) -> str:
+    while True:
+        array = _ARRAY_TYPE.match(type_name)
+        if not array:
+            return type_name
+        type_name = array.group(1)
+
+
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if isinstance(value, str):
+        text = value[2:] if value[:2].lower() == "0x" else value
+        try:
+            return bytes.fromhex(text)
+        except ValueError:
+            raise ValueError(f"Expected hex data, got {value!r}")
+    raise ValueError(f"Expected hex data, got {value!r}")
+
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        return int(value, 16) if value[:2].lower() == "0x" else int(value)
+    raise ValueError(f"Expected an integer, got {value!r}")
+
+
+def _int_word(number: int) -> bytes:
+    return (number % (1 << 256)).to_bytes(32, "big")
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable form of a JSON value, for memoization keys."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw_types(frozen: Tuple) -> Dict[str, List[Dict[str, str]]]:
+    return {name: [dict(field) for field in fields] for name, fields in frozen}
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def _compiled_schema(frozen_types: Tuple) -> EIP712Schema:
+    return EIP712Schema(_thaw_types(frozen_types))
+
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def _domain_separator(frozen_types: Tuple, frozen_domain: Tuple) -> bytes:
+    schema = _compiled_schema(frozen_types)
+    return schema.hash_struct("EIP712Domain", dict(frozen_domain))
+
+
+def compile_schema(types: Dict[str, List[Dict[str, str]]]) -> EIP712Schema:
+    """The compiled schema for `types` (memoized)."""
+    return _compiled_schema(_freeze(types))
+
+
+def domain_separator(typed_data: Dict[str, Any]) -> bytes:
+    """hashStruct(domain) for the typed data's EIP712Domain (memoized)."""
+    return _domain_separator(_freeze(typed_data["types"]), _freeze(typed_data.get("domain", {})))
+
+
+def hash_typed_data(typed_data: Dict[str, Any]) -> Dict[str, bytes]:
+    """
+    EIP-712 digest of a typed data object.
+
+    Args:
+        typed_data: {"types", "primaryType", "domain", "message"} as in eth_signTypedData_v4
+
+    Returns:
+        domain_separator, struct_hash (empty when primaryType is EIP712Domain)
+        and the signing digest
+
+    Raises:
+        ValueError: If the data does not match its schema
+    """
+    try:
+        frozen_types = _freeze(typed_data["types"])
+        primary_type = typed_data["primaryType"]
+    except KeyError as e:
+        raise ValueError(f"Typed data is missing {e}")
+    if "EIP712Domain" not in typed_data["types"]:
+        raise ValueError("Typed data types must include EIP712Domain")
+
+    separator = _domain_separator(frozen_types, _freeze(typed_data.get("domain", {})))
+    if primary_type == "EIP712Domain":
+        struct_hash = b""
+    else:
+        schema = _compiled_schema(frozen_types)
+        if primary_type not in schema.types:
+            raise ValueError(f"Unknown primaryType '{primary_type}'")
+        struct_hash = schema.hash_struct(primary_type, typed_data.get("message", {}))
+
+    return {
+        "domain_separator": separator,
+        "struct_hash": struct_hash,
+        "digest": keccak_256(b"\x19\x01" + separator + struct_hash),
+    }
+
+
+def encode_message_field(typed_data: Dict[str, Any], field_name: str) -> bytes:
+    """
+    The 32-byte encodeData word of one field of the primary type's message.
+
+    Equal words mean equal values as the signature commits to them, whatever
+    their spelling in JSON ("0x0A", "10", 10).
+
+    Raises:
+        ValueError: If the primary type has no such field
+    """
+    schema = compile_schema(typed_data["types"])
+    for field in schema.types.get(typed_data["primaryType"], []):
+        if field["name"] == field_name:
+            return schema.encode_value(field["type"], typed_data.get("message", {}).get(field_name))
+    raise ValueError(f"{typed_data['primaryType']} has no field '{field_name}'")
+
+
+def cache_info() -> Dict[str, Any]:
+    """Hit counters of the schema and domain separator caches."""
+    schemas, domains = _compiled_schema.cache_info(), _domain_separator.cache_info()
+    return {
+        "keccak_backend": KECCAK_BACKEND,
+        "schemas": {"size": schemas.currsize, "hits": schemas.hits, "misses": schemas.misses},
+        "domain_separators": {"size": domains.currsize, "hits": domains.hits, "misses": domains.misses},
+    }
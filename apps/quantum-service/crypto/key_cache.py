@@ -0,0 +1,99 @@
+"""
+Parsed Key Cache
+
+Signing with a hex-encoded key means decoding it, deriving the key
+material and building a key object on every call. KeyCache keeps the parsed
+objects for recently used keys in a bounded LRU so hot keys pay that cost
+once.
+
+Entries are keyed by a salted BLAKE2b fingerprint of the key bytes, never by
+the key itself, so the cache's index holds no secrets.
+
+Limitation: the cached values are `cryptography` key objects whose private
+material lives inside OpenSSL, out of reach of Python. The cache cannot
+zero it; eviction and clear() only drop the cache's reference, and the
+memory is released (and cleansed by OpenSSL) once no caller holds the
+object any more. Cached private keys therefore stay resident for as long
+as they are cached; use key_cache_size=0 where that is not acceptable.
+"""
+
+from collections import OrderedDict
+import hashlib
+import secrets
+import threading
+from typing import Any, Callable, Dict
+
+
+class KeyCache:
+    """
+    LRU of parsed key objects keyed by fingerprint.
+
+    Attributes:
+        max_entries: Maximum number of cached keys (0 disables caching)
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._salt = secrets.token_bytes(16)
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def fingerprint(self, kind: str, key_bytes: bytes) -> str:
+        """Salted fingerprint identifying a key of the given kind."""
+        return hashlib.blake2b(kind.encode() + b"\x00" + key_bytes, digest_size=16, key=self._salt).hexdigest()
+
+    def get(self, kind: str, key_bytes: bytes, parse: Callable[[bytes], Any]) -> Any:
+        """
+        Return the parsed key, calling parse(key_bytes) on a miss.
+
+        Args:
+            kind: Namespace such as "ed25519-private" so public and private
+                keys with equal bytes never collide
+            key_bytes: Raw key bytes
+            parse: Builds the key object
+
+        Returns:
+            The (shared) key object
+        """
+        fingerprint = self.fingerprint(kind, key_bytes)
+        with self._lock:
+            parsed = self._entries.get(fingerprint)
+            if parsed is not None:
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+                return parsed
+            self.misses += 1
+
+        parsed = parse(key_bytes)
+        if self.max_entries <= 0:
+            return parsed
+
+        with self._lock:
+            self._entries[fingerprint] = parsed
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return parsed
+
+    def clear(self):
+        """Drop every entry (see the module docstring on what that releases)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
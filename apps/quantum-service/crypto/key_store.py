@@ -0,0 +1,248 @@
+"""
+Server-Side Key Store
+
+Clients register a private key once and sign by opaque key id afterwards,
+so the key no longer travels with every request and is parsed exactly once.
+
+A key id is a bearer secret: anyone holding it can sign with (or delete)
+the key. Ids carry 128 random bits, are returned exactly once, when the key
+is imported or generated, and are never listed; list() identifies keys by a
+one-way fingerprint of the id instead.
+
+Limitation: each entry keeps the resolved signing handle, and the handle
+holds the secret (an OpenSSL key object for Ed25519, a closure over the
+immutable key bytes for Dilithium). The store cannot zero either; delete()
+and clear() only drop the store's references, and the material stays in
+memory until no caller holds the handle and it is collected. Persistent
+stores additionally keep the key bytes to rewrite the file.
+
+Keys can optionally be persisted to a local file encrypted with AES-256-GCM
+under a key derived from a passphrase with scrypt. The whole store is
+rewritten atomically (temp file + rename, mode 0600) on every change, which
+is fine for the handful of keys a service holds. The scrypt derivation runs
+once per process; each save uses the same salt with a fresh GCM nonce.
+
+File format (JSON):
+    {"version": 1, "kdf": {"salt", "n", "r", "p"}, "nonce", "ciphertext"}
+with the plaintext being {key_id: {private_key_hex, public_key_hex,
+algorithm, created_at}}.
+
+References:
+    - NIST SP 800-38D (2007), "Galois/Counter Mode (GCM) and GMAC"
+    - RFC 7914 (2016), "The scrypt Password-Based Key Derivation Function"
+"""
+
+import hashlib
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+    CRYPTO_AVAILABLE = True
+except ImportError:
+    CRYPTO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# scrypt cost parameters for the file encryption key (~64 MiB, well under a second)
+SCRYPT_N = 1 << 16
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+class KeyStore:
+    """
+    In-memory map of key id -> pre-resolved signing handle.
+
+    Attributes:
+        path: Encrypted persistence file (None for memory only)
+    """
+
+    def __init__(
+        self,
+        resolve: Callable[[bytes], Any],
+        path: Optional[str] = None,
+        passphrase: Optional[str] = None,
+    ):
+        """
+        Args:
+            resolve: Builds the signing handle from raw private key bytes
+            path: Encrypted file to load from and save to (optional)
+            passphrase: Passphrase for the file; required when path is set
+        """
+        if path is not None and not passphrase:
+            raise ValueError("A passphrase is required to persist the key store")
+        if path is not None and not CRYPTO_AVAILABLE:
+            raise ValueError("Key store persistence requires the cryptography package")
+
+        self.path = path
+        self._passphrase = passphrase
+        self._resolve = resolve
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._kdf: Optional[Dict[str, Any]] = None
+        self._file_key: Optional[bytes] = None
+
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def add(self, private_key_bytes: bytes, public_key_hex: Optional[str], algorithm: str) -> str:
+        """Register a key and return its new id."""
+        key_id = f"key_{secrets.token_hex(16)}"
+        entry = self._entry(private_key_bytes, public_key_hex, algorithm, time.time())
+        with self._lock:
+            self._entries[key_id] = entry
+            self._save()
+        return key_id
+
+    def handle(self, key_id: str) -> Any:
+        """
+        Signing handle for a key id.
+
+        Raises:
+            ValueError: If the id is unknown
+        """
+        entry = self._entries.get(key_id)
+        if entry is None:
+            raise ValueError(f"Unknown key id '{key_id}'")
+        return entry["handle"]
+
+    def key_size(self, key_id: str) -> int:
+        """Private key length in bytes."""
+        entry = self._entries.get(key_id)
+        if entry is None:
+            raise ValueError(f"Unknown key id '{key_id}'")
+        return entry["key_size"]
+
+    def describe(self, key_id: str) -> Dict[str, Any]:
+        """Metadata of a key, including its id (for the caller that just registered it)."""
+        entry = self._entries.get(key_id)
+        if entry is None:
+            raise ValueError(f"Unknown key id '{key_id}'")
+        return {"key_id": key_id, **self._public_metadata(key_id, entry)}
+
+    @staticmethod
+    def fingerprint(key_id: str) -> str:
+        """One-way reference to a key id; it cannot be used to sign or delete."""
+        return hashlib.sha256(f"key-store-fingerprint:{key_id}".encode("utf-8")).hexdigest()[:16]
+
+    def _public_metadata(self, key_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint(key_id),
+            "public_key_hex": entry["public_key_hex"],
+            "algorithm": entry["algorithm"],
+            "key_size": entry["key_size"],
+            "created_at": entry["created_at"],
+        }
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Public metadata of every key; ids are bearer secrets and are not included."""
+        with self._lock:
+            entries = list(self._entries.items())
+        return [self._public_metadata(key_id, entry) for key_id, entry in entries]
+
+    def delete(self, key_id: str) -> bool:
+        """Remove a key; False if it did not exist."""
+        with self._lock:
+            if self._entries.pop(key_id, None) is None:
+                return False
+            self._save()
+        return True
+
+    def clear(self):
+        """Remove every key held in memory (the file is kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(
+        self, private_key_bytes: bytes, public_key_hex: Optional[str], algorithm: str, created_at: float
+    ) -> Dict[str, Any]:
+        return {
+            "handle": self._resolve(private_key_bytes),
+            "key_size": len(private_key_bytes),
+            # Only needed to rewrite the file
+            "private_key": private_key_bytes if self.path is not None else None,
+            "public_key_hex": public_key_hex,
+            "algorithm": algorithm,
+            "created_at": created_at,
+        }
+
+    # === Persistence ===
+
+    def _derive_file_key(self, kdf: Dict[str, Any]) -> bytes:
+        """Run scrypt for the given parameters and remember the result."""
+        self._kdf = kdf
+        self._file_key = Scrypt(
+            salt=bytes.fromhex(kdf["salt"]), length=32, n=kdf["n"], r=kdf["r"], p=kdf["p"]
+        ).derive(self._passphrase.encode("utf-8"))
+        return self._file_key
+
+    def _save(self):
+        """Encrypt and atomically rewrite the store file (caller holds the lock)."""
+        if self.path is None:
+            return
+
+        plaintext = json.dumps({
+            key_id: {
+                "private_key_hex": entry["private_key"].hex(),
+                "public_key_hex": entry["public_key_hex"],
+                "algorithm": entry["algorithm"],
+                "created_at": entry["created_at"],
+            }
+            for key_id, entry in self._entries.items()
+        }).encode("utf-8")
+
+        if self._file_key is None:
+            self._derive_file_key({"salt": secrets.token_hex(16), "n": SCRYPT_N, "r": SCRYPT_R, "p": SCRYPT_P})
+        nonce = secrets.token_bytes(12)
+        ciphertext = AESGCM(self._file_key).encrypt(nonce, plaintext, None)
+        document = {
+            "version": 1,
+            "kdf": self._kdf,
+            "nonce": nonce.hex(),
+            "ciphertext": ciphertext.hex(),
+        }
+
+        tmp_path = f"{self.path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(document, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _load(self):
+        """
+        Decrypt the store file and resolve every key.
+
+        Raises:
+            ValueError: If the passphrase is wrong or the file was modified
+        """
+        with open(self.path) as f:
+            document = json.load(f)
+
+        file_key = self._derive_file_key(document["kdf"])
+        try:
+            plaintext = AESGCM(file_key).decrypt(
+                bytes.fromhex(document["nonce"]), bytes.fromhex(document["ciphertext"]), None
+            )
+        except Exception:
+            raise ValueError(f"Cannot decrypt key store {self.path}: wrong passphrase or corrupted file")
+
+        for key_id, stored in json.loads(plaintext).items():
+            self._entries[key_id] = self._entry(
+                bytes.fromhex(stored["private_key_hex"]),
+                stored["public_key_hex"],
+                stored["algorithm"],
+                stored["created_at"],
+            )
+        logger.info(f"Loaded {len(self._entries)} keys from {self.path}")
@@ -0,0 +1,131 @@
+"""
+Pre-generated Key Pair Pool
+
+Key generation is far more expensive than signing (for Dilithium by an
+order of magnitude), so /crypto/dilithium/keypair should not generate on
+the request path. KeypairPool keeps a queue of ready key pairs that a
+background worker tops up whenever the level drops below a low-watermark;
+take() pops one in O(1) and only generates synchronously when the pool is
+empty.
+
+Each key pair is handed out exactly once and removed from the pool.
+"""
+
+from collections import deque
+import logging
+import time
+from typing import Any, Callable, Deque, Dict, Optional
+
+from refill import RefillingPool
+
+logger = logging.getLogger(__name__)
+
+
+class KeypairPool(RefillingPool):
+    """
+    Queue of ready key pairs with a background refill worker.
+
+    Attributes:
+        depth: Number of key pairs kept ready
+        low_watermark: Level below which the refill worker wakes up
+    """
+
+    kind = "keypair"
+
+    def __init__(
+        self,
+        generate: Callable[[], Dict[str, str]],
+        depth: int = 32,
+        low_watermark: Optional[int] = None,
+        name: str = "dilithium",
+    ):
+        """
+        Initialize an empty pool.
+
+        Args:
+            generate: Returns one new key pair
+            depth: Number of key pairs kept ready
+            low_watermark: Refill trigger level (defaults to half the depth)
+            name: Used for the worker thread name and logs
+        """
+        super().__init__(name, depth // 2 if low_watermark is None else low_watermark)
+        self.depth = depth
+        self._generate = generate
+
+        self._ready: Deque[Dict[str, str]] = deque()
+
+        self.served = 0
+        self.misses = 0
+        self.generated = 0
+        self.generate_seconds = 0.0
+
+    @property
+    def level(self) -> int:
+        """Key pairs currently ready."""
+        return len(self._ready)
+
+    def take(self) -> Dict[str, str]:
+        """Pop a ready key pair, generating one on the spot if the pool is empty."""
+        with self._wakeup:
+            keypair = self._ready.popleft() if self._ready else None
+            if keypair is not None:
+                self.served += 1
+            else:
+                self.misses += 1
+            if len(self._ready) < self.low_watermark:
+                self._wakeup.notify()
+
+        if keypair is None:
+            keypair = self._generate_timed()
+        return keypair
+
+    def fill(self, n: Optional[int] = None) -> int:
+        """
+        Generate synchronously until n key pairs were added or the pool is full.
+
+        Returns:
+            Number of key pairs added
+        """
+        target = self.depth if n is None else n
+        added = 0
+        while added < target and len(self._ready) < self.depth:
+            keypair = self._generate_timed()
+            with self._lock:
+                if len(self._ready) >= self.depth:
+                    break
+                self._ready.append(keypair)
+            added += 1
+        return added
+
+    def _generate_timed(self) -> Dict[str, str]:
+        started = time.perf_counter()
+        keypair = self._generate()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.generated += 1
+            self.generate_seconds += elapsed
+        return keypair
+
+    def clear(self):
+        """Drop every ready key pair."""
+        with self._lock:
+            self._ready.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool level, hit rate and generation latency."""
+        with self._lock:
+            requests = self.served + self.misses
+            return {
+                "depth": self.depth,
+                "level": len(self._ready),
+                "low_watermark": self.low_watermark,
+                "served_from_pool": self.served,
+                "generated_on_request": self.misses,
+                "hit_rate": self.served / requests if requests else 0.0,
+                "generated": self.generated,
+                "mean_generate_ms": (
+                    1000 * self.generate_seconds / self.generated if self.generated else 0.0
+                ),
+                "refill_errors": self.refill_errors,
+                "refill_worker_running": self.refill_worker_running,
+            }
@@ -0,0 +1,110 @@
+"""
+Signature Verification Cache
+
+Every hop of the payment pipeline re-verifies the same (message, signature,
+public key) triples. VerificationCache remembers triples that verified
+successfully, for a TTL, so repeats cost one BLAKE2b hash instead of a
+signature verification.
+
+Only positive results are stored: a failed verification is never cached,
+so a cache entry can only ever confirm what the primitive already
+accepted, and an attacker cannot poison it with invalid triples. Entries
+are keyed by a 256-bit BLAKE2b digest of the length-prefixed triple, so
+two different triples cannot share an entry.
+"""
+
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict
+
+
+class VerificationCache:
+    """
+    Bounded, TTL-limited LRU of successfully verified triples.
+
+    Attributes:
+        max_entries: Maximum number of remembered triples (0 disables caching)
+        ttl_seconds: How long a positive result is trusted
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 65536,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()  # key -> expiry
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.verify_seconds = 0.0  # Spent in the primitive on misses
+
+    @staticmethod
+    def key(message: bytes, signature: bytes, public_key: bytes) -> bytes:
+        """Digest identifying a triple."""
+        digest = hashlib.blake2b(digest_size=32)
+        for part in (message, signature, public_key):
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+        return digest.digest()
+
+    def verify(self, key: bytes, verify: Callable[[], bool]) -> bool:
+        """
+        Return True for a cached triple, otherwise run verify() and
+        remember the result if it was positive.
+        """
+        if self.max_entries <= 0:
+            return verify()
+
+        now = self._clock()
+        with self._lock:
+            expires = self._entries.get(key)
+            if expires is not None:
+                if now < expires:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        started = time.perf_counter()
+        valid = verify()
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.verify_seconds += elapsed
+            if valid:
+                self._entries[key] = now + self.ttl_seconds
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return valid
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and the verification time hits saved (estimated from misses)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            mean_verify = self.verify_seconds / self.misses if self.misses else 0.0
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "mean_verify_ms": 1000 * mean_verify,
+                "estimated_seconds_saved": self.hits * mean_verify,
+            }
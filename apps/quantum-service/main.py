@@ -5,20 +5,50 @@ A FastAPI service providing quantum portfolio optimization,
 quantum random number generation, and post-quantum cryptography.
 """
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any
+import asyncio
+import json
+import logging
+import math
+import os
 import uvicorn
 
 from quantum.portfolio_optimizer import PortfolioOptimizer
-from quantum.qrng_service import QRNGService
+from quantum.qrng_service import ENTROPY_MODES, QRNGService
+from crypto import eip712
 from crypto.dilithium_service import DilithiumService
+from workers import (
+    PoolSaturated,
+    PoolUnavailable,
+    RateLimiter,
+    WorkerPool,
+    call_optimizer,
+    init_optimizer_worker,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    for pool in worker_pools.values():
+        pool.shutdown(wait=False)
+    # Stops the entropy and key pair refill threads before interpreter teardown
+    qrng_service.close()
+    dilithium_service.close()
+
 
 app = FastAPI(
     title="Captain Whiskers Quantum Service",
     description="Quantum portfolio optimization and post-quantum cryptography",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -30,9 +60,129 @@ app.add_middleware(
 )
 
 # Initialize services
-portfolio_optimizer = PortfolioOptimizer()
-qrng_service = QRNGService()
-dilithium_service = DilithiumService()
+portfolio_optimizer = PortfolioOptimizer(
+    cache_size=int(os.environ.get("OPTIMIZER_CACHE_SIZE", 1024)),
+    cache_ttl=float(os.environ.get("OPTIMIZER_CACHE_TTL", 300)),
+)
+qrng_service = QRNGService(
+    pool_size=int(os.environ.get("QRNG_POOL_BYTES", 1 << 20)),
+    drbg_reseed_bytes=int(os.environ.get("QRNG_DRBG_RESEED_BYTES", 1 << 30)),
+    drbg_reseed_seconds=float(os.environ.get("QRNG_DRBG_RESEED_SECONDS", 300)),
+    conditioner=os.environ.get("QRNG_CONDITIONER", "toeplitz"),
+    conditioning_ratio=float(os.environ.get("QRNG_CONDITIONING_RATIO", 0.5)),
+    # Comma-separated, e.g. "aer,file:/dev/hwrng"; weights multiply measured throughput
+    entropy_sources=os.environ.get("QRNG_SOURCES", "aer").split(","),
+    source_weights=(
+        [float(w) for w in os.environ["QRNG_SOURCE_WEIGHTS"].split(",")]
+        if os.environ.get("QRNG_SOURCE_WEIGHTS") else None
+    ),
+)
+dilithium_service = DilithiumService(
+    key_cache_size=int(os.environ.get("DILITHIUM_KEY_CACHE_SIZE", 1024)),
+    # Registered keys survive restarts only if both are set
+    key_store_path=os.environ.get("DILITHIUM_KEYSTORE_PATH"),
+    key_store_passphrase=os.environ.get("DILITHIUM_KEYSTORE_PASSPHRASE"),
+    keypair_pool_depth=int(os.environ.get("DILITHIUM_KEYPAIR_POOL_DEPTH", 32)),
+    verification_cache_size=int(os.environ.get("DILITHIUM_VERIFY_CACHE_SIZE", 65536)),
+    verification_cache_ttl=float(os.environ.get("DILITHIUM_VERIFY_CACHE_TTL", 300)),
+    replay_snapshot_path=os.environ.get("DILITHIUM_REPLAY_SNAPSHOT"),
+)
+
+# Worker pools, one per endpoint class (see workers.py for the environment knobs).
+# Optimization and RL run in processes; QRNG simulation and crypto primitives
+# release the GIL and run in threads.
+optimizer_pool = WorkerPool.from_env(
+    "optimizer", kind="process", workers=os.cpu_count() or 2, max_queue=32,
+    # Results are cached in this process only (run_cached_optimizer / run_cached_batch)
+    initializer=init_optimizer_worker,
+    initargs=(None, 0, portfolio_optimizer.cache.ttl_seconds),
+)
+if optimizer_pool.kind == "thread":
+    init_optimizer_worker(portfolio_optimizer)
+qrng_pool = WorkerPool.from_env("qrng", kind="thread", workers=4, max_queue=64)
+crypto_pool = WorkerPool.from_env("crypto", kind="thread", workers=8, max_queue=256)
+
+worker_pools = {
+    "optimizer": optimizer_pool,
+    "qrng": qrng_pool,
+    "crypto": crypto_pool,
+}
+
+# Problems per optimizer task when streaming a batch
+BATCH_CHUNK_SIZE = 256
+
+# Largest sign/verify batch accepted in one call
+MAX_SIGNATURE_BATCH = int(os.environ.get("DILITHIUM_MAX_BATCH", 10000))
+
+# Random byte streams: bytes per chunk, largest stream, and per-client pacing
+# (QRNG_STREAM_RATE bytes/s with a QRNG_STREAM_BURST allowance)
+STREAM_CHUNK_SIZE = 1 << 16
+STREAM_MAX_BYTES = int(os.environ.get("QRNG_STREAM_MAX_BYTES", 1 << 30))
+stream_limiter = RateLimiter.from_env("qrng_stream", rate=1 << 20, burst=8 << 20)
+
+
+async def offload(pool: WorkerPool, fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking call on a worker pool, turning backpressure into HTTP errors."""
+    try:
+        return await pool.run(fn, *args, **kwargs)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except PoolUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def run_cached_optimizer(method: str, params: Dict[str, Any], use_cache: bool) -> Dict[str, Any]:
+    """
+    Run optimize/analyze_risk on the optimizer pool.
+    
+    The result cache lives in this process, so it is checked before dispatch
+    and filled afterwards; workers always compute.
+    """
+    key = portfolio_optimizer.cache_key(method, params) if use_cache else None
+    if key is not None:
+        cached = portfolio_optimizer.cache.get(key)
+        if cached is not None:
+            return cached
+
+    result = await offload(optimizer_pool, call_optimizer, method, {**params, "use_cache": False})
+    if key is not None:
+        portfolio_optimizer.cache.put(key, result)
+    return result
+
+
+async def run_cached_batch(problems: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Run optimize_many on the optimizer pool, with cache lookups and fills
+    for every problem done here, as run_cached_optimizer does for single calls.
+    
+    Only the misses are dispatched; failed problems are not cached.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(problems)
+    keys: Dict[int, str] = {}
+    pending = []
+    for i, problem in enumerate(problems):
+        if problem.get("use_cache", True):
+            try:
+                key = portfolio_optimizer.cache_key("optimize", problem)
+            except (KeyError, TypeError, ValueError):
+                key = None  # Malformed: the worker reports the error
+            if key is not None:
+                cached = portfolio_optimizer.cache.get(key)
+                if cached is not None:
+                    results[i] = cached
+                    continue
+                keys[i] = key
+        pending.append(i)
+
+    if pending:
+        solved = await offload(optimizer_pool, call_optimizer, "optimize_many", {
+            "problems": [{**problems[i], "use_cache": False} for i in pending],
+        })
+        for i, result in zip(pending, solved):
+            results[i] = result
+            if i in keys and "error" not in result:
+                portfolio_optimizer.cache.put(keys[i], result)
+    return results
 
 
 # === Request/Response Models ===
@@ -45,6 +195,8 @@ class PortfolioOptimizationRequest(BaseModel):
     risk_tolerance: float = 0.5  # 0 (min risk) to 1 (max return)
     budget: float = 1.0  # Total budget to allocate
     constraints: Optional[Dict[str, Any]] = None
+    solver: Optional[str] = None  # "native" (default) or "vqe"
+    use_cache: bool = True  # Set False to bypass the result cache
 
 
 class PortfolioOptimizationResponse(BaseModel):
@@ -58,12 +210,28 @@ class PortfolioOptimizationResponse(BaseModel):
     convergence_achieved: bool
 
 
+class PortfolioBatchRequest(BaseModel):
+    """Request for optimizing many portfolios in one call"""
+    problems: List[PortfolioOptimizationRequest]
+
+
+class EfficientFrontierRequest(BaseModel):
+    """Request for an efficient frontier sweep"""
+    assets: List[str]
+    expected_returns: List[float]
+    covariance_matrix: List[List[float]]
+    n_points: int = 50  # Number of risk tolerances sampled in [0, 1]
+    budget: float = 1.0
+    constraints: Optional[Dict[str, Any]] = None
+
+
 class QRNGRequest(BaseModel):
     """Request for quantum random numbers"""
     count: int = 1
     min_value: int = 0
     max_value: int = 255
     format: str = "integer"  # "integer", "float", "bytes"
+    entropy_source: str = "quantum"  # "quantum" (entropy pool) or "drbg" (quantum-seeded ChaCha20)
 
 
 class QRNGResponse(BaseModel):
@@ -71,12 +239,15 @@ class QRNGResponse(BaseModel):
     random_values: List[Any]
     quantum_circuit_shots: int
     entropy_source: str
+    entropy_bits_used: int = 0
+    mode: str = "quantum"  # Which mode served the request: "quantum", "drbg" or "fallback"
 
 
 class SigningRequest(BaseModel):
     """Request for post-quantum signature"""
     message: str
-    private_key_hex: str
+    private_key_hex: Optional[str] = None
+    key_id: Optional[str] = None  # Registered key (see /crypto/keys), instead of private_key_hex
 
 
 class SignatureResponse(BaseModel):
@@ -93,6 +264,32 @@ class VerifyRequest(BaseModel):
     public_key_hex: str
 
 
+class SigningBatchRequest(BaseModel):
+    """Request for signing many messages in one call"""
+    items: List[SigningRequest]
+
+
+class VerifyBatchRequest(BaseModel):
+    """Request for verifying many signatures in one call"""
+    items: List[VerifyRequest]
+
+
+class MerkleSignRequest(BaseModel):
+    """Request for signing a batch of messages under one Merkle root"""
+    messages: List[str]
+    private_key_hex: Optional[str] = None
+    key_id: Optional[str] = None
+
+
+class MerkleVerifyRequest(BaseModel):
+    """Request for verifying one message of a Merkle-signed batch"""
+    message: str
+    proof: List[Dict[str, str]]  # [{"hash": hex, "position": "left" | "right"}, ...]
+    root_hex: str
+    root_signature_hex: str
+    public_key_hex: str
+
+
 class KeyPairResponse(BaseModel):
     """Response with key pair"""
     public_key_hex: str
@@ -103,7 +300,27 @@ class KeyPairResponse(BaseModel):
 class EIP712SignRequest(BaseModel):
     """Request for EIP-712 signing"""
     typed_data: Dict[str, Any]
+    private_key_hex: Optional[str] = None
+    key_id: Optional[str] = None
+
+
+class EIP712VerifyRequest(BaseModel):
+    """Request for verifying a signed EIP-712 payment request"""
+    typed_data: Dict[str, Any]
+    signature_hex: str
+    public_key_hex: str
+    consume_nonce: bool = False  # True records the nonce, as /crypto/eip712/settle does
+
+
+class EIP712HashRequest(BaseModel):
+    """Request for the EIP-712 digest of typed data"""
+    typed_data: Dict[str, Any]
+
+
+class KeyImportRequest(BaseModel):
+    """Request for registering a private key in the key store"""
     private_key_hex: str
+    public_key_hex: Optional[str] = None
 
 
 # === Portfolio Optimization Endpoints ===
@@ -111,7 +328,7 @@ class EIP712SignRequest(BaseModel):
 @app.post("/quantum/optimize-portfolio", response_model=PortfolioOptimizationResponse)
 async def optimize_portfolio(request: PortfolioOptimizationRequest):
     """
-    Perform quantum portfolio optimization using VQE (Variational Quantum Eigensolver).
+    Perform portfolio optimization.
     
     Uses quadratic programming formulation:
     min w^T Σ w - μ · w^T r
@@ -122,17 +339,87 @@ async def optimize_portfolio(request: PortfolioOptimizationRequest):
     - Σ: covariance matrix
     - r: expected returns
     - μ: risk aversion (derived from risk_tolerance)
+    
+    Continuous weights are solved with the native convex QP solver by default;
+    pass solver="vqe" for the VQE (Variational Quantum Eigensolver) path.
     """
     try:
-        result = portfolio_optimizer.optimize(
-            assets=request.assets,
-            expected_returns=request.expected_returns,
-            covariance_matrix=request.covariance_matrix,
-            risk_tolerance=request.risk_tolerance,
-            budget=request.budget,
-            constraints=request.constraints,
-        )
+        result = await run_cached_optimizer("optimize", {
+            "assets": request.assets,
+            "expected_returns": request.expected_returns,
+            "covariance_matrix": request.covariance_matrix,
+            "risk_tolerance": request.risk_tolerance,
+            "budget": request.budget,
+            "constraints": request.constraints,
+            "solver": request.solver,
+        }, use_cache=request.use_cache)
         return PortfolioOptimizationResponse(**result)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/quantum/optimize-portfolio/batch")
+async def optimize_portfolio_batch(request: PortfolioBatchRequest):
+    """
+    Optimize many portfolios in one call.
+    
+    Problems with the same number of assets are stacked and solved together.
+    Results are streamed back as newline-delimited JSON, one line per problem
+    in request order: {"index": i, ...PortfolioOptimizationResponse} or
+    {"index": i, "error": "..."} for a problem that could not be solved.
+    """
+    problems = [problem.model_dump() for problem in request.problems]
+    chunks = [problems[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(problems), BATCH_CHUNK_SIZE)]
+
+    async def solve(chunk):
+        return await run_cached_batch(chunk)
+
+    # Solve the first chunk before streaming so backpressure still returns 429/503
+    first = await solve(chunks[0]) if chunks else []
+
+    async def stream_results():
+        index = 0
+        for n, chunk in enumerate(chunks):
+            try:
+                results = first if n == 0 else await solve(chunk)
+            except HTTPException as e:
+                # Headers are already sent: report the failure per problem
+                results = [{"error": e.detail}] * len(chunk)
+            for result in results:
+                yield json.dumps({"index": index, **result}) + "\n"
+                index += 1
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@app.post("/quantum/efficient-frontier")
+async def efficient_frontier(request: EfficientFrontierRequest):
+    """
+    Compute the efficient frontier in one call.
+    
+    Sweeps risk_tolerance from 0 to 1 with warm-started solves and returns
+    weights, expected return, risk and Sharpe ratio for every point.
+    """
+    if not 1 <= request.n_points <= 500:
+        raise HTTPException(status_code=400, detail="n_points must be between 1 and 500")
+    
+    try:
+        return await offload(optimizer_pool, call_optimizer, "efficient_frontier", {
+            "assets": request.assets,
+            "expected_returns": request.expected_returns,
+            "covariance_matrix": request.covariance_matrix,
+            "n_points": request.n_points,
+            "budget": request.budget,
+            "constraints": request.constraints,
+        })
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -143,17 +430,25 @@ async def analyze_risk(request: PortfolioOptimizationRequest):
     Perform quantum-enhanced risk analysis using amplitude estimation.
     """
     try:
-        result = portfolio_optimizer.analyze_risk(
-            assets=request.assets,
-            expected_returns=request.expected_returns,
-            covariance_matrix=request.covariance_matrix,
-            allocations=None,  # Will use optimal allocations
-        )
+        result = await run_cached_optimizer("analyze_risk", {
+            "assets": request.assets,
+            "expected_returns": request.expected_returns,
+            "covariance_matrix": request.covariance_matrix,
+            "allocations": None,  # Will use optimal allocations
+        }, use_cache=request.use_cache)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/quantum/cache/stats")
+async def cache_stats(include_entries: bool = True):
+    """Hit/miss counters and per-entry ages of the optimizer result cache."""
+    return portfolio_optimizer.cache_stats(include_entries=include_entries)
+
+
 # === Quantum Random Number Generation ===
 
 @app.post("/quantum/random", response_model=QRNGResponse)
@@ -165,25 +460,145 @@ async def generate_random(request: QRNGRequest):
     Falls back to secure pseudo-random if quantum simulator fails.
     """
     try:
-        result = qrng_service.generate(
+        result = await offload(
+            qrng_pool,
+            qrng_service.generate,
             count=request.count,
             min_value=request.min_value,
             max_value=request.max_value,
             format=request.format,
+            entropy_source=request.entropy_source,
         )
         return QRNGResponse(**result)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/quantum/random/bytes/{length}")
-async def generate_random_bytes(length: int):
+async def generate_random_bytes(length: int, entropy_source: str = "quantum"):
     """Generate random bytes for cryptographic nonces."""
     if length > 1024:
         raise HTTPException(status_code=400, detail="Max length is 1024 bytes")
+    if entropy_source not in ENTROPY_MODES:
+        raise HTTPException(status_code=400, detail=f"entropy_source must be one of {ENTROPY_MODES}")
     
-    result = qrng_service.generate_bytes(length)
-    return {"bytes_hex": result.hex(), "length": length}
+    result, source = await offload(qrng_pool, qrng_service.draw_bytes, length, entropy_source)
+    return {"bytes_hex": result.hex(), "length": length, "entropy_source": source, "mode": entropy_source}
+
+
+@app.get("/quantum/random/stream")
+async def stream_random_bytes(length: int, request: Request, entropy_source: str = "quantum"):
+    """
+    Stream length random bytes as application/octet-stream.
+    
+    entropy_source="drbg" serves a quantum-seeded ChaCha20 keystream for
+    bulk jobs; the X-Entropy-Source header reports the mode.
+    
+    Bytes are produced chunk by chunk on the QRNG pool, so memory stays
+    constant for any length. Each client is paced to QRNG_STREAM_RATE
+    bytes per second after a QRNG_STREAM_BURST allowance; a client that is
+    still in debt from earlier streams gets 429.
+    """
+    if not 0 < length <= STREAM_MAX_BYTES:
+        raise HTTPException(status_code=400, detail=f"length must be between 1 and {STREAM_MAX_BYTES}")
+    if entropy_source not in ENTROPY_MODES:
+        raise HTTPException(status_code=400, detail=f"entropy_source must be one of {ENTROPY_MODES}")
+    
+    client = request.client.host if request.client else "unknown"
+    wait = stream_limiter.delay(client)
+    if wait > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Random stream rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+    
+    chunks = qrng_service.iter_bytes(length, STREAM_CHUNK_SIZE, entropy_source)
+    
+    async def stream_chunks():
+        remaining = length
+        while remaining > 0:
+            n = min(STREAM_CHUNK_SIZE, remaining)
+            delay = stream_limiter.reserve(client, n)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                chunk = await qrng_pool.run(next, chunks)
+            except PoolSaturated:
+                stream_limiter.reserve(client, -n)  # Give the tokens back and retry
+                await asyncio.sleep(0.05)
+                continue
+            except PoolUnavailable as e:
+                # Headers are already sent: end the stream short
+                logger.error(f"Random stream aborted after {length - remaining} bytes: {e}")
+                return
+            remaining -= len(chunk)
+            yield chunk
+    
+    return StreamingResponse(
+        stream_chunks(),
+        media_type="application/octet-stream",
+        headers={"Content-Length": str(length), "X-Entropy-Source": entropy_source},
+    )
+
+
+@app.get("/quantum/random/health")
+async def entropy_health():
+    """Continuous SP 800-90B health test counters and quarantine state, per entropy source."""
+    return qrng_service.health_stats()
+
+
+@app.get("/quantum/random/health/sp800-22")
+async def entropy_statistical_tests(n_bits: int = 1 << 20):
+    """Run the SP 800-22 subset (frequency, block frequency, runs, serial) on a fresh sample."""
+    if not 1 << 10 <= n_bits <= 1 << 24:
+        raise HTTPException(status_code=400, detail="n_bits must be between 1024 and 16777216")
+    
+    try:
+        return await offload(qrng_pool, qrng_service.run_sp800_22, n_bits)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/quantum/random/sources")
+async def entropy_sources():
+    """Per-source throughput, current share of harvests and failures."""
+    return qrng_service.source_stats()
+
+
+@app.get("/quantum/random/sources/benchmark")
+async def benchmark_entropy_sources(megabytes: float = 0.25):
+    """Read the same amount from every entropy source alone and compare MB/s."""
+    if not 0 < megabytes <= 16:
+        raise HTTPException(status_code=400, detail="megabytes must be between 0 and 16")
+    
+    return await offload(qrng_pool, qrng_service.benchmark_sources, megabytes)
+
+
+@app.get("/quantum/random/conditioner/benchmark")
+async def benchmark_conditioner(megabytes: float = 4.0):
+    """Measure conditioner throughput (MB/s in and out) on synthetic input."""
+    if not 0 < megabytes <= 64:
+        raise HTTPException(status_code=400, detail="megabytes must be between 0 and 64")
+    
+    return await offload(qrng_pool, qrng_service.benchmark_conditioner, megabytes)
+
+
+@app.get("/quantum/random/pool")
+async def entropy_pool_stats():
+    """Entropy pool level, refill rate and underruns (bytes served from secrets), plus conditioner and DRBG stats."""
+    return {
+        **qrng_service.pool_stats(),
+        "conditioner": qrng_service.conditioner_stats(),
+        "drbg": qrng_service.drbg_stats(),
+        "stream_limiter": stream_limiter.stats(),
+    }
 
 
 # === Post-Quantum Cryptography ===
@@ -194,24 +609,87 @@ async def generate_keypair():
     Generate a CRYSTALS-Dilithium key pair for post-quantum signatures.
     
     Dilithium is a lattice-based digital signature scheme selected by NIST
-    for post-quantum cryptography standardization.
+    for post-quantum cryptography standardization. Key pairs come from a
+    pre-generated pool; generation only runs on the request when it is empty.
     """
     try:
-        keypair = dilithium_service.generate_keypair()
+        keypair = await offload(crypto_pool, dilithium_service.generate_keypair)
         return KeyPairResponse(**keypair)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/crypto/keys/import")
+async def import_key(request: KeyImportRequest):
+    """
+    Register a private key server-side and return its key id.
+    
+    Sign requests can then pass key_id instead of the private key. The key
+    id is a bearer secret: it is returned only here and lets its holder
+    sign with and delete the key, so store it like the private key itself.
+    """
+    try:
+        return await offload(
+            crypto_pool,
+            dilithium_service.import_key,
+            private_key_hex=request.private_key_hex,
+            public_key_hex=request.public_key_hex,
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/crypto/keys/generate")
+async def generate_key():
+    """
+    Generate a key pair in the key store; only the key id and public key are returned.
+    
+    As with /crypto/keys/import, the key id is a bearer secret returned only once.
+    """
+    try:
+        return await offload(crypto_pool, dilithium_service.generate_key)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/crypto/keys")
+async def list_keys():
+    """Fingerprints and public keys of the registered keys; key ids are never listed."""
+    return {"keys": dilithium_service.list_keys()}
+
+
+@app.delete("/crypto/keys/{key_id}")
+async def delete_key(key_id: str):
+    """Remove a registered key."""
+    if not await offload(crypto_pool, dilithium_service.delete_key, key_id):
+        raise HTTPException(status_code=404, detail=f"Unknown key id '{key_id}'")
+    return {"deleted": key_id}
+
+
 @app.post("/crypto/dilithium/sign", response_model=SignatureResponse)
 async def sign_message(request: SigningRequest):
     """Sign a message using CRYSTALS-Dilithium."""
     try:
-        result = dilithium_service.sign(
+        result = await offload(
+            crypto_pool,
+            dilithium_service.sign,
             message=request.message,
             private_key_hex=request.private_key_hex,
+            key_id=request.key_id,
         )
         return SignatureResponse(**result)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -220,12 +698,106 @@ async def sign_message(request: SigningRequest):
 async def verify_signature(request: VerifyRequest):
     """Verify a CRYSTALS-Dilithium signature."""
     try:
-        is_valid = dilithium_service.verify(
+        is_valid = await offload(
+            crypto_pool,
+            dilithium_service.verify,
             message=request.message,
             signature_hex=request.signature_hex,
             public_key_hex=request.public_key_hex,
         )
         return {"valid": is_valid}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/crypto/dilithium/sign/batch")
+async def sign_message_batch(request: SigningBatchRequest):
+    """
+    Sign many messages in one call.
+    
+    Items are grouped by key and signed in parallel. Results are returned in
+    request order: SignatureResponse fields, or {"error": "..."} for an item
+    that could not be signed.
+    """
+    if len(request.items) > MAX_SIGNATURE_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SIGNATURE_BATCH} items per batch")
+    
+    try:
+        results = await offload(
+            crypto_pool, dilithium_service.sign_many, [item.model_dump() for item in request.items]
+        )
+        return {"results": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/crypto/dilithium/verify/batch")
+async def verify_signature_batch(request: VerifyBatchRequest):
+    """Verify many signatures in one call; one validity flag per item, in request order."""
+    if len(request.items) > MAX_SIGNATURE_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SIGNATURE_BATCH} items per batch")
+    
+    try:
+        valid = await offload(
+            crypto_pool, dilithium_service.verify_many, [item.model_dump() for item in request.items]
+        )
+        return {"valid": valid, "all_valid": all(valid)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/crypto/dilithium/sign/merkle")
+async def sign_merkle_batch(request: MerkleSignRequest):
+    """
+    Sign a batch of messages with a single signature over their Merkle root.
+    
+    Returns the root, its signature and one inclusion proof per message, in
+    request order. Each message is then verified with its proof at
+    /crypto/dilithium/verify/merkle.
+    """
+    if not request.messages:
+        raise HTTPException(status_code=400, detail="At least one message is required")
+    if len(request.messages) > MAX_SIGNATURE_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SIGNATURE_BATCH} messages per batch")
+    
+    try:
+        return await offload(
+            crypto_pool,
+            dilithium_service.sign_merkle_batch,
+            messages=request.messages,
+            private_key_hex=request.private_key_hex,
+            key_id=request.key_id,
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/crypto/dilithium/verify/merkle")
+async def verify_merkle(request: MerkleVerifyRequest):
+    """Verify a message's inclusion proof and its batch's root signature."""
+    try:
+        is_valid = await offload(
+            crypto_pool,
+            dilithium_service.verify_merkle,
+            message=request.message,
+            proof=request.proof,
+            root_hex=request.root_hex,
+            root_signature_hex=request.root_signature_hex,
+            public_key_hex=request.public_key_hex,
+        )
+        return {"valid": is_valid}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -238,16 +810,107 @@ async def sign_eip712(request: EIP712SignRequest):
     Generates signature compatible with x402 micropayment protocol.
     """
     try:
-        result = dilithium_service.sign_eip712(
+        result = await offload(
+            crypto_pool,
+            dilithium_service.sign_eip712,
             typed_data=request.typed_data,
             private_key_hex=request.private_key_hex,
+            key_id=request.key_id,
         )
         return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/crypto/eip712/verify")
+async def verify_eip712(request: EIP712VerifyRequest):
+    """
+    Verify a signed EIP-712 payment request (check-only).
+    
+    valid is true only if the signature checks out, the nonce has not been
+    settled before with the same domain and signer and the deadline has not
+    passed; replay_status says which check failed. The nonce is not
+    recorded, so every hop of the pipeline can verify the same payment;
+    the hop that executes it calls /crypto/eip712/settle.
+    """
+    try:
+        return await offload(
+            crypto_pool,
+            dilithium_service.verify_eip712,
+            typed_data=request.typed_data,
+            signature_hex=request.signature_hex,
+            public_key_hex=request.public_key_hex,
+            consume_nonce=request.consume_nonce,
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# === Health Check ===
+@app.post("/crypto/eip712/settle")
+async def settle_eip712(request: EIP712VerifyRequest):
+    """
+    Verify a signed EIP-712 payment request and consume its nonce.
+    
+    Call once, from the hop that executes the payment: the first settle of
+    a nonce returns replay_status "accepted", every later verify or settle
+    of it "replayed".
+    """
+    try:
+        return await offload(
+            crypto_pool,
+            dilithium_service.settle_eip712,
+            typed_data=request.typed_data,
+            signature_hex=request.signature_hex,
+            public_key_hex=request.public_key_hex,
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/crypto/eip712/hash")
+async def hash_eip712(request: EIP712HashRequest):
+    """EIP-712 domain separator, struct hash and signing digest of typed data (no signature)."""
+    try:
+        return await offload(crypto_pool, dilithium_service.hash_eip712, request.typed_data)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# === Health & Metrics ===
+
+@app.get("/metrics/workers")
+async def worker_metrics():
+    """Configuration and live counters of every worker pool."""
+    return {name: pool.stats() for name, pool in worker_pools.items()}
+
+
+@app.get("/metrics/crypto")
+async def crypto_metrics():
+    """Signature service caches (parsed keys, verifications, EIP-712), key pair pool and replay index."""
+    return {
+        "key_cache": dilithium_service.key_cache_stats(),
+        "keypair_pool": dilithium_service.keypair_pool_stats(),
+        "verification_cache": dilithium_service.verification_cache_stats(),
+        "replay_index": dilithium_service.replay_index_stats(),
+        "eip712": eip712.cache_info(),
+    }
+
 
 @app.get("/health")
 async def health_check():
@@ -261,6 +924,5 @@ async def health_check():
 
 
 if __name__ == "__main__":
-    import os
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
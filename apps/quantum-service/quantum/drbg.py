@@ -0,0 +1,123 @@
+"""
+Quantum-Seeded Deterministic Random Bit Generator
+
+Simulated quantum harvesting tops out at a few Mbit/s. Bulk consumers get
+a ChaCha20 keystream instead, keyed from quantum measurements and reseeded
+with fresh quantum bits after a configurable number of output bytes or
+seconds, whichever comes first.
+
+Each read uses fast key erasure: the first 32 keystream bytes become the
+next key and are never output, so a captured state reveals nothing about
+earlier output.
+
+References:
+    - Bernstein (2017), "Fast-key-erasure random-number generators"
+    - NIST SP 800-90A Rev. 1, reseed interval and prediction resistance
+"""
+
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms
+
+logger = logging.getLogger(__name__)
+
+KEY_SIZE = 32
+NONCE = bytes(16)  # Every key is used for exactly one keystream
+
+
+class ChaCha20DRBG:
+    """
+    ChaCha20 keystream generator reseeded from a quantum seed source.
+
+    Attributes:
+        reseed_bytes: Output bytes after which the next read reseeds
+        reseed_seconds: Seconds after which the next read reseeds
+    """
+
+    def __init__(
+        self,
+        seed_source: Callable[[int], bytes],
+        reseed_bytes: int = 1 << 30,
+        reseed_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            seed_source: Returns n bytes of fresh quantum entropy
+            reseed_bytes: Reseed interval in output bytes
+            reseed_seconds: Reseed interval in seconds
+            clock: Time source for the reseed interval
+        """
+        self.reseed_bytes = reseed_bytes
+        self.reseed_seconds = reseed_seconds
+        self._seed_source = seed_source
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._key = None  # Seeded lazily on first read
+        self._bytes_since_reseed = 0
+        self._reseeded_at = 0.0
+
+        self.bytes_generated = 0
+        self.reseeds = 0
+        self.fallback_seeds = 0
+
+    def read(self, n_bytes: int) -> bytes:
+        """Return n_bytes of keystream, reseeding first if an interval has elapsed."""
+        with self._lock:
+            if self._key is None or self._reseed_due():
+                self._reseed()
+
+            stream = Cipher(algorithms.ChaCha20(self._key, NONCE), mode=None).encryptor()
+            self._key = stream.update(bytes(KEY_SIZE))
+            output = stream.update(bytes(n_bytes))
+
+            self._bytes_since_reseed += n_bytes
+            self.bytes_generated += n_bytes
+            return output
+
+    def reseed(self):
+        """Mix fresh quantum entropy into the key now."""
+        with self._lock:
+            self._reseed()
+
+    def _reseed_due(self) -> bool:
+        return (self._bytes_since_reseed >= self.reseed_bytes
+                or self._clock() - self._reseeded_at >= self.reseed_seconds)
+
+    def _reseed(self):
+        """New key = SHA-256(old key || seed); caller holds the lock."""
+        try:
+            seed = bytes(self._seed_source(KEY_SIZE))
+            if len(seed) < KEY_SIZE:
+                raise ValueError(f"seed source returned {len(seed)} of {KEY_SIZE} bytes")
+        except Exception as e:
+            logger.error(f"DRBG quantum reseed failed: {e}, seeding from secrets")
+            seed = secrets.token_bytes(KEY_SIZE)
+            self.fallback_seeds += 1
+
+        self._key = hashlib.sha256((self._key or b"") + seed).digest()
+        self._bytes_since_reseed = 0
+        self._reseeded_at = self._clock()
+        self.reseeds += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Output volume and reseed counters."""
+        with self._lock:
+            seeded = self._key is not None
+            return {
+                "algorithm": "chacha20",
+                "seeded": seeded,
+                "bytes_generated": self.bytes_generated,
+                "reseeds": self.reseeds,
+                "fallback_seeds": self.fallback_seeds,
+                "reseed_bytes": self.reseed_bytes,
+                "reseed_seconds": self.reseed_seconds,
+                "bytes_since_reseed": self._bytes_since_reseed,
+                "seconds_since_reseed": self._clock() - self._reseeded_at if seeded else None,
+            }
@@ -0,0 +1,155 @@
+"""
+Quantum Entropy Pool
+
+Keeps pre-harvested random bytes in memory so requests never wait for
+circuit simulation. A fixed-size ring buffer is drained by requests and
+topped up by a background worker whenever its level drops below a
+low-watermark.
+
+When a request asks for more than the pool holds, the pool hands out what
+it has and records an underrun; the caller decides how to cover the rest
+(QRNGService falls back to the secrets module and reports it).
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from refill import RefillingPool
+
+logger = logging.getLogger(__name__)
+
+
+class EntropyPool(RefillingPool):
+    """
+    Ring buffer of harvested random bytes with a background refill worker.
+
+    Attributes:
+        capacity: Size of the ring buffer in bytes
+        low_watermark: Level below which the refill worker wakes up
+        refill_chunk: Bytes requested from the source per harvest
+    """
+
+    kind = "entropy"
+
+    def __init__(
+        self,
+        source: Callable[[int], np.ndarray],
+        capacity: int = 1 << 20,
+        low_watermark: Optional[int] = None,
+        refill_chunk: int = 1 << 16,
+        name: str = "qrng",
+    ):
+        """
+        Initialize an empty pool.
+
+        Args:
+            source: Returns n harvested bytes as a uint8 array
+            capacity: Ring buffer size in bytes
+            low_watermark: Refill trigger level (defaults to half the capacity)
+            refill_chunk: Bytes harvested per source call
+            name: Used for the worker thread name and logs
+        """
+        super().__init__(name, capacity // 2 if low_watermark is None else low_watermark)
+        self.capacity = capacity
+        self.refill_chunk = refill_chunk
+        self._source = source
+
+        self._buffer = np.zeros(capacity, dtype=np.uint8)
+        self._read = 0
+        self._level = 0
+
+        self.bytes_served = 0
+        self.bytes_refilled = 0
+        self.refill_seconds = 0.0
+        self.underruns = 0
+        self.underrun_bytes = 0
+
+    @property
+    def level(self) -> int:
+        """Bytes currently available."""
+        return self._level
+
+    def take(self, n_bytes: int) -> np.ndarray:
+        """
+        Remove up to n_bytes from the pool.
+
+        Returns fewer bytes than asked for (possibly none) when the pool runs
+        dry; that shortfall is counted as an underrun.
+        """
+        with self._wakeup:
+            n = min(n_bytes, self._level)
+            start = self._read
+            end = start + n
+            if end <= self.capacity:
+                out = self._buffer[start:end].copy()
+            else:
+                out = np.concatenate([self._buffer[start:], self._buffer[:end - self.capacity]])
+
+            self._read = end % self.capacity
+            self._level -= n
+            self.bytes_served += n
+            if n < n_bytes:
+                self.underruns += 1
+                self.underrun_bytes += n_bytes - n
+            if self._level < self.low_watermark:
+                self._wakeup.notify()
+
+        return out
+
+    def fill(self, n_bytes: Optional[int] = None) -> int:
+        """
+        Harvest synchronously until n_bytes were added or the pool is full.
+
+        Returns:
+            Number of bytes added
+        """
+        target = self.capacity if n_bytes is None else n_bytes
+        added = 0
+        while added < target:
+            with self._lock:
+                room = self.capacity - self._level
+            chunk = min(self.refill_chunk, room, target - added)
+            if chunk <= 0:
+                break
+            added += self._harvest_into_pool(chunk)
+        return added
+
+    def _harvest_into_pool(self, n_bytes: int) -> int:
+        """Harvest outside the lock, then append to the ring buffer."""
+        started = time.perf_counter()
+        data = np.asarray(self._source(n_bytes), dtype=np.uint8)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            n = min(len(data), self.capacity - self._level)
+            write = (self._read + self._level) % self.capacity
+            first = min(n, self.capacity - write)
+            self._buffer[write:write + first] = data[:first]
+            self._buffer[:n - first] = data[first:n]
+            self._level += n
+            self.bytes_refilled += n
+            self.refill_seconds += elapsed
+
+        return n
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool level, refill throughput and underrun counters."""
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "level": self._level,
+                "fill_ratio": self._level / self.capacity if self.capacity else 0.0,
+                "low_watermark": self.low_watermark,
+                "bytes_served": self.bytes_served,
+                "bytes_refilled": self.bytes_refilled,
+                "refill_rate_bytes_per_sec": (
+                    self.bytes_refilled / self.refill_seconds if self.refill_seconds > 0 else 0.0
+                ),
+                "underruns": self.underruns,
+                "underrun_bytes": self.underrun_bytes,
+                "refill_errors": self.refill_errors,
+                "refill_worker_running": self.refill_worker_running,
+            }
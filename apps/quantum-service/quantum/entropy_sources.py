@@ -0,0 +1,397 @@
+"""
+Entropy Source Backends
+
+QRNGService reads raw bits through the EntropySource interface, so the
+harvesting backend can be swapped without touching generate/generate_bytes:
+
+- AerSource: |+>^n circuit measured on Qiskit's AerSimulator (the default)
+- NumpyMeasurementSource: statevector-free simulation of H + measure. Each
+  qubit's outcome probability follows from the Born rule (1/2 for H|0>), so
+  a measurement is one fair coin flip sampled by NumPy. Orders of magnitude
+  faster than Aer; for development and load tests, not a physical source.
+- FileSource: reads a file, named pipe or character device, e.g. a hardware
+  QRNG exposed as /dev/qrandom0 or /dev/hwrng, or /dev/urandom as a local
+  stand-in.
+
+SourceMixer combines several sources. Each read is split in proportion to
+every source's measured throughput (times an optional static weight) and
+the parts are harvested in parallel, so all sources finish at about the
+same time. A source that raises is benched for a cooldown and its share
+goes to the others. Given one HealthMonitor per source, every part is run
+through its own source's continuous health tests: a failing part is
+discarded and only that source is quarantined and left out of the split,
+so one bad device does not stall the others.
+
+Sources are named in configuration as "aer", "numpy" or "file:<path>".
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from quantum.health_tests import EntropySourceQuarantined, HealthMonitor
+
+logger = logging.getLogger(__name__)
+
+# Smoothing for the per-source throughput estimate
+THROUGHPUT_EMA = 0.2
+
+
+class EntropySource(ABC):
+    """
+    Base class for raw entropy backends.
+
+    Subclasses implement _read(n_bytes) returning packed uint8 bits. read()
+    adds accounting, so throughput can be compared across sources.
+    """
+
+    name = "source"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bytes_read = 0
+        self.seconds = 0.0
+        self.errors = 0
+        self.throughput: Optional[float] = None  # EMA of bytes/sec
+
+    def read(self, n_bytes: int) -> np.ndarray:
+        """Return n_bytes of raw random bits as a packed uint8 array."""
+        if n_bytes <= 0:
+            return np.zeros(0, dtype=np.uint8)
+
+        started = time.perf_counter()
+        try:
+            data = self._read(n_bytes)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        elapsed = max(time.perf_counter() - started, 1e-9)
+
+        with self._lock:
+            self.bytes_read += n_bytes
+            self.seconds += elapsed
+            rate = n_bytes / elapsed
+            self.throughput = rate if self.throughput is None else (
+                THROUGHPUT_EMA * rate + (1 - THROUGHPUT_EMA) * self.throughput
+            )
+        return data
+
+    def time_read(self, n_bytes: int) -> float:
+        """
+        Seconds one raw read of n_bytes takes.
+
+        Bypasses read(), so benchmark bursts do not move the throughput
+        estimate that drives the production split.
+        """
+        started = time.perf_counter()
+        self._read(n_bytes)
+        return time.perf_counter() - started
+
+    @abstractmethod
+    def _read(self, n_bytes: int) -> np.ndarray:
+        """Return n_bytes of raw random bits as a packed uint8 array."""
+
+    def close(self):
+        """Release any handles held by the source."""
+
+    def stats(self) -> Dict[str, Any]:
+        """Bytes read, errors and measured throughput."""
+        with self._lock:
+            return {
+                "source": self.name,
+                "bytes_read": self.bytes_read,
+                "errors": self.errors,
+                "throughput_bytes_per_sec": self.throughput or 0.0,
+            }
+
+
+class AerSource(EntropySource):
+    """
+    Hadamard-and-measure circuit on the AerSimulator.
+
+    A single transpiled circuit is run with many shots and per-shot memory:
+    every shot of the n-qubit |+>^n circuit yields n bits, so one simulator
+    job produces up to circuit_qubits * max_shots_per_job bits.
+    """
+
+    name = "aer"
+
+    def __init__(self, circuit_qubits: int = 16, max_shots_per_job: int = 65536):
+        super().__init__()
+        from qiskit import QuantumCircuit, transpile
+        from qiskit_aer import AerSimulator
+
+        self.backend = AerSimulator()
+        self.circuit_qubits = circuit_qubits  # Bits produced per shot
+        self.max_shots_per_job = max_shots_per_job
+
+        # Superposition on every qubit, then measure all of them
+        qc = QuantumCircuit(circuit_qubits, circuit_qubits)
+        qc.h(range(circuit_qubits))
+        qc.measure(range(circuit_qubits), range(circuit_qubits))
+        self._circuit = transpile(qc, self.backend)
+
+    def shots_for(self, n_bits: int) -> int:
+        """Number of shots needed to harvest n_bits."""
+        return -(-n_bits // self.circuit_qubits)
+
+    def _read(self, n_bytes: int) -> np.ndarray:
+        n_bits = n_bytes * 8
+        chunks = []
+        remaining_shots = self.shots_for(n_bits)
+
+        while remaining_shots > 0:
+            shots = min(remaining_shots, self.max_shots_per_job)
+            result = self.backend.run(self._circuit, shots=shots, memory=True).result()
+            memory = result.get_memory(self._circuit)
+
+            # '0'/'1' characters -> bits, one row per shot; Qiskit prints
+            # qubit 0 last, so reverse each row for qubit order
+            bits = np.frombuffer("".join(memory).encode("ascii"), dtype=np.uint8) - ord("0")
+            chunks.append(bits.reshape(shots, self.circuit_qubits)[:, ::-1].ravel())
+            remaining_shots -= shots
+
+        bits = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+        return np.packbits(bits[:n_bits])
+
+
+class NumpyMeasurementSource(EntropySource):
+    """
+    Statevector-free H + measure simulator.
+
+    P(1) = |<1|H|0>|^2 = 1/2 for every qubit, and the qubits are
+    independent, so measuring 8 qubits is the same as drawing one uniform
+    byte from the generator.
+    """
+
+    name = "numpy"
+
+    def __init__(self, seed: Optional[int] = None):
+        super().__init__()
+        self._rng = np.random.Generator(np.random.PCG64DXSM(
+            secrets.randbits(128) if seed is None else seed
+        ))
+
+    def _read(self, n_bytes: int) -> np.ndarray:
+        with self._lock:  # Generators are not thread-safe
+            return np.frombuffer(self._rng.bytes(n_bytes), dtype=np.uint8)
+
+
+class FileSource(EntropySource):
+    """
+    Reads raw bits from a file, named pipe or character device.
+
+    Regular files are rewound at EOF only if loop=True (useful for replaying
+    captured hardware output in tests); pipes and devices must keep up.
+    """
+
+    def __init__(self, path: str, loop: bool = False):
+        super().__init__()
+        self.path = path
+        self.name = f"file:{path}"
+        self.loop = loop
+        self._file = open(path, "rb", buffering=0)
+        self._read_lock = threading.Lock()
+
+    def _read(self, n_bytes: int) -> np.ndarray:
+        out = bytearray()
+        with self._read_lock:
+            while len(out) < n_bytes:
+                chunk = self._file.read(n_bytes - len(out))
+                if not chunk:
+                    if self.loop and self._file.seekable() and (out or self._file.tell()):
+                        self._file.seek(0)
+                        continue
+                    raise EOFError(f"{self.path} returned {len(out)} of {n_bytes} bytes")
+                out += chunk
+        return np.frombuffer(bytes(out), dtype=np.uint8)
+
+    def close(self):
+        self._file.close()
+
+
+def make_source(spec: Union[str, EntropySource], **aer_options) -> EntropySource:
+    """
+    Build a source from its configuration name.
+
+    Args:
+        spec: "aer", "numpy", "file:<path>" or an EntropySource instance
+        aer_options: circuit_qubits / max_shots_per_job for AerSource
+    """
+    if isinstance(spec, EntropySource):
+        return spec
+    if spec == "aer":
+        return AerSource(**aer_options)
+    if spec == "numpy":
+        return NumpyMeasurementSource()
+    if spec.startswith("file:"):
+        return FileSource(spec[len("file:"):])
+    raise ValueError(f"Unknown entropy source '{spec}', expected aer, numpy or file:<path>")
+
+
+class SourceMixer:
+    """
+    Splits each read across several sources by measured throughput.
+
+    Attributes:
+        sources: The mixed sources, in configuration order
+        weights: Static multiplier per source (1.0 = pure throughput weighting)
+        cooldown_seconds: How long a failing source is left out
+        monitors: Continuous health tests per source (None = untested)
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[EntropySource],
+        weights: Optional[Sequence[float]] = None,
+        cooldown_seconds: float = 30.0,
+        monitors: Optional[Sequence[Optional[HealthMonitor]]] = None,
+    ):
+        if not sources:
+            raise ValueError("SourceMixer needs at least one source")
+        self.sources = list(sources)
+        self.weights = list(weights) if weights is not None else [1.0] * len(self.sources)
+        if len(self.weights) != len(self.sources):
+            raise ValueError("One weight per source is required")
+        self.monitors = list(monitors) if monitors is not None else [None] * len(self.sources)
+        if len(self.monitors) != len(self.sources):
+            raise ValueError("One health monitor per source is required")
+        self.cooldown_seconds = cooldown_seconds
+        self._benched_until = [0.0] * len(self.sources)
+        self._executor = (
+            ThreadPoolExecutor(max_workers=len(self.sources), thread_name_prefix="entropy-source")
+            if len(self.sources) > 1 else None
+        )
+
+    def _usable(self, health_checked: bool = True) -> List[bool]:
+        """Sources that may take part in a read: not quarantined, and not benched."""
+        healthy = [
+            not health_checked or monitor is None or not monitor.quarantined
+            for monitor in self.monitors
+        ]
+        now = time.monotonic()
+        active = [ok and now >= until for ok, until in zip(healthy, self._benched_until)]
+        return active if any(active) else healthy  # Every healthy source failed: try them again
+
+    def shares(self, health_checked: bool = True) -> List[float]:
+        """Fraction of each read assigned to each source right now."""
+        active = self._usable(health_checked)
+        if not any(active):
+            return [0.0] * len(self.sources)
+
+        measured = [s.throughput for s in self.sources if s.throughput]
+        default = float(np.mean(measured)) if measured else 1.0
+        raw = [
+            w * (s.throughput or default) if ok else 0.0
+            for s, w, ok in zip(self.sources, self.weights, active)
+        ]
+        total = sum(raw)
+        return [r / total for r in raw]
+
+    def read(self, n_bytes: int, health_checked: bool = True) -> np.ndarray:
+        """
+        Read n_bytes, each source contributing its share.
+
+        With health_checked, quarantined sources get no share and every part
+        must pass its source's health tests; a failing part is discarded and
+        re-read from the remaining sources. Without it (for on-demand
+        statistical tests of a failing source) the monitors are ignored.
+
+        Raises:
+            EntropySourceQuarantined: If every source is quarantined
+            RuntimeError: If every source failed
+        """
+        shares = self.shares(health_checked)
+        if not any(shares):
+            raise EntropySourceQuarantined("Every entropy source is quarantined")
+        sizes = [int(n_bytes * share) for share in shares]
+        sizes[int(np.argmax(shares))] += n_bytes - sum(sizes)
+
+        parts_to_read = [(i, size) for i, size in enumerate(sizes) if size > 0]
+        submit = self._executor.submit if len(parts_to_read) > 1 else _run_now
+        futures = [
+            (i, submit(self._read_part, i, size, health_checked)) for i, size in parts_to_read
+        ]
+        parts, failed, error = [], set(), None
+        for i, future in futures:
+            try:
+                parts.append(future.result())
+            except EntropySourceQuarantined as e:
+                # The source's monitor has logged the failure and quarantined it
+                failed.add(i)
+                error = e
+            except Exception as e:
+                logger.error(f"Entropy source {self.sources[i].name} failed: {e}, "
+                             f"benched for {self.cooldown_seconds:.0f}s")
+                self._benched_until[i] = time.monotonic() + self.cooldown_seconds
+                failed.add(i)
+                error = e
+
+        if failed:
+            usable = self._usable(health_checked)
+            if not any(ok and i not in failed for i, ok in enumerate(usable)):
+                if not any(usable):
+                    raise EntropySourceQuarantined("Every entropy source is quarantined") from error
+                raise RuntimeError(f"All entropy sources failed: {error}") from error
+            parts.append(self.read(sum(sizes[i] for i in failed), health_checked))
+        return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+    def _read_part(self, index: int, n_bytes: int, health_checked: bool) -> np.ndarray:
+        """Read from one source and run its continuous health tests on the block."""
+        data = self.sources[index].read(n_bytes)
+        monitor = self.monitors[index]
+        if health_checked and monitor is not None:
+            monitor.check(np.unpackbits(data))
+        return data
+
+    def benchmark(self, megabytes: float = 1.0) -> List[Dict[str, Any]]:
+        """
+        Read the same amount from every source on its own and report MB/s.
+
+        Raw reads only: counters, throughput estimates and health state are
+        left untouched.
+        """
+        n_bytes = int(megabytes * (1 << 20))
+        results = []
+        for source in self.sources:
+            try:
+                elapsed = max(source.time_read(n_bytes), 1e-9)
+                results.append({"source": source.name, "megabytes": megabytes,
+                                "seconds": elapsed, "mb_per_sec": megabytes / elapsed})
+            except Exception as e:
+                results.append({"source": source.name, "error": str(e)})
+        return results
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-source counters, current share and whether it is benched or quarantined."""
+        now = time.monotonic()
+        return [
+            {**source.stats(), "weight": weight, "share": share, "benched": now < until,
+             "quarantined": monitor is not None and monitor.quarantined}
+            for source, weight, share, until, monitor in zip(
+                self.sources, self.weights, self.shares(), self._benched_until, self.monitors
+            )
+        ]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        for source in self.sources:
+            source.close()
+
+
+def _run_now(fn: Callable[..., np.ndarray], *args) -> Future:
+    """Run fn in the calling thread, returning a completed Future like executor.submit."""
+    future: Future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
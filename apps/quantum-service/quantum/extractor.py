@@ -0,0 +1,203 @@
+"""
+Randomness Extractors / Conditioning
+
+Raw measurement bits are conditioned before they reach the entropy pool, so
+a source that is slightly biased or correlated still yields close-to-uniform
+output. Two conditioners are available:
+
+- Toeplitz hashing: y = T x over GF(2), with T an m x n Toeplitz matrix
+  defined by n + m - 1 random seed bits. T x is the middle of the linear
+  convolution of the seed with x, computed for a batch of blocks at once
+  with real FFTs. A strong two-universal extractor (leftover hash lemma).
+- SHA-3: every block of input bytes is hashed with SHA3-256, the vetted
+  conditioning function family of SP 800-90B.
+
+Both work on packed uint8 arrays. The output-to-input ratio is set at
+construction; bytes in/out and throughput are reported by stats(), and
+benchmark() measures MB/s on synthetic input.
+
+References:
+    - Krawczyk (1994), "LFSR-based Hashing and Authentication"
+    - Ma et al. (2013), "Postprocessing for quantum random-number generators:
+      Entropy evaluation and randomness extraction"
+    - NIST SP 800-90B (2018), section 3.1.5 (conditioning components)
+"""
+
+import hashlib
+import secrets
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+import scipy.fft
+
+CONDITIONERS = ("toeplitz", "sha3", "none")
+
+# Blocks transformed per FFT call, bounded by transform size to cap memory
+FFT_BATCH_POINTS = 1 << 22
+
+
+class Conditioner:
+    """
+    Block conditioner mapping block_bytes of input to output_bytes of output.
+
+    Subclasses implement _condition_blocks on a (blocks, block_bytes) array.
+    """
+
+    name = "none"
+
+    def __init__(self, block_bytes: int, output_bytes: int):
+        if not 0 < output_bytes <= block_bytes:
+            raise ValueError("Conditioner output must be between 1 byte and the block size")
+        self.block_bytes = block_bytes
+        self.output_bytes = output_bytes
+        self._lock = threading.Lock()
+
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    @property
+    def ratio(self) -> float:
+        """Output bytes per input byte."""
+        return self.output_bytes / self.block_bytes
+
+    def input_bytes_for(self, n_bytes: int) -> int:
+        """Input needed to produce at least n_bytes of output (whole blocks)."""
+        return -(-n_bytes // self.output_bytes) * self.block_bytes
+
+    def condition(self, data: np.ndarray) -> np.ndarray:
+        """
+        Condition packed input bytes; a trailing partial block is dropped.
+
+        Returns:
+            uint8 array of len(data) // block_bytes * output_bytes bytes
+        """
+        data = np.asarray(data, dtype=np.uint8)
+        n_blocks = len(data) // self.block_bytes
+        started = time.perf_counter()
+        blocks = data[:n_blocks * self.block_bytes].reshape(n_blocks, self.block_bytes)
+        out = self._condition_blocks(blocks).reshape(-1)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.bytes_in += n_blocks * self.block_bytes
+            self.bytes_out += len(out)
+            self.seconds += elapsed
+        return out
+
+    def _condition_blocks(self, blocks: np.ndarray) -> np.ndarray:
+        return blocks
+
+    def stats(self) -> Dict[str, Any]:
+        """Configuration, volume and throughput."""
+        with self._lock:
+            return {
+                "conditioner": self.name,
+                "block_bytes": self.block_bytes,
+                "output_bytes": self.output_bytes,
+                "ratio": self.ratio,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "throughput_in_bytes_per_sec": self.bytes_in / self.seconds if self.seconds > 0 else 0.0,
+            }
+
+
+class ToeplitzExtractor(Conditioner):
+    """
+    Toeplitz-hashing extractor evaluated with batched FFT convolution.
+
+    Attributes:
+        seed_bits: The n + m - 1 bits defining the Toeplitz matrix
+    """
+
+    name = "toeplitz"
+
+    def __init__(self, block_bytes: int = 512, ratio: float = 0.5, seed: Optional[bytes] = None):
+        """
+        Args:
+            block_bytes: Input block size n / 8
+            ratio: Output-to-input ratio m / n (rounded down to whole bytes)
+            seed: Matrix seed of at least (n + m - 1) / 8 bytes (random if None)
+        """
+        super().__init__(block_bytes, int(block_bytes * ratio))
+        n, m = 8 * self.block_bytes, 8 * self.output_bytes
+
+        seed_len = -(-(n + m - 1) // 8)
+        seed = secrets.token_bytes(seed_len) if seed is None else seed
+        if len(seed) < seed_len:
+            raise ValueError(f"Toeplitz seed needs {seed_len} bytes")
+        self.seed_bits = np.unpackbits(np.frombuffer(seed, dtype=np.uint8))[:n + m - 1]
+
+        self._fft_size = scipy.fft.next_fast_len(2 * n + m - 2, real=True)
+        self._seed_fft = scipy.fft.rfft(self.seed_bits.astype(np.float64), self._fft_size)
+        self._batch = max(1, FFT_BATCH_POINTS // self._fft_size)
+
+    def _condition_blocks(self, blocks: np.ndarray) -> np.ndarray:
+        n, m = 8 * self.block_bytes, 8 * self.output_bytes
+        bits = np.unpackbits(blocks, axis=1)
+        out = np.empty((len(blocks), self.output_bytes), dtype=np.uint8)
+
+        for start in range(0, len(bits), self._batch):
+            x = bits[start:start + self._batch].astype(np.float64)
+            spectrum = scipy.fft.rfft(x, self._fft_size, axis=1) * self._seed_fft
+            # y_i = sum_j s[i - j + n - 1] x_j, the middle of the full convolution
+            conv = scipy.fft.irfft(spectrum, self._fft_size, axis=1)[:, n - 1:n - 1 + m]
+            parity = (np.rint(conv).astype(np.int64) & 1).astype(np.uint8)
+            out[start:start + len(x)] = np.packbits(parity, axis=1)
+
+        return out
+
+
+class SHA3Conditioner(Conditioner):
+    """SHA3-256 over fixed-size input blocks (32 output bytes per block)."""
+
+    name = "sha3"
+
+    def __init__(self, ratio: float = 0.5):
+        """
+        Args:
+            ratio: Output-to-input ratio; sets the block size to 32 / ratio bytes
+        """
+        super().__init__(int(round(32 / ratio)), 32)
+
+    def _condition_blocks(self, blocks: np.ndarray) -> np.ndarray:
+        digests = b"".join(hashlib.sha3_256(block).digest() for block in blocks)
+        return np.frombuffer(digests, dtype=np.uint8).reshape(len(blocks), 32)
+
+
+def make_conditioner(name: str = "toeplitz", ratio: float = 0.5) -> Conditioner:
+    """Build a conditioner by name ("toeplitz", "sha3" or "none")."""
+    if name == "toeplitz":
+        return ToeplitzExtractor(ratio=ratio)
+    if name == "sha3":
+        return SHA3Conditioner(ratio=ratio)
+    if name == "none":
+        return Conditioner(1, 1)
+    raise ValueError(f"Unknown conditioner '{name}', expected one of {CONDITIONERS}")
+
+
+def benchmark(conditioner: Conditioner, megabytes: float = 4.0) -> Dict[str, float]:
+    """
+    Condition synthetic input and report throughput.
+
+    Calls the block transform directly so the conditioner's own counters
+    only ever reflect production traffic.
+    """
+    n_bytes = int(megabytes * (1 << 20)) // conditioner.block_bytes * conditioner.block_bytes
+    data = np.frombuffer(secrets.token_bytes(n_bytes), dtype=np.uint8)
+    blocks = data.reshape(-1, conditioner.block_bytes)
+
+    started = time.perf_counter()
+    out = conditioner._condition_blocks(blocks)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "conditioner": conditioner.name,
+        "ratio": conditioner.ratio,
+        "input_megabytes": n_bytes / (1 << 20),
+        "seconds": elapsed,
+        "input_mb_per_sec": n_bytes / (1 << 20) / elapsed,
+        "output_mb_per_sec": out.size / (1 << 20) / elapsed,
+    }
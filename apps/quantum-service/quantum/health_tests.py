@@ -0,0 +1,329 @@
+"""
+Entropy Source Health Tests
+
+Continuous tests run on every harvested block before it reaches the entropy
+pool, plus a statistical test subset that can be run on demand.
+
+Continuous (NIST SP 800-90B section 4.4), on the raw measurement bits:
+- Repetition Count Test: fails when one value repeats C times in a row
+- Adaptive Proportion Test: fails when the first bit of a W-bit window
+  appears C or more times in that window
+
+Both are vectorized over a whole block and keep their state (current run,
+partial window) across blocks, so results do not depend on block size.
+Cutoffs follow the standard for the claimed min-entropy per bit. The
+false-positive rate alpha applies per sample, and with one-bit samples at
+Mbit/s even 2^-20 would trip within seconds, so the default is 2^-40, the
+strict end of the range the standard recommends.
+
+A failing source is quarantined: HealthMonitor refuses further harvests
+from it until a cooldown has passed. Each source gets its own monitor, so
+SourceMixer leaves only the failing source out of the split; once every
+source is quarantined the pool drains and requests visibly fall back
+instead of serving bad bits.
+
+On demand (NIST SP 800-22 Rev. 1a), over megabit samples: frequency
+(monobit), block frequency, runs and serial tests.
+
+References:
+    - NIST SP 800-90B (2018), "Recommendation for the Entropy Sources Used
+      for Random Bit Generation"
+    - NIST SP 800-22 Rev. 1a (2010), "A Statistical Test Suite for Random
+      and Pseudorandom Number Generators for Cryptographic Applications"
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from scipy.special import erfc, gammaincc
+from scipy.stats import binom
+
+logger = logging.getLogger(__name__)
+
+
+class EntropySourceQuarantined(RuntimeError):
+    """The source failed a health test and is cooling down."""
+
+
+def repetition_count_cutoff(min_entropy: float = 1.0, alpha_exponent: int = 40) -> int:
+    """RCT cutoff C = 1 + ceil(-log2(alpha) / H)."""
+    return 1 + math.ceil(alpha_exponent / min_entropy)
+
+
+def adaptive_proportion_cutoff(
+    min_entropy: float = 1.0,
+    window: int = 1024,
+    alpha_exponent: int = 40,
+) -> int:
+    """APT cutoff C = 1 + CRITBINOM(W, 2^-H, 1 - alpha)."""
+    # isf(alpha) == ppf(1 - alpha) without losing alpha to float rounding
+    return int(binom.isf(2.0 ** -alpha_exponent, window, 2.0 ** -min_entropy)) + 1
+
+
+class RepetitionCountTest:
+    """SP 800-90B 4.4.1, with the current run carried between blocks."""
+
+    def __init__(self, cutoff: int):
+        self.cutoff = cutoff
+        self._last: Optional[int] = None
+        self._run = 0
+        self.max_run = 0
+
+    def update(self, bits: np.ndarray) -> bool:
+        """Feed a block of 0/1 samples; returns False if the test failed."""
+        if len(bits) == 0:
+            return True
+
+        changes = np.flatnonzero(bits[1:] != bits[:-1]) + 1
+        runs = np.diff(np.concatenate(([0], changes, [len(bits)])))
+        if bits[0] == self._last:
+            runs[0] += self._run
+
+        self._last = int(bits[-1])
+        self._run = int(runs[-1])
+        longest = int(runs.max())
+        self.max_run = max(self.max_run, longest)
+        return longest < self.cutoff
+
+    def reset(self):
+        self._last = None
+        self._run = 0
+
+
+class AdaptiveProportionTest:
+    """SP 800-90B 4.4.2, with the partial window carried between blocks."""
+
+    def __init__(self, cutoff: int, window: int = 1024):
+        self.cutoff = cutoff
+        self.window = window
+        self._pending = np.zeros(0, dtype=np.uint8)
+        self.max_count = 0
+        self.windows = 0
+
+    def update(self, bits: np.ndarray) -> bool:
+        """Feed a block of 0/1 samples; returns False if any complete window failed."""
+        samples = np.concatenate((self._pending, bits)) if len(self._pending) else bits
+        complete = len(samples) // self.window * self.window
+        self._pending = samples[complete:].copy()
+        if complete == 0:
+            return True
+
+        windows = samples[:complete].reshape(-1, self.window)
+        counts = (windows == windows[:, :1]).sum(axis=1)
+        self.windows += len(windows)
+        highest = int(counts.max())
+        self.max_count = max(self.max_count, highest)
+        return highest < self.cutoff
+
+    def reset(self):
+        self._pending = np.zeros(0, dtype=np.uint8)
+
+
+class HealthMonitor:
+    """
+    Continuous health tests plus quarantine for one entropy source.
+
+    Attributes:
+        name: Monitored source, for logs and stats
+        min_entropy: Claimed min-entropy per bit (sets the cutoffs)
+        cooldown_seconds: How long a failing source stays quarantined
+    """
+
+    def __init__(
+        self,
+        min_entropy: float = 1.0,
+        apt_window: int = 1024,
+        alpha_exponent: int = 40,
+        cooldown_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        name: str = "source",
+    ):
+        self.name = name
+        self.min_entropy = min_entropy
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self.rct = RepetitionCountTest(repetition_count_cutoff(min_entropy, alpha_exponent))
+        self.apt = AdaptiveProportionTest(
+            adaptive_proportion_cutoff(min_entropy, apt_window, alpha_exponent), apt_window
+        )
+
+        self.quarantined_until: Optional[float] = None
+        self.blocks_tested = 0
+        self.bits_tested = 0
+        self.rct_failures = 0
+        self.apt_failures = 0
+        self.quarantines = 0
+        self.last_failure: Optional[str] = None
+
+    @property
+    def quarantined(self) -> bool:
+        """True while a failed source is cooling down."""
+        with self._lock:
+            return self._quarantined()
+
+    def _quarantined(self) -> bool:
+        if self.quarantined_until is None:
+            return False
+        if self._clock() >= self.quarantined_until:
+            logger.info(f"Entropy source {self.name} released from quarantine")
+            self.quarantined_until = None
+            return False
+        return True
+
+    def ensure_available(self):
+        """Raise EntropySourceQuarantined if the source may not be used yet."""
+        with self._lock:
+            if self._quarantined():
+                remaining = self.quarantined_until - self._clock()
+                raise EntropySourceQuarantined(
+                    f"Entropy source {self.name} quarantined for another {remaining:.0f}s"
+                )
+
+    def check(self, bits: np.ndarray):
+        """
+        Run the continuous tests on a block of 0/1 samples.
+
+        Raises:
+            EntropySourceQuarantined: If a test failed; the block must be discarded
+        """
+        with self._lock:
+            rct_ok = self.rct.update(bits)
+            apt_ok = self.apt.update(bits)
+            self.blocks_tested += 1
+            self.bits_tested += len(bits)
+            if rct_ok and apt_ok:
+                return
+
+            self.rct_failures += not rct_ok
+            self.apt_failures += not apt_ok
+            failed = " and ".join(name for name, ok in (("repetition count", rct_ok),
+                                                        ("adaptive proportion", apt_ok)) if not ok)
+            self.last_failure = failed
+            self.quarantines += 1
+            self.quarantined_until = self._clock() + self.cooldown_seconds
+            # Start fresh once released
+            self.rct.reset()
+            self.apt.reset()
+
+        logger.error(f"Entropy source {self.name} failed {failed} test, "
+                     f"quarantined for {self.cooldown_seconds:.0f}s")
+        raise EntropySourceQuarantined(f"Entropy source {self.name} failed {failed} test")
+
+    def stats(self) -> Dict[str, Any]:
+        """Test cutoffs, failure counters and quarantine state."""
+        with self._lock:
+            quarantined = self._quarantined()
+            return {
+                "source": self.name,
+                "healthy": not quarantined,
+                "quarantined_for_seconds": (
+                    self.quarantined_until - self._clock() if quarantined else 0.0
+                ),
+                "min_entropy_per_bit": self.min_entropy,
+                "blocks_tested": self.blocks_tested,
+                "bits_tested": self.bits_tested,
+                "repetition_count": {
+                    "cutoff": self.rct.cutoff,
+                    "longest_run": self.rct.max_run,
+                    "failures": self.rct_failures,
+                },
+                "adaptive_proportion": {
+                    "cutoff": self.apt.cutoff,
+                    "window": self.apt.window,
+                    "highest_count": self.apt.max_count,
+                    "failures": self.apt_failures,
+                },
+                "quarantines": self.quarantines,
+                "last_failure": self.last_failure,
+            }
+
+
+# === SP 800-22 subset ===
+
+def frequency_test(bits: np.ndarray) -> float:
+    """Monobit test p-value."""
+    n = len(bits)
+    s = 2 * int(bits.sum()) - n
+    return float(erfc(abs(s) / math.sqrt(2 * n)))
+
+
+def block_frequency_test(bits: np.ndarray, block_size: int = 128) -> float:
+    """Frequency within M-bit blocks, p-value."""
+    n_blocks = len(bits) // block_size
+    proportions = bits[:n_blocks * block_size].reshape(n_blocks, block_size).mean(axis=1)
+    chi_squared = 4.0 * block_size * np.sum((proportions - 0.5) ** 2)
+    return float(gammaincc(n_blocks / 2.0, chi_squared / 2.0))
+
+
+def runs_test(bits: np.ndarray) -> float:
+    """Runs test p-value (0 if the monobit prerequisite fails)."""
+    n = len(bits)
+    pi = bits.mean()
+    if abs(pi - 0.5) >= 2.0 / math.sqrt(n):
+        return 0.0
+    runs = 1 + int(np.count_nonzero(bits[1:] != bits[:-1]))
+    spread = 2.0 * n * pi * (1.0 - pi)
+    return float(erfc(abs(runs - spread) / (2.0 * math.sqrt(2.0 * n) * pi * (1.0 - pi))))
+
+
+def _psi_squared(bits: np.ndarray, m: int) -> float:
+    """Serial test statistic over all overlapping (circular) m-bit patterns."""
+    if m <= 0:
+        return 0.0
+    n = len(bits)
+    extended = np.concatenate((bits, bits[:m - 1])).astype(np.int64)
+    patterns = np.zeros(n, dtype=np.int64)
+    for j in range(m):
+        patterns = (patterns << 1) | extended[j:j + n]
+    counts = np.bincount(patterns, minlength=1 << m)
+    return float((1 << m) / n * np.sum(counts.astype(float) ** 2) - n)
+
+
+def serial_test(bits: np.ndarray, m: Optional[int] = None) -> Dict[str, float]:
+    """Serial test p-values for pattern length m (default: largest recommended, at most 16)."""
+    if m is None:
+        m = max(3, min(16, int(math.log2(len(bits))) - 3))
+    psi = [_psi_squared(bits, m - k) for k in range(3)]
+    delta1 = psi[0] - psi[1]
+    delta2 = psi[0] - 2 * psi[1] + psi[2]
+    return {
+        "m": m,
+        "p_value_1": float(gammaincc(2 ** (m - 2), delta1 / 2.0)),
+        "p_value_2": float(gammaincc(2 ** (m - 3), delta2 / 2.0)),
+    }
+
+
+def sp800_22_suite(bits: np.ndarray, alpha: float = 0.01) -> Dict[str, Any]:
+    """
+    Run the frequency, block frequency, runs and serial tests.
+
+    Args:
+        bits: 0/1 samples, ideally 10^6 or more
+        alpha: Significance level for pass/fail
+
+    Returns:
+        p-values and pass flags per test, and an overall verdict
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    serial = serial_test(bits)
+    results = {
+        "frequency": {"p_value": frequency_test(bits)},
+        "block_frequency": {"p_value": block_frequency_test(bits)},
+        "runs": {"p_value": runs_test(bits)},
+        "serial": {**serial, "p_value": min(serial["p_value_1"], serial["p_value_2"])},
+    }
+    for result in results.values():
+        result["pass"] = result["p_value"] >= alpha
+
+    return {
+        "n_bits": int(len(bits)),
+        "alpha": alpha,
+        "tests": results,
+        "overall_pass": all(r["pass"] for r in results.values()),
+    }
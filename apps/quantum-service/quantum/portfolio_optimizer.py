@@ -4,6 +4,10 @@ Quantum Portfolio Optimizer using VQE (Variational Quantum Eigensolver)
 Implements the Mean-Variance Portfolio Optimization as a Quadratic
 Unconstrained Binary Optimization (QUBO) problem solved via VQE.
 
+Continuous weights are solved by default with the native NumPy solver in
+quantum.mean_variance, which scales to books of hundreds of assets; the
+QUBO/VQE path is kept as solver="vqe".
+
 Mathematical formulation:
     min w^T Σ w - μ · w^T r
     
@@ -20,7 +24,7 @@ References:
 """
 
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 import logging
 
 # Qiskit imports
@@ -40,8 +44,16 @@ except ImportError:
     ESTIMATOR_AVAILABLE = False
     Estimator = None
 
+from quantum.mean_variance import infeasible_mask, lipschitz_constant, solve_mean_variance
+from quantum.result_cache import ResultCache, content_key
+
 logger = logging.getLogger(__name__)
 
+SOLVERS = ("native", "vqe")
+
+# Parameters hashed as NumPy arrays when building cache keys
+CACHE_ARRAY_PARAMS = ("expected_returns", "covariance_matrix")
+
 
 class PortfolioOptimizer:
     """
@@ -51,17 +63,28 @@ class PortfolioOptimizer:
         backend: Quantum simulator backend
         max_iterations: Maximum VQE iterations
         num_qubits_per_asset: Bits of precision per asset weight
+        solver: Default solver, "native" (convex QP) or "vqe"
+        cache: LRU+TTL cache of optimize/analyze_risk results
     """
 
     def __init__(
         self,
         max_iterations: int = 500,
         num_qubits_per_asset: int = 3,
+        solver: str = "native",
+        cache_size: int = 1024,
+        cache_ttl: float = 300.0,
+        cache_decimals: int = 10,
     ):
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown solver '{solver}', expected one of {SOLVERS}")
         self.backend = AerSimulator()
         self.max_iterations = max_iterations
         self.num_qubits_per_asset = num_qubits_per_asset
+        self.solver = solver
         self.estimator = Estimator() if ESTIMATOR_AVAILABLE else None
+        self.cache = ResultCache(max_entries=cache_size, ttl_seconds=cache_ttl)
+        self.cache_decimals = cache_decimals
 
     def optimize(
         self,
@@ -71,6 +94,8 @@ class PortfolioOptimizer:
         risk_tolerance: float = 0.5,
         budget: float = 1.0,
         constraints: Optional[Dict[str, Any]] = None,
+        solver: Optional[str] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         Perform quantum portfolio optimization.
@@ -82,60 +107,428 @@ class PortfolioOptimizer:
             risk_tolerance: 0 (conservative) to 1 (aggressive)
             budget: Total portfolio value to allocate
             constraints: Additional constraints (min/max per asset)
+            solver: Override the default solver ("native" or "vqe")
+            use_cache: Serve/store the result through the result cache
 
         Returns:
             Dictionary with optimal allocations and metrics
         """
+        params = {
+            "assets": assets,
+            "expected_returns": expected_returns,
+            "covariance_matrix": covariance_matrix,
+            "risk_tolerance": risk_tolerance,
+            "budget": budget,
+            "constraints": constraints,
+            "solver": solver,
+        }
+        return self._cached("optimize", params, self._optimize, use_cache)
+
+    def _optimize(
+        self,
+        assets: List[str],
+        expected_returns: List[float],
+        covariance_matrix: List[List[float]],
+        risk_tolerance: float,
+        budget: float,
+        constraints: Optional[Dict[str, Any]],
+        solver: str,
+    ) -> Dict[str, Any]:
+        """Uncached body of optimize()."""
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown solver '{solver}', expected one of {SOLVERS}")
+
         n_assets = len(assets)
         returns = np.array(expected_returns)
         cov_matrix = np.array(covariance_matrix)
 
-        # Convert risk tolerance to risk aversion parameter
-        # μ maps from [0,1] to [0.1, 10] exponentially
-        risk_aversion = 10 ** (2 * risk_tolerance - 1)
+        risk_aversion = self._risk_aversion(risk_tolerance)
 
         logger.info(
-            f"Optimizing portfolio with {n_assets} assets, risk_aversion={risk_aversion:.2f}")
-
-        # Create quadratic program
-        qp = self._create_quadratic_program(
-            assets, returns, cov_matrix, risk_aversion, budget, constraints
-        )
+            f"Optimizing portfolio with {n_assets} assets, risk_aversion={risk_aversion:.2f}, solver={solver}")
 
-        # For small problems, use classical solver first as reference
-        if n_assets <= 4:
-            classical_result = self._solve_classical(qp)
+        if solver == "native":
+            lower, upper = self._weight_bounds(assets, budget, constraints)
+            solver_result = self._solve_native(
+                returns, cov_matrix, risk_aversion, lower, upper, budget
+            )
+            allocations = {
+                asset: float(solver_result["solution"][i])
+                for i, asset in enumerate(assets)
+            }
         else:
-            classical_result = None
+            # Create quadratic program
+            qp = self._create_quadratic_program(
+                assets, returns, cov_matrix, risk_aversion, budget, constraints
+            )
 
-        # Solve using VQE
-        vqe_result = self._solve_vqe(qp, n_assets)
+            # For small problems, use classical solver first as reference
+            if n_assets <= 4:
+                classical_result = self._solve_classical(qp)
+            else:
+                classical_result = None
 
-        # Extract allocations
-        allocations = self._extract_allocations(
-            vqe_result, assets, budget
-        )
+            # Solve using VQE
+            solver_result = self._solve_vqe(qp, n_assets)
+
+            # Extract allocations
+            allocations = self._extract_allocations(
+                solver_result, assets, budget
+            )
 
         # Calculate portfolio metrics
         weights = np.array([allocations[a] for a in assets])
-        expected_return = float(np.dot(weights, returns))
-        portfolio_variance = float(
-            np.dot(weights, np.dot(cov_matrix, weights)))
-        portfolio_risk = np.sqrt(portfolio_variance)
+        expected_return, portfolio_risk, sharpe_ratio = self._portfolio_metrics(
+            weights[None], returns[None], cov_matrix[None]
+        )
+
+        return {
+            "allocations": allocations,
+            "expected_return": float(expected_return[0]),
+            "expected_risk": float(portfolio_risk[0]),
+            "sharpe_ratio": float(sharpe_ratio[0]),
+            "quantum_circuit_depth": solver_result.get("circuit_depth", 0),
+            "optimization_iterations": solver_result.get("iterations", 0),
+            "convergence_achieved": solver_result.get("converged", True),
+        }
+
+    def efficient_frontier(
+        self,
+        assets: List[str],
+        expected_returns: List[float],
+        covariance_matrix: List[List[float]],
+        n_points: int = 50,
+        budget: float = 1.0,
+        constraints: Optional[Dict[str, Any]] = None,
+        min_risk_tolerance: float = 0.0,
+        max_risk_tolerance: float = 1.0,
+    ) -> Dict[str, Any]:
+        """
+        Trace the efficient frontier over a grid of risk tolerances.
+
+        Only the linear term μ·r of the QP changes along the sweep, so the
+        problem data is prepared once: the gradient Lipschitz constant is
+        estimated once, KKT factorizations are cached per active set, and each
+        point is warm-started from its neighbour's solution. Neighbouring points
+        usually share an active set, which makes them a single triangular solve.
+
+        Args:
+            assets: List of asset symbols
+            expected_returns: Expected return for each asset
+            covariance_matrix: Covariance matrix of returns
+            n_points: Number of frontier points
+            budget: Total portfolio value to allocate
+            constraints: Additional constraints (min/max per asset)
+            min_risk_tolerance: Risk tolerance of the first point
+            max_risk_tolerance: Risk tolerance of the last point
+
+        Returns:
+            Dictionary with the frontier points (allocations, return, risk,
+            Sharpe ratio) ordered from conservative to aggressive
+        """
+        if n_points < 1:
+            raise ValueError("n_points must be at least 1")
+
+        returns = np.array(expected_returns, dtype=float)
+        cov_matrix = np.array(covariance_matrix, dtype=float)
+        lower, upper = self._weight_bounds(assets, budget, constraints)
+        tolerances = np.linspace(min_risk_tolerance, max_risk_tolerance, n_points)
+
+        logger.info(f"Tracing efficient frontier with {len(assets)} assets, {n_points} points")
+
+        lipschitz = lipschitz_constant(cov_matrix[None])
+        kkt_cache: Dict[bytes, Any] = {}
+        weights = []
+        iterations = []
+        converged = []
+        previous = None
+
+        for risk_tolerance in tolerances:
+            solved = solve_mean_variance(
+                cov_matrix, returns, self._risk_aversion(risk_tolerance), lower, upper, budget,
+                initial_weights=previous, lipschitz=lipschitz, kkt_cache=kkt_cache,
+            )
+            previous = solved["solution"]
+            weights.append(previous)
+            iterations.append(solved["iterations"])
+            converged.append(solved["converged"])
+
+        weights = np.array(weights)
+        n = len(tolerances)
+        expected_return, risk, sharpe = self._portfolio_metrics(
+            weights, np.broadcast_to(returns, (n, len(assets))),
+            np.broadcast_to(cov_matrix, (n,) + cov_matrix.shape),
+        )
+
+        points = [
+            {
+                "risk_tolerance": float(tolerances[k]),
+                "allocations": {asset: float(weights[k, i]) for i, asset in enumerate(assets)},
+                "expected_return": float(expected_return[k]),
+                "expected_risk": float(risk[k]),
+                "sharpe_ratio": float(sharpe[k]),
+                "optimization_iterations": int(iterations[k]),
+                "convergence_achieved": bool(converged[k]),
+            }
+            for k in range(n)
+        ]
+
+        return {
+            "points": points,
+            "max_sharpe_index": int(np.argmax(sharpe)),
+            "kkt_factorizations": len(kkt_cache),
+        }
+
+    def optimize_many(
+        self,
+        problems: Iterable[Dict[str, Any]],
+        chunk_size: int = 256,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Optimize many independent portfolios, yielding results in input order.
+
+        Problems are consumed in chunks of chunk_size. Within a chunk, problems
+        with the same number of assets are stacked into (batch, n, n) arrays and
+        solved together by the native solver, so thousands of small books cost
+        a handful of array operations instead of thousands of solver setups.
+
+        Args:
+            problems: Dicts with the keyword arguments of optimize()
+            chunk_size: Number of problems solved per stacking round
+
+        Yields:
+            One result per problem, as returned by optimize(). A problem that
+            cannot be solved yields {"error": message} instead.
+        """
+        chunk = []
+        for problem in problems:
+            chunk.append(problem)
+            if len(chunk) >= chunk_size:
+                yield from self._optimize_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._optimize_chunk(chunk)
+
+    def _optimize_chunk(self, problems: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Solve one chunk of optimize_many, grouping native problems by size."""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(problems)
+        cache_keys: Dict[int, str] = {}
+        groups: Dict[int, List[int]] = {}
+
+        for i, problem in enumerate(problems):
+            if (problem.get("solver") or self.solver) != "native":
+                results[i] = self._optimize_or_error(problem)
+                continue
+
+            if problem.get("use_cache", True):
+                try:
+                    key = self.cache_key("optimize", problem)
+                except (KeyError, TypeError, ValueError):
+                    key = None
+                if key is not None:
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        results[i] = cached
+                        continue
+                    cache_keys[i] = key
+
+            groups.setdefault(len(problem["assets"]), []).append(i)
+
+        for n_assets, indices in groups.items():
+            try:
+                solved = self._optimize_stacked([problems[i] for i in indices])
+            except (KeyError, TypeError, ValueError) as e:
+                # Malformed input somewhere in the group: isolate it
+                logger.warning(f"Stacked solve of {len(indices)} problems failed: {e}")
+                solved = [self._optimize_or_error(problems[i]) for i in indices]
+            for i, result in zip(indices, solved):
+                results[i] = result
+                if i in cache_keys and "error" not in result:
+                    self.cache.put(cache_keys[i], result)
+
+        return results
+
+    def canonical_params(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Parameters of an optimize/analyze_risk call with defaults filled in.
+
+        Equivalent calls map to the same dict, and therefore the same cache key.
+        Extra keys such as use_cache are dropped.
+        """
+        if method == "optimize":
+            return {
+                "assets": params["assets"],
+                "expected_returns": params["expected_returns"],
+                "covariance_matrix": params["covariance_matrix"],
+                "risk_tolerance": params.get("risk_tolerance", 0.5),
+                "budget": params.get("budget", 1.0),
+                "constraints": params.get("constraints"),
+                "solver": params.get("solver") or self.solver,
+            }
+        if method == "analyze_risk":
+            return {
+                "assets": params["assets"],
+                "expected_returns": params["expected_returns"],
+                "covariance_matrix": params["covariance_matrix"],
+                "allocations": params.get("allocations"),
+            }
+        raise ValueError(f"Results of '{method}' are not cached")
+
+    def cache_key(self, method: str, params: Dict[str, Any]) -> str:
+        """Content-addressed cache key for a call of optimize/analyze_risk."""
+        return content_key(
+            method, self.canonical_params(method, params), CACHE_ARRAY_PARAMS, self.cache_decimals
+        )
+
+    def cache_stats(self, include_entries: bool = True) -> Dict[str, Any]:
+        """Hit/miss counters and per-entry ages of the result cache."""
+        return self.cache.stats(include_entries=include_entries)
+
+    def _cached(
+        self,
+        method: str,
+        params: Dict[str, Any],
+        compute: Callable[..., Dict[str, Any]],
+        use_cache: bool,
+    ) -> Dict[str, Any]:
+        """Serve a call from the result cache, computing and storing it on a miss."""
+        params = self.canonical_params(method, params)
+        if not use_cache:
+            return compute(**params)
+
+        key = self.cache_key(method, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = compute(**params)
+        self.cache.put(key, result)
+        return result
+
+    def _optimize_stacked(self, problems: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Solve same-size native problems together as one 3-D batch."""
+        n_assets = len(problems[0]["assets"])
+        returns = np.array([p["expected_returns"] for p in problems], dtype=float)
+        cov = np.array([p["covariance_matrix"] for p in problems], dtype=float)
+        if returns.shape != (len(problems), n_assets) or cov.shape != (len(problems), n_assets, n_assets):
+            raise ValueError("expected_returns/covariance_matrix do not match the number of assets")
+
+        budget = np.array([p.get("budget", 1.0) for p in problems], dtype=float)
+        risk_aversion = self._risk_aversion(
+            np.array([p.get("risk_tolerance", 0.5) for p in problems], dtype=float)
+        )
+        bounds = [
+            self._weight_bounds(p["assets"], b, p.get("constraints"))
+            for p, b in zip(problems, budget)
+        ]
+        lower = np.array([lo for lo, _ in bounds])
+        upper = np.array([hi for _, hi in bounds])
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(problems)
+        feasible = ~infeasible_mask(lower, upper, budget)
+        for i in np.flatnonzero(~feasible):
+            results[i] = {"error": f"Infeasible weight bounds for budget {budget[i]:.6g}"}
+
+        idx = np.flatnonzero(feasible)
+        if idx.size:
+            logger.info(f"Optimizing {idx.size} stacked portfolios with {n_assets} assets")
+            solved = solve_mean_variance(
+                cov[idx], returns[idx], risk_aversion[idx], lower[idx], upper[idx], budget[idx]
+            )
+            weights = solved["solution"]
+            expected_return, risk, sharpe = self._portfolio_metrics(weights, returns[idx], cov[idx])
+
+            for k, i in enumerate(idx):
+                results[i] = {
+                    "allocations": {
+                        asset: float(weights[k, j])
+                        for j, asset in enumerate(problems[i]["assets"])
+                    },
+                    "expected_return": float(expected_return[k]),
+                    "expected_risk": float(risk[k]),
+                    "sharpe_ratio": float(sharpe[k]),
+                    "quantum_circuit_depth": 0,
+                    "optimization_iterations": int(solved["iterations"][k]),
+                    "convergence_achieved": bool(solved["converged"][k]),
+                }
+
+        return results
+
+    def _optimize_or_error(self, problem: Dict[str, Any]) -> Dict[str, Any]:
+        """Run optimize() for one problem, turning failures into an error entry."""
+        try:
+            return self.optimize(**problem)
+        except Exception as e:
+            return {"error": str(e)}
+
+    @staticmethod
+    def _risk_aversion(risk_tolerance: Any) -> Any:
+        """
+        Convert risk tolerance to the risk aversion parameter μ.
+
+        μ maps from [0,1] to [0.1, 10] exponentially.
+        """
+        return 10 ** (2 * risk_tolerance - 1)
+
+    @staticmethod
+    def _portfolio_metrics(
+        weights: np.ndarray,
+        returns: np.ndarray,
+        cov_matrix: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Expected return, risk and Sharpe ratio for stacked (batch, n) weights."""
+        expected_return = np.einsum("bi,bi->b", weights, returns)
+        portfolio_variance = np.einsum("bi,bij,bj->b", weights, cov_matrix, weights)
+        portfolio_risk = np.sqrt(np.maximum(portfolio_variance, 0.0))
 
         # Sharpe ratio (assuming risk-free rate of 0.02)
         risk_free_rate = 0.02
-        sharpe_ratio = (expected_return - risk_free_rate) / \
-            portfolio_risk if portfolio_risk > 0 else 0
+        sharpe_ratio = np.divide(
+            expected_return - risk_free_rate,
+            portfolio_risk,
+            out=np.zeros_like(portfolio_risk),
+            where=portfolio_risk > 0,
+        )
+        return expected_return, portfolio_risk, sharpe_ratio
+
+    def _weight_bounds(
+        self,
+        assets: List[str],
+        budget: float,
+        constraints: Optional[Dict[str, Any]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-asset (lower, upper) weight bounds from min_<asset>/max_<asset> constraints."""
+        lower = np.zeros(len(assets))
+        upper = np.full(len(assets), float(budget))
+
+        if constraints:
+            for i, asset in enumerate(assets):
+                if f"min_{asset}" in constraints:
+                    lower[i] = constraints[f"min_{asset}"]
+                if f"max_{asset}" in constraints:
+                    upper[i] = constraints[f"max_{asset}"]
+
+        return lower, upper
 
+    def _solve_native(
+        self,
+        returns: np.ndarray,
+        cov_matrix: np.ndarray,
+        risk_aversion: float,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        budget: float,
+    ) -> Dict[str, Any]:
+        """Solve the continuous mean-variance QP directly with the native solver."""
+        result = solve_mean_variance(
+            cov_matrix, returns, risk_aversion, lower, upper, budget
+        )
         return {
-            "allocations": allocations,
-            "expected_return": expected_return,
-            "expected_risk": portfolio_risk,
-            "sharpe_ratio": sharpe_ratio,
-            "quantum_circuit_depth": vqe_result.get("circuit_depth", 0),
-            "optimization_iterations": vqe_result.get("iterations", 0),
-            "convergence_achieved": vqe_result.get("converged", True),
+            "solution": result["solution"],
+            "optimal_value": result["optimal_value"],
+            "circuit_depth": 0,
+            "iterations": result["iterations"],
+            "converged": result["converged"],
         }
 
     def _create_quadratic_program(
@@ -152,17 +545,9 @@ class PortfolioOptimizer:
         qp = QuadraticProgram(name="portfolio_optimization")
 
         # Add continuous variables for weights
+        lower, upper = self._weight_bounds(assets, budget, constraints)
         for i, asset in enumerate(assets):
-            lower = 0.0
-            upper = budget
-
-            if constraints:
-                if f"min_{asset}" in constraints:
-                    lower = constraints[f"min_{asset}"]
-                if f"max_{asset}" in constraints:
-                    upper = constraints[f"max_{asset}"]
-
-            qp.continuous_var(lower, upper, name=f"w_{asset}")
+            qp.continuous_var(float(lower[i]), float(upper[i]), name=f"w_{asset}")
 
         # Objective: minimize risk - μ * return
         # = w^T Σ w - μ * r^T w
@@ -303,6 +688,7 @@ class PortfolioOptimizer:
         expected_returns: List[float],
         covariance_matrix: List[List[float]],
         allocations: Optional[Dict[str, float]] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         Perform risk analysis on a portfolio using quantum amplitude estimation.
@@ -311,7 +697,25 @@ class PortfolioOptimizer:
         - Value at Risk (VaR)
         - Conditional Value at Risk (CVaR)
         - Maximum Drawdown estimate
+
+        Results are served through the result cache unless use_cache is False.
         """
+        params = {
+            "assets": assets,
+            "expected_returns": expected_returns,
+            "covariance_matrix": covariance_matrix,
+            "allocations": allocations,
+        }
+        return self._cached("analyze_risk", params, self._analyze_risk, use_cache)
+
+    def _analyze_risk(
+        self,
+        assets: List[str],
+        expected_returns: List[float],
+        covariance_matrix: List[List[float]],
+        allocations: Optional[Dict[str, float]],
+    ) -> Dict[str, Any]:
+        """Uncached body of analyze_risk()."""
         n_assets = len(assets)
         returns = np.array(expected_returns)
         cov_matrix = np.array(covariance_matrix)
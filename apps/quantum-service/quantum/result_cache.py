@@ -0,0 +1,168 @@
+"""
+Result Cache for Portfolio Computations
+
+A small thread-safe LRU cache with a per-entry time-to-live, used by the
+portfolio optimizer to answer repeated requests (backend retries, several
+UIs polling the same book) without re-solving.
+
+Keys are content addresses: a SHA-256 over the NumPy inputs after float
+rounding, so numerically identical requests hit the same entry regardless
+of how their JSON was formatted.
+"""
+
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+
+def content_key(
+    namespace: str,
+    params: Dict[str, Any],
+    array_params: Iterable[str] = (),
+    decimals: int = 10,
+) -> str:
+    """
+    Canonical hash of a set of call parameters.
+
+    Args:
+        namespace: Name of the cached operation (e.g. "optimize")
+        params: Keyword arguments of the call
+        array_params: Names of parameters holding numeric arrays
+        decimals: Decimal places kept when rounding floats
+
+    Returns:
+        Hex digest identifying the parameters
+    """
+    array_params = set(array_params)
+    digest = hashlib.sha256(namespace.encode())
+
+    for name in sorted(params):
+        value = params[name]
+        digest.update(b"\x00" + name.encode() + b"\x00")
+        if name in array_params and value is not None:
+            # + 0.0 folds -0.0 into 0.0 after rounding
+            array = np.round(np.asarray(value, dtype=float), decimals) + 0.0
+            digest.update(str(array.shape).encode())
+            digest.update(np.ascontiguousarray(array).tobytes())
+        else:
+            digest.update(json.dumps(_round_floats(value, decimals), sort_keys=True, default=str).encode())
+
+    return digest.hexdigest()
+
+
+def _round_floats(value: Any, decimals: int) -> Any:
+    """Round floats nested in lists/dicts so JSON encoding is canonical."""
+    if isinstance(value, float):
+        return round(value, decimals) + 0.0
+    if isinstance(value, dict):
+        return {str(k): _round_floats(v, decimals) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_round_floats(v, decimals) for v in value]
+    return value
+
+
+class ResultCache:
+    """
+    LRU cache with a time-to-live per entry.
+
+    Values are deep-copied on the way in and out so callers can mutate
+    returned results freely.
+
+    Attributes:
+        max_entries: Maximum number of entries kept (0 disables caching)
+        ttl_seconds: Lifetime of an entry after insertion
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a copy of the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry["created"] > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            entry["hits"] += 1
+            self.hits += 1
+            value = entry["value"]
+
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Any):
+        """Insert or refresh an entry, evicting the least recently used."""
+        if self.max_entries <= 0:
+            return
+
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = {"value": value, "created": self._clock(), "hits": 0}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self, include_entries: bool = True) -> Dict[str, Any]:
+        """
+        Cache counters and, optionally, the age of every live entry.
+
+        Expired entries are purged first so the reported size is accurate.
+        """
+        with self._lock:
+            now = self._clock()
+            expired = [k for k, e in self._entries.items() if now - e["created"] > self.ttl_seconds]
+            for key in expired:
+                del self._entries[key]
+            self.expirations += len(expired)
+
+            lookups = self.hits + self.misses
+            stats = {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+            if include_entries:
+                # Most recently used first
+                stats["entries"] = [
+                    {"key": key[:16], "age_seconds": now - e["created"], "hits": e["hits"]}
+                    for key, e in reversed(self._entries.items())
+                ]
+
+        return stats
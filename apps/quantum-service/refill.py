@@ -0,0 +1,137 @@
+"""
+Background Refill Workers
+
+EntropyPool and KeypairPool both hold a buffer of expensive-to-produce
+items that a background thread tops up whenever the level drops below a
+low-watermark. RefillingPool is the shared scaffold:
+
+- start() launches a daemon thread that only holds a weak reference to
+  the pool, so an abandoned pool is collected and its thread exits within
+  IDLE_POLL_SECONDS.
+- stop() wakes the thread and joins it. Services call it from their
+  close(), which the API lifespan runs on shutdown while executors (e.g.
+  the one the Aer simulator uses) still accept work.
+- Pools that were never stopped explicitly are stopped by an atexit hook.
+  The threads are daemons, so a refill stuck in native code never blocks
+  interpreter exit.
+
+Subclasses provide the level property and fill().
+"""
+
+from abc import ABC, abstractmethod
+import atexit
+import logging
+import threading
+from typing import Optional
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Seconds the idle refill worker sleeps before checking its pool still exists
+IDLE_POLL_SECONDS = 1.0
+
+# Seconds the refill worker backs off after a failed fill
+ERROR_BACKOFF_SECONDS = 1.0
+
+_live_pools: "weakref.WeakSet[RefillingPool]" = weakref.WeakSet()
+
+
+class RefillingPool(ABC):
+    """
+    Base class for pools refilled by a background worker thread.
+
+    Attributes:
+        name: Used for the worker thread name and logs
+        low_watermark: Level below which the refill worker wakes up
+        refill_errors: Failed background fills
+    """
+
+    # Describes the pooled items in thread names and logs, e.g. "entropy"
+    kind = "refill"
+
+    def __init__(self, name: str, low_watermark: int):
+        self.name = name
+        self.low_watermark = low_watermark
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.refill_errors = 0
+
+    @property
+    @abstractmethod
+    def level(self) -> int:
+        """Items currently available."""
+
+    @property
+    def refill_worker_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @abstractmethod
+    def fill(self) -> int:
+        """Refill synchronously to capacity and return the number of items added."""
+
+    def start(self):
+        """Start the background refill worker (idempotent)."""
+        with self._lock:
+            if self.refill_worker_running:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=_refill_worker, args=(weakref.ref(self),),
+                name=f"{self.name}-{self.kind}-refill", daemon=True,
+            )
+            self._thread.start()
+        _live_pools.add(self)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the refill worker."""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        _live_pools.discard(self)
+
+    def _refill_once(self) -> bool:
+        """
+        Wait (up to IDLE_POLL_SECONDS) for the level to drop below the
+        low-watermark, then refill.
+
+        Returns:
+            False once the pool is stopping
+        """
+        with self._wakeup:
+            if not self._stopping and self.level >= self.low_watermark:
+                self._wakeup.wait(IDLE_POLL_SECONDS)
+            if self._stopping:
+                return False
+            if self.level >= self.low_watermark:
+                return True
+
+        try:
+            self.fill()
+        except Exception as e:
+            self.refill_errors += 1
+            logger.error(f"{self.kind.capitalize()} pool {self.name} refill failed: {e}")
+            with self._wakeup:
+                self._wakeup.wait(ERROR_BACKOFF_SECONDS)
+        return True
+
+
+def _refill_worker(pool_ref: "weakref.ref[RefillingPool]"):
+    """Background refill loop; exits when the pool is stopped or garbage collected."""
+    while True:
+        pool = pool_ref()
+        if pool is None or not pool._refill_once():
+            return
+        del pool
+
+
+def _stop_all_pools():
+    for pool in list(_live_pools):
+        pool.stop()
+
+
+atexit.register(_stop_all_pools)
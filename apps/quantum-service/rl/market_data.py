@@ -0,0 +1,340 @@
+"""
+Historical Market Data Replay
+
+Trains the trading agent on recorded returns instead of simulated paths.
+Panels are (n_periods, n_assets) float32 return matrices stored as .npy
+files and opened memory-mapped:
+
+- Episodes are random windows of the panel. A window (and a contiguous
+  block of assets within it) is a strided view of the mapping, so
+  sampling one copies nothing and only the pages actually stepped through
+  are read from disk.
+- Read-only mappings of the same file share the OS page cache, so any
+  number of rollout worker processes replay one dataset with a single
+  copy in memory. Panels and environments pickle as the file path plus
+  offsets and reopen the mapping on the other side.
+- Multi-year minute-bar panels over thousands of assets never have to fit
+  in RAM; conversion from price panels or Parquet streams in chunks.
+  Parquet support needs pyarrow, an optional dependency
+  (requirements-optional.txt).
+
+HistoricalReplayEnvironment replays one episode at a time;
+VectorizedReplayEnvironment keeps a window offset per environment and
+gathers the day's (n_envs, n_assets) returns straight from the mapping.
+TradingAgent.train(panel=...) trains on it, in process or in rollout
+workers.
+
+Missing values are written as a zero return (no change) during conversion.
+"""
+
+import logging
+import os
+from typing import Any, Dict, Optional, Sequence, Union
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from rl.trading_agent import TradingEnvironment, VectorizedTradingEnvironment
+
+try:
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+PANEL_DTYPE = np.float32
+# Rows converted per chunk when streaming prices or Parquet into a panel
+CONVERT_CHUNK_ROWS = 65536
+
+
+class MarketDataPanel:
+    """
+    Memory-mapped (n_periods, n_assets) return panel.
+
+    Attributes:
+        path: The .npy file
+        data: Read-only memmap of the panel
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: .npy file holding a 2-D return matrix
+
+        Raises:
+            ValueError: If the file does not hold a 2-D array
+        """
+        self.path = os.fspath(path)
+        self.data = np.load(self.path, mmap_mode="r")
+        if self.data.ndim != 2:
+            raise ValueError(f"Panel {self.path} must be 2-D (periods, assets), got shape {self.data.shape}")
+
+    @property
+    def n_periods(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def n_assets(self) -> int:
+        return self.data.shape[1]
+
+    def __len__(self) -> int:
+        return self.n_periods
+
+    def window(self, start: int, length: int, first_asset: int = 0, n_assets: Optional[int] = None) -> np.ndarray:
+        """
+        View of `length` periods from `start` over a contiguous asset block (no copy).
+
+        Raises:
+            ValueError: If the window falls outside the panel
+        """
+        n_assets = self.n_assets - first_asset if n_assets is None else n_assets
+        if not (0 <= start and start + length <= self.n_periods):
+            raise ValueError(f"Window [{start}, {start + length}) outside {self.n_periods} periods")
+        if not (0 <= first_asset and first_asset + n_assets <= self.n_assets):
+            raise ValueError(f"Assets [{first_asset}, {first_asset + n_assets}) outside {self.n_assets} assets")
+        return self.data[start:start + length, first_asset:first_asset + n_assets]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Workers reopen the mapping rather than receiving a copy of the data
+        return {"path": self.path}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__(state["path"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "periods": self.n_periods,
+            "assets": self.n_assets,
+            "dtype": str(self.data.dtype),
+            "size_mb": self.data.nbytes / 2**20,
+        }
+
+
+def write_panel(returns: np.ndarray, path: str) -> MarketDataPanel:
+    """Save an in-memory return matrix as a panel and open it mapped."""
+    panel = open_memmap(path, mode="w+", dtype=PANEL_DTYPE, shape=np.shape(returns))
+    panel[:] = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+    panel.flush()
+    del panel
+    return MarketDataPanel(path)
+
+
+def prices_to_returns(prices_path: str, returns_path: str, chunk_rows: int = CONVERT_CHUNK_ROWS) -> MarketDataPanel:
+    """
+    Convert a (n_periods, n_assets) price panel into a return panel of
+    n_periods - 1 rows, streaming chunk_rows rows at a time.
+    """
+    prices = np.load(prices_path, mmap_mode="r")
+    if prices.ndim != 2 or prices.shape[0] < 2:
+        raise ValueError(f"Price panel {prices_path} must be 2-D with at least two periods")
+
+    n_rows = prices.shape[0] - 1
+    returns = open_memmap(returns_path, mode="w+", dtype=PANEL_DTYPE, shape=(n_rows, prices.shape[1]))
+    for start in range(0, n_rows, chunk_rows):
+        stop = min(start + chunk_rows, n_rows)
+        returns[start:stop] = _simple_returns(prices[start:stop + 1])
+    returns.flush()
+    del returns
+    logger.info(f"Converted {n_rows} periods x {prices.shape[1]} assets from {prices_path}")
+    return MarketDataPanel(returns_path)
+
+
+def parquet_to_panel(
+    parquet_path: str,
+    npy_path: str,
+    columns: Optional[Sequence[str]] = None,
+    prices: bool = False,
+    chunk_rows: int = CONVERT_CHUNK_ROWS,
+) -> MarketDataPanel:
+    """
+    Stream a wide Parquet table (one column per asset, one row per period)
+    into a .npy panel without loading the table.
+
+    Args:
+        parquet_path: Source table
+        npy_path: Panel to write
+        columns: Asset columns in panel order (all columns if None)
+        prices: Columns hold prices rather than returns
+        chunk_rows: Rows per record batch
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet conversion requires pyarrow (see requirements-optional.txt)")
+
+    source = pq.ParquetFile(parquet_path)
+    columns = list(columns) if columns is not None else source.schema_arrow.names
+    n_rows = source.metadata.num_rows - (1 if prices else 0)
+    panel = open_memmap(npy_path, mode="w+", dtype=PANEL_DTYPE, shape=(n_rows, len(columns)))
+
+    row, previous = 0, None
+    for batch in source.iter_batches(batch_size=chunk_rows, columns=columns):
+        block = np.column_stack([
+            batch.column(i).to_numpy(zero_copy_only=False).astype(np.float64) for i in range(batch.num_columns)
+        ])
+        if prices:
+            # Carry the last price over so returns span batch boundaries
+            chunk = block if previous is None else np.vstack([previous, block])
+            previous = block[-1:]
+            block = _simple_returns(chunk)
+        else:
+            block = np.nan_to_num(block, nan=0.0, posinf=0.0, neginf=0.0)
+        panel[row:row + len(block)] = block
+        row += len(block)
+    panel.flush()
+    del panel
+    logger.info(f"Converted {n_rows} periods x {len(columns)} assets from {parquet_path}")
+    return MarketDataPanel(npy_path)
+
+
+def _simple_returns(prices: np.ndarray) -> np.ndarray:
+    """Period-over-period returns of consecutive price rows; missing prices give 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices[1:] / prices[:-1] - 1
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+class HistoricalReplayEnvironment(TradingEnvironment):
+    """
+    TradingEnvironment replaying random windows of a historical panel.
+
+    Each episode starts at a random period and, when the environment trades
+    fewer assets than the panel holds, at a random contiguous asset block
+    (or a fixed one with first_asset). Dynamics and rewards are those of
+    TradingEnvironment.
+    """
+
+    def __init__(
+        self,
+        panel: Union[MarketDataPanel, str],
+        n_assets: Optional[int] = None,
+        window: int = 252,
+        first_asset: Optional[int] = None,
+        initial_capital: float = 10000,
+        transaction_cost: float = 0.001,
+        max_daily_trades: int = 5,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            panel: Return panel or the path of its .npy file
+            n_assets: Assets per episode (all of the panel if None)
+            window: Periods per episode
+            first_asset: Fixed first asset of the block (random per episode if None)
+            seed: Seed for reproducible window sampling
+
+        Raises:
+            ValueError: If the panel is smaller than one episode
+        """
+        self.panel = panel if isinstance(panel, MarketDataPanel) else MarketDataPanel(panel)
+        n_assets = self.panel.n_assets if n_assets is None else n_assets
+        if window > self.panel.n_periods or n_assets > self.panel.n_assets:
+            raise ValueError(
+                f"Episode of {window} periods x {n_assets} assets does not fit panel "
+                f"of {self.panel.n_periods} x {self.panel.n_assets}"
+            )
+        self.first_asset = first_asset
+        self.episode_start = 0
+        self.episode_first_asset = 0
+
+        super().__init__(
+            n_assets=n_assets,
+            initial_capital=initial_capital,
+            transaction_cost=transaction_cost,
+            max_daily_trades=max_daily_trades,
+            max_steps=window,
+            seed=seed,
+        )
+
+    def _init_market(self, correlation: Optional[np.ndarray], seed: Optional[int]):
+        self.rng = np.random.default_rng(seed)
+
+    def _episode_returns(self) -> np.ndarray:
+        self.episode_start = int(self.rng.integers(0, self.panel.n_periods - self.max_steps + 1))
+        if self.first_asset is not None:
+            self.episode_first_asset = self.first_asset
+        else:
+            self.episode_first_asset = int(self.rng.integers(0, self.panel.n_assets - self.n_assets + 1))
+        return self._window()
+
+    def _window(self) -> np.ndarray:
+        return self.panel.window(self.episode_start, self.max_steps, self.episode_first_asset, self.n_assets)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Pickle the episode position, not the mapped window
+        state = self.__dict__.copy()
+        del state["_returns"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._returns = self._window()
+
+
+class VectorizedReplayEnvironment(VectorizedTradingEnvironment):
+    """
+    VectorizedTradingEnvironment replaying random windows of a historical panel.
+
+    Every environment has its own window start and asset block into the
+    mapped panel; each step gathers the current row of every window, so only
+    (n_envs, n_assets) values are read per step and nothing is copied up front.
+    """
+
+    def __init__(
+        self,
+        panel: Union[MarketDataPanel, str],
+        n_envs: int = 8,
+        n_assets: Optional[int] = None,
+        initial_capital: float = 10000,
+        transaction_cost: float = 0.001,
+        max_daily_trades: int = 5,
+        max_steps: int = 252,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            panel: Return panel or the path of its .npy file
+            n_envs: Environments stepped together
+            n_assets: Assets per environment (all of the panel if None)
+            max_steps: Periods per episode
+            seed: Seed for reproducible window sampling
+
+        Raises:
+            ValueError: If the panel is smaller than one episode
+        """
+        self.panel = panel if isinstance(panel, MarketDataPanel) else MarketDataPanel(panel)
+        n_assets = self.panel.n_assets if n_assets is None else n_assets
+        if max_steps > self.panel.n_periods or n_assets > self.panel.n_assets:
+            raise ValueError(
+                f"Episode of {max_steps} periods x {n_assets} assets does not fit panel "
+                f"of {self.panel.n_periods} x {self.panel.n_assets}"
+            )
+        super().__init__(
+            n_envs=n_envs,
+            n_assets=n_assets,
+            initial_capital=initial_capital,
+            transaction_cost=transaction_cost,
+            max_daily_trades=max_daily_trades,
+            max_steps=max_steps,
+            seed=seed,
+        )
+
+    def _init_market(self, correlation: Optional[np.ndarray], seed: Optional[int]):
+        self.rng = np.random.default_rng(seed)
+        self.episode_start = np.zeros(self.n_envs, dtype=np.int64)
+        self.episode_first_asset = np.zeros(self.n_envs, dtype=np.int64)
+        self._asset_offsets = np.arange(self.n_assets)
+
+    def _new_episodes(self, mask: np.ndarray):
+        n = int(mask.sum())
+        self.episode_start[mask] = self.rng.integers(0, self.panel.n_periods - self.max_steps + 1, n)
+        self.episode_first_asset[mask] = self.rng.integers(0, self.panel.n_assets - self.n_assets + 1, n)
+
+    def _day_returns(self) -> np.ndarray:
+        rows = (self.episode_start + self.day)[:, None]
+        columns = self.episode_first_asset[:, None] + self._asset_offsets
+        return self.panel.data[rows, columns].astype(np.float64)
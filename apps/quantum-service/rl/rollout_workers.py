@@ -0,0 +1,302 @@
+"""
+Multiprocess Rollout Workers
+
+PPO alternates between collecting a rollout and updating the policy. With
+the rollout on the trainer's own core, environment throughput is capped at
+one core. RolloutWorkerPool spreads collection over worker processes:
+
+- Each worker runs its own VectorizedTradingEnvironment and a CPU copy of
+  the PolicyNetwork (single-threaded torch, so workers do not contend).
+  Given a historical panel, workers run a VectorizedReplayEnvironment
+  instead and reopen the panel's .npy mapping themselves, so every worker
+  replays the same dataset out of the shared OS page cache.
+- After every PPO update the trainer writes the flattened policy
+  parameters into a shared-memory block and signals the workers; the
+  weights themselves never go through a pipe.
+- Workers write their trajectories straight into one shared-memory
+  rollout buffer, each into its own slice of the environment axis, so the
+  trainer reads a single (n_steps, n_workers * n_envs, ...) batch.
+
+Only small control messages travel over the pipes. Throughput in
+environment steps per second is tracked per collection and reported by
+stats().
+"""
+
+import atexit
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import time
+import traceback
+from typing import Any, Dict, Optional, Tuple, Union
+import weakref
+
+import numpy as np
+import torch
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+
+from rl.market_data import MarketDataPanel, VectorizedReplayEnvironment
+from rl.trading_agent import (
+    ROLLOUT_FIELDS,
+    PolicyNetwork,
+    VectorizedTradingEnvironment,
+    collect_rollout,
+    rollout_shapes,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a worker to start or finish a rollout
+WORKER_TIMEOUT_SECONDS = 300.0
+
+_live_pools: "weakref.WeakSet[RolloutWorkerPool]" = weakref.WeakSet()
+
+
+def _layout(shapes: Dict[str, Tuple[int, ...]]) -> Tuple[Dict[str, Tuple[Tuple[int, ...], int]], int]:
+    """Byte offset of each float32 array in a packed buffer, and the total size."""
+    layout, offset = {}, 0
+    for name, shape in shapes.items():
+        layout[name] = (shape, offset)
+        offset += int(np.prod(shape)) * 4
+    return layout, offset
+
+
+def _arrays(buffer, layout: Dict[str, Tuple[Tuple[int, ...], int]]) -> Dict[str, np.ndarray]:
+    return {
+        name: np.ndarray(shape, dtype=np.float32, buffer=buffer, offset=offset)
+        for name, (shape, offset) in layout.items()
+    }
+
+
+class RolloutWorkerPool:
+    """
+    Worker processes collecting rollouts into shared memory.
+
+    Attributes:
+        n_workers: Worker processes
+        n_envs: Environments per worker
+        n_steps: Steps per environment per rollout
+    """
+
+    def __init__(
+        self,
+        policy: "PolicyNetwork",
+        n_workers: int = 2,
+        n_envs: int = 8,
+        n_assets: int = 4,
+        n_steps: int = 252,
+        seed: Optional[int] = None,
+        panel: Optional[Union[MarketDataPanel, str]] = None,
+    ):
+        """
+        Start the workers with the current policy weights.
+
+        Args:
+            policy: Trainer policy; workers build a CPU copy of its architecture
+            n_workers: Worker processes
+            n_envs: Environments per worker
+            n_assets: Assets per environment
+            n_steps: Steps per environment per rollout
+            seed: Base seed (worker i uses seed + i) for reproducible rollouts
+            panel: Historical return panel (or its .npy path) to replay instead
+                of simulated returns; workers map the file themselves
+        """
+        self.n_workers = n_workers
+        self.n_envs = n_envs
+        self.n_steps = n_steps
+
+        state_dim = n_assets * 3 + 3
+        self._shapes = rollout_shapes(n_steps, n_workers * n_envs, state_dim, n_assets)
+        layout, size = _layout(self._shapes)
+        n_params = sum(p.numel() for p in policy.parameters())
+
+        self._rollout_shm = shared_memory.SharedMemory(create=True, size=size)
+        self._weights_shm = shared_memory.SharedMemory(create=True, size=n_params * 4)
+        self._rollout = _arrays(self._rollout_shm.buf, layout)
+        self._weights = np.ndarray((n_params,), dtype=np.float32, buffer=self._weights_shm.buf)
+        self.broadcast(policy)
+
+        config = {
+            "state_dim": state_dim,
+            "action_dim": n_assets,
+            "n_assets": n_assets,
+            "n_envs": n_envs,
+            "n_steps": n_steps,
+            "layout": layout,
+            "n_params": n_params,
+            "rollout_shm": self._rollout_shm.name,
+            "weights_shm": self._weights_shm.name,
+            "panel_path": panel.path if isinstance(panel, MarketDataPanel) else (
+                None if panel is None else os.fspath(panel)
+            ),
+        }
+
+        # spawn: the trainer may already run torch and logging threads
+        context = multiprocessing.get_context("spawn")
+        self._connections = []
+        self._processes = []
+        for worker_id in range(n_workers):
+            parent, child = context.Pipe()
+            worker_seed = None if seed is None else seed + worker_id
+            process = context.Process(
+                target=_rollout_worker, args=(child, worker_id, config, worker_seed),
+                name=f"rollout-worker-{worker_id}", daemon=True,
+            )
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+        self._wait("ready")
+        _live_pools.add(self)
+
+        self.collections = 0
+        self.steps = 0
+        self.collect_seconds = 0.0
+        self.last_steps_per_second = 0.0
+        logger.info(f"Rollout workers: {n_workers} x {n_envs} environments x {n_steps} steps")
+
+    @property
+    def total_envs(self) -> int:
+        return self.n_workers * self.n_envs
+
+    def broadcast(self, policy: "PolicyNetwork"):
+        """Publish the policy weights; workers load them at the start of the next rollout."""
+        with torch.no_grad():
+            self._weights[:] = parameters_to_vector(policy.parameters()).detach().cpu().numpy()
+
+    def collect(self) -> Dict[str, torch.Tensor]:
+        """
+        Run one rollout on every worker with the last broadcast weights.
+
+        Returns:
+            Tensors keyed by ROLLOUT_FIELDS, shaped (n_steps, total_envs, ...)
+            and copied out of shared memory
+
+        Raises:
+            RuntimeError: If a worker failed or did not answer in time
+        """
+        started = time.perf_counter()
+        for connection in self._connections:
+            connection.send("collect")
+        self._wait("done")
+        elapsed = time.perf_counter() - started
+
+        steps = self.n_steps * self.total_envs
+        self.collections += 1
+        self.steps += steps
+        self.collect_seconds += elapsed
+        self.last_steps_per_second = steps / elapsed if elapsed > 0 else 0.0
+
+        # Copy, so the next rollout can overwrite the buffer while this one is used
+        return {name: torch.from_numpy(self._rollout[name].copy()) for name in ROLLOUT_FIELDS}
+
+    def _wait(self, expected: str):
+        for worker_id, connection in enumerate(self._connections):
+            if not connection.poll(WORKER_TIMEOUT_SECONDS):
+                self.close()
+                raise RuntimeError(f"Rollout worker {worker_id} did not answer")
+            try:
+                status, detail = connection.recv()
+            except EOFError:
+                self._processes[worker_id].join(1.0)
+                status, detail = "exited", f"process exit code {self._processes[worker_id].exitcode}"
+            if status != expected:
+                self.close()
+                raise RuntimeError(f"Rollout worker {worker_id} failed: {detail}")
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        if not self._processes:
+            return
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(5.0)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()
+        self._processes, self._connections = [], []
+
+        # Drop the views before unmapping
+        self._rollout, self._weights = {}, None
+        for shm in (self._rollout_shm, self._weights_shm):
+            shm.close()
+            shm.unlink()
+        _live_pools.discard(self)
+
+    def stats(self) -> Dict[str, Any]:
+        """Collections, environment steps and steps per second."""
+        return {
+            "workers": self.n_workers,
+            "envs_per_worker": self.n_envs,
+            "collections": self.collections,
+            "env_steps": self.steps,
+            "collect_seconds": self.collect_seconds,
+            "steps_per_second": self.steps / self.collect_seconds if self.collect_seconds else 0.0,
+            "last_steps_per_second": self.last_steps_per_second,
+        }
+
+
+def _rollout_worker(connection, worker_id: int, config: Dict[str, Any], seed: Optional[int]):
+    """Worker loop: load broadcast weights, fill this worker's slice of the rollout buffer."""
+    torch.set_num_threads(1)
+    if seed is not None:
+        torch.manual_seed(seed)
+
+    rollout_shm = shared_memory.SharedMemory(name=config["rollout_shm"])
+    weights_shm = shared_memory.SharedMemory(name=config["weights_shm"])
+    out = rollout = weights = None
+    try:
+        rollout = _arrays(rollout_shm.buf, config["layout"])
+        envs = slice(worker_id * config["n_envs"], (worker_id + 1) * config["n_envs"])
+        # Views of this worker's environments; collect_rollout writes straight into shared memory
+        out = {name: array[:, envs] for name, array in rollout.items()}
+        weights = np.ndarray((config["n_params"],), dtype=np.float32, buffer=weights_shm.buf)
+
+        policy = PolicyNetwork(config["state_dim"], config["action_dim"])
+        policy.eval()
+        try:
+            vec_env = _make_env(config, seed)
+        except Exception:
+            connection.send(("error", traceback.format_exc()))
+            return
+        connection.send(("ready", None))
+
+        while True:
+            command = connection.recv()
+            if command is None:
+                break
+            try:
+                with torch.no_grad():
+                    vector_to_parameters(torch.from_numpy(weights.copy()), policy.parameters())
+                collect_rollout(policy, vec_env, config["n_steps"], out=out)
+                connection.send(("done", None))
+            except Exception:
+                connection.send(("error", traceback.format_exc()))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        out = rollout = weights = None
+        rollout_shm.close()
+        weights_shm.close()
+
+
+def _make_env(config: Dict[str, Any], seed: Optional[int]) -> VectorizedTradingEnvironment:
+    """This worker's environments: panel replay if configured, else simulated."""
+    common = {"n_envs": config["n_envs"], "n_assets": config["n_assets"], "max_steps": config["n_steps"], "seed": seed}
+    if config["panel_path"] is not None:
+        return VectorizedReplayEnvironment(config["panel_path"], **common)
+    return VectorizedTradingEnvironment(**common)
+
+
+def _close_all_pools():
+    for pool in list(_live_pools):
+        pool.close()
+
+
+atexit.register(_close_all_pools)
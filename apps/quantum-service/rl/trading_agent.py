@@ -6,7 +6,12 @@ Implements a Markov Decision Process (MDP) for adaptive portfolio management:
 - Actions: Adjust allocations, trade, hold
 - Rewards: Risk-adjusted returns (Sharpe ratio based)
 
-Uses PPO (Proximal Policy Optimization) for stable training.
+Uses PPO (Proximal Policy Optimization) for stable training. Rollouts are
+collected from a VectorizedTradingEnvironment: N environments held as
+stacked arrays and stepped with one array operation, with the policy
+evaluated on the whole batch of N states per step. Market returns come
+from a ReturnGenerator that draws a whole episode of correlated GBM returns
+up front, so stepping only indexes into a precomputed path.
 
 References:
 - Schulman et al. (2017), "Proximal Policy Optimization Algorithms"
@@ -17,6 +22,7 @@ import numpy as np
 from typing import Dict, List, Tuple, Any, Optional
 import logging
 import json
+import time
 from pathlib import Path
 
 try:
@@ -30,11 +36,89 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Daily drift and volatility of the simulated assets (cycled for larger universes)
+DEFAULT_MU = np.array([0.0001, 0.0002, 0.00015, 0.00025])
+DEFAULT_SIGMA = np.array([0.02, 0.03, 0.025, 0.015])
+
+
+class ReturnGenerator:
+    """
+    Episode-level correlated GBM return paths.
+    
+    Daily log returns are drift + L z with L the Cholesky factor of the
+    covariance diag(sigma) C diag(sigma), factored once per generator.
+    A whole (n_steps, n_assets) path is drawn in one vectorized call into
+    reusable buffers, and a seed makes the paths reproducible.
+    """
+    
+    def __init__(
+        self,
+        n_assets: int = 4,
+        n_steps: int = 252,
+        mu: Optional[np.ndarray] = None,
+        sigma: Optional[np.ndarray] = None,
+        correlation: Optional[np.ndarray] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            n_assets: Number of assets
+            n_steps: Days per path
+            mu: Daily expected simple returns (defaults to DEFAULT_MU)
+            sigma: Daily volatilities (defaults to DEFAULT_SIGMA)
+            correlation: (n_assets, n_assets) correlation matrix (identity if None)
+            seed: Seed for reproducible paths
+            
+        Raises:
+            ValueError: If the correlation matrix is not positive definite
+        """
+        self.n_assets = n_assets
+        self.n_steps = n_steps
+        self.mu = np.resize(DEFAULT_MU, n_assets) if mu is None else np.asarray(mu, dtype=float)
+        self.sigma = np.resize(DEFAULT_SIGMA, n_assets) if sigma is None else np.asarray(sigma, dtype=float)
+        self.correlation = np.eye(n_assets) if correlation is None else np.asarray(correlation, dtype=float)
+        
+        covariance = self.sigma[:, None] * self.correlation * self.sigma[None, :]
+        try:
+            self._cholesky_t = np.ascontiguousarray(np.linalg.cholesky(covariance).T)
+        except np.linalg.LinAlgError:
+            raise ValueError("Correlation matrix must be positive definite")
+        # Log drift so that E[simple return] == mu
+        self._drift = np.log1p(self.mu) - 0.5 * self.sigma ** 2
+        
+        self.rng = np.random.default_rng(seed)
+        self._noise: Optional[np.ndarray] = None
+    
+    def sample(self, n_paths: Optional[int] = None, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Draw simple-return paths.
+        
+        Args:
+            n_paths: Number of paths (None for a single (n_steps, n_assets) path)
+            out: Array of the result shape to write into
+            
+        Returns:
+            (n_steps, n_assets) or (n_paths, n_steps, n_assets) returns
+        """
+        shape = (self.n_steps, self.n_assets) if n_paths is None else (n_paths, self.n_steps, self.n_assets)
+        if self._noise is None or self._noise.shape != shape:
+            self._noise = np.empty(shape)
+        if out is None:
+            out = np.empty(shape)
+        
+        self.rng.standard_normal(out=self._noise)
+        np.matmul(self._noise, self._cholesky_t, out=out)
+        out += self._drift
+        return np.expm1(out, out=out)
+
 
 class TradingEnvironment:
     """
     Trading environment following OpenAI Gym interface.
     
+    Returns are simulated; rl.market_data.HistoricalReplayEnvironment
+    replays recorded ones through the same dynamics.
+    
     State space:
     - Portfolio weights (n_assets,)
     - Current returns (n_assets,)
@@ -53,17 +137,33 @@ class TradingEnvironment:
         initial_capital: float = 10000,
         transaction_cost: float = 0.001,
         max_daily_trades: int = 5,
+        max_steps: int = 252,
+        correlation: Optional[np.ndarray] = None,
+        seed: Optional[int] = None,
     ):
         self.n_assets = n_assets
         self.initial_capital = initial_capital
         self.transaction_cost = transaction_cost
         self.max_daily_trades = max_daily_trades
+        self.max_steps = max_steps
         
         self.state_dim = n_assets * 3 + 3  # weights, returns, vol + budget, days, policy
         self.action_dim = n_assets
         
+        self._init_market(correlation, seed)
+        self._no_returns = np.zeros(n_assets)
+        
         self.reset()
     
+    def _init_market(self, correlation: Optional[np.ndarray], seed: Optional[int]):
+        """Set up the source of episode returns."""
+        self.generator = ReturnGenerator(self.n_assets, self.max_steps, correlation=correlation, seed=seed)
+        self._returns = np.empty((self.max_steps, self.n_assets))
+    
+    def _episode_returns(self) -> np.ndarray:
+        """(max_steps, n_assets) returns of a new episode."""
+        return self.generator.sample(out=self._returns)
+    
     def reset(self) -> np.ndarray:
         """Reset environment to initial state."""
         self.portfolio_value = self.initial_capital
@@ -71,6 +171,7 @@ class TradingEnvironment:
         self.trades_today = 0
         self.day = 0
         self.days_since_trade = 0
+        self._returns = self._episode_returns()
         
         return self._get_state()
     
@@ -83,8 +184,8 @@ class TradingEnvironment:
         weight_change = np.abs(target_weights - self.weights)
         costs = np.sum(weight_change) * self.transaction_cost * self.portfolio_value
         
-        # Simulate market returns (in production, use real data)
-        returns = self._simulate_returns()
+        # Today's returns from the episode path (HistoricalReplayEnvironment for real data)
+        returns = self._returns[self.day]
         
         # Update portfolio
         old_value = self.portfolio_value
@@ -102,7 +203,7 @@ class TradingEnvironment:
         reward = self._calculate_reward(portfolio_return, returns)
         
         # Check terminal conditions
-        done = self.day >= 252 or self.portfolio_value < self.initial_capital * 0.5
+        done = self.day >= self.max_steps or self.portfolio_value < self.initial_capital * 0.5
         
         info = {
             'portfolio_value': self.portfolio_value,
@@ -115,8 +216,8 @@ class TradingEnvironment:
     
     def _get_state(self) -> np.ndarray:
         """Construct state vector."""
-        # Simulate current market conditions
-        returns = self._simulate_returns()
+        # Most recent returns, the ones the last reward was paid on
+        returns = self._returns[self.day - 1] if self.day > 0 else self._no_returns
         volatility = np.abs(returns) * 2
         
         state = np.concatenate([
@@ -141,15 +242,6 @@ class TradingEnvironment:
             weights = np.ones(self.n_assets) / self.n_assets
         return weights
     
-    def _simulate_returns(self) -> np.ndarray:
-        """Simulate asset returns (replace with real data in production)."""
-        # Geometric Brownian Motion simulation
-        mu = np.array([0.0001, 0.0002, 0.00015, 0.00025])[:self.n_assets]
-        sigma = np.array([0.02, 0.03, 0.025, 0.015])[:self.n_assets]
-        
-        returns = mu + sigma * np.random.randn(self.n_assets)
-        return returns
-    
     def _calculate_reward(
         self,
         portfolio_return: float,
@@ -174,6 +266,151 @@ class TradingEnvironment:
         return reward - risk_penalty + diversity_bonus
 
 
+class VectorizedTradingEnvironment:
+    """
+    N independent TradingEnvironments stepped together.
+    
+    Weights, portfolio values and day counters are stacked into arrays, so
+    one step() advances every environment with a handful of array
+    operations. Dynamics and rewards match TradingEnvironment. Environments
+    that finish are reset in place (auto-reset), so every step returns a
+    full batch of N states; dones marks the episode boundaries.
+    
+    Returns are simulated; rl.market_data.VectorizedReplayEnvironment
+    replays windows of a historical panel through the same dynamics.
+    """
+    
+    def __init__(
+        self,
+        n_envs: int = 8,
+        n_assets: int = 4,
+        initial_capital: float = 10000,
+        transaction_cost: float = 0.001,
+        max_daily_trades: int = 5,
+        max_steps: int = 252,
+        correlation: Optional[np.ndarray] = None,
+        seed: Optional[int] = None,
+    ):
+        self.n_envs = n_envs
+        self.n_assets = n_assets
+        self.initial_capital = initial_capital
+        self.transaction_cost = transaction_cost
+        self.max_daily_trades = max_daily_trades
+        self.max_steps = max_steps
+        
+        self.state_dim = n_assets * 3 + 3
+        self.action_dim = n_assets
+        
+        self._init_market(correlation, seed)
+        self._last_returns = np.empty((n_envs, n_assets))
+        self._env_index = np.arange(n_envs)
+        
+        self.weights = np.empty((n_envs, n_assets))
+        self.portfolio_value = np.empty(n_envs)
+        self.trades_today = np.empty(n_envs, dtype=np.int64)
+        self.day = np.empty(n_envs, dtype=np.int64)
+        self.days_since_trade = np.empty(n_envs, dtype=np.int64)
+        self.reset()
+    
+    def _init_market(self, correlation: Optional[np.ndarray], seed: Optional[int]):
+        """Set up the source of episode returns."""
+        self.generator = ReturnGenerator(self.n_assets, self.max_steps, correlation=correlation, seed=seed)
+        self._paths = np.empty((self.n_envs, self.max_steps, self.n_assets))
+    
+    def _new_episodes(self, mask: np.ndarray):
+        """Draw new return paths for the environments in mask."""
+        if mask.all():
+            self.generator.sample(self.n_envs, out=self._paths)
+        else:
+            self._paths[mask] = self.generator.sample(int(mask.sum()))
+    
+    def _day_returns(self) -> np.ndarray:
+        """(n_envs, n_assets) returns of every environment's current day."""
+        return self._paths[self._env_index, self.day]
+    
+    def reset(self) -> np.ndarray:
+        """Reset every environment; returns (n_envs, state_dim) states."""
+        self._reset_envs(np.ones(self.n_envs, dtype=bool))
+        return self._get_states()
+    
+    def _reset_envs(self, mask: np.ndarray):
+        self._new_episodes(mask)
+        self._last_returns[mask] = 0.0
+        self.weights[mask] = 1.0 / self.n_assets
+        self.portfolio_value[mask] = self.initial_capital
+        self.trades_today[mask] = 0
+        self.day[mask] = 0
+        self.days_since_trade[mask] = 0
+    
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Advance every environment by one day.
+        
+        Args:
+            actions: (n_envs, n_assets) raw policy outputs
+            
+        Returns:
+            states (n_envs, state_dim), rewards (n_envs,), dones (n_envs,)
+            and info arrays; states of finished environments are already
+            the reset states, info["portfolio_value"] is before the reset
+        """
+        target_weights = self._normalize_weights(actions)
+        
+        weight_change = np.abs(target_weights - self.weights)
+        costs = weight_change.sum(axis=1) * self.transaction_cost * self.portfolio_value
+        
+        returns = self._day_returns()
+        
+        old_value = self.portfolio_value.copy()
+        self.portfolio_value *= 1 + np.einsum("ij,ij->i", self.weights, returns)
+        self.portfolio_value -= costs
+        
+        self.weights = target_weights
+        self._last_returns[:] = returns
+        self.trades_today += 1
+        self.day += 1
+        traded = (weight_change > 0.01).any(axis=1)
+        self.days_since_trade = np.where(traded, 0, self.days_since_trade + 1)
+        
+        portfolio_return = (self.portfolio_value - old_value) / old_value
+        rewards = self._calculate_rewards(portfolio_return, returns)
+        
+        dones = (self.day >= self.max_steps) | (self.portfolio_value < self.initial_capital * 0.5)
+        info = {
+            "portfolio_value": self.portfolio_value.copy(),
+            "return": portfolio_return,
+            "costs": costs,
+        }
+        if dones.any():
+            self._reset_envs(dones)
+        
+        return self._get_states(), rewards, dones, info
+    
+    def _get_states(self) -> np.ndarray:
+        returns = self._last_returns
+        states = np.empty((self.n_envs, self.state_dim), dtype=np.float32)
+        n = self.n_assets
+        states[:, :n] = self.weights
+        states[:, n:2 * n] = returns
+        states[:, 2 * n:3 * n] = np.abs(returns) * 2
+        states[:, 3 * n] = self.portfolio_value / self.initial_capital
+        states[:, 3 * n + 1] = self.days_since_trade / 30
+        states[:, 3 * n + 2] = self.trades_today < self.max_daily_trades
+        return states
+    
+    def _normalize_weights(self, actions: np.ndarray) -> np.ndarray:
+        weights = np.clip(actions, 0, 1)
+        totals = weights.sum(axis=1, keepdims=True)
+        return np.where(totals > 0, weights / np.where(totals > 0, totals, 1), 1.0 / self.n_assets)
+    
+    def _calculate_rewards(self, portfolio_return: np.ndarray, asset_returns: np.ndarray) -> np.ndarray:
+        """TradingEnvironment._calculate_reward for every environment at once."""
+        reward = portfolio_return * 100
+        risk_penalty = np.std(asset_returns * self.weights, axis=1) * 10
+        entropy = -np.sum(self.weights * np.log(self.weights + 1e-8), axis=1)
+        return reward - risk_penalty + entropy * 0.1
+
+
 if TORCH_AVAILABLE:
     class PolicyNetwork(nn.Module):
         """
@@ -229,6 +466,65 @@ if TORCH_AVAILABLE:
             return log_prob, value, entropy
 
 
+# Order of the arrays returned by TradingAgent._collect_rollout
+ROLLOUT_FIELDS = ("states", "actions", "rewards", "log_probs", "values", "dones")
+
+
+def rollout_shapes(n_steps: int, n_envs: int, state_dim: int, action_dim: int) -> Dict[str, Tuple[int, ...]]:
+    """Shapes of the float32 arrays of one rollout."""
+    return {
+        "states": (n_steps, n_envs, state_dim),
+        "actions": (n_steps, n_envs, action_dim),
+        "rewards": (n_steps, n_envs),
+        "log_probs": (n_steps, n_envs),
+        "values": (n_steps + 1, n_envs),  # Last row is the bootstrap value
+        "dones": (n_steps, n_envs),
+    }
+
+
+def collect_rollout(
+    policy: "PolicyNetwork",
+    vec_env: VectorizedTradingEnvironment,
+    n_steps: int = 252,
+    out: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Step every environment of vec_env n_steps times, evaluating the policy
+    on the whole batch of states per step.
+    
+    Args:
+        policy: Policy to act with (run under no_grad)
+        vec_env: Environments to step; reset first
+        n_steps: Steps per environment
+        out: Arrays shaped as rollout_shapes() to fill (allocated if None)
+        
+    Returns:
+        The filled arrays, keyed by ROLLOUT_FIELDS
+    """
+    if out is None:
+        shapes = rollout_shapes(n_steps, vec_env.n_envs, vec_env.state_dim, vec_env.action_dim)
+        out = {name: np.empty(shape, dtype=np.float32) for name, shape in shapes.items()}
+    
+    state = vec_env.reset()
+    with torch.no_grad():
+        for t in range(n_steps):
+            action, log_prob, value = policy.get_action(torch.from_numpy(state))
+            action = action.numpy()
+            
+            out["states"][t] = state
+            out["actions"][t] = action
+            out["log_probs"][t] = log_prob.numpy()
+            out["values"][t] = value.squeeze(-1).numpy()
+            
+            state, out["rewards"][t], out["dones"][t], _ = vec_env.step(action)
+        
+        # Bootstrap value for GAE
+        _, _, final_value = policy(torch.from_numpy(state))
+        out["values"][n_steps] = final_value.squeeze(-1).numpy()
+    
+    return out
+
+
 class TradingAgent:
     """
     PPO-based trading agent for adaptive portfolio management.
@@ -252,13 +548,11 @@ class TradingAgent:
         self.value_coef = value_coef
         self.entropy_coef = entropy_coef
         
-        self.env = TradingEnvironment(n_assets=n_assets)
+        # Same state layout as TradingEnvironment: weights, returns, vol + budget, days, policy
+        self.state_dim = n_assets * 3 + 3
         
         if TORCH_AVAILABLE:
-            self.policy = PolicyNetwork(
-                state_dim=self.env.state_dim,
-                action_dim=self.env.action_dim,
-            )
+            self.policy = PolicyNetwork(state_dim=self.state_dim, action_dim=n_assets)
             self.optimizer = optim.Adam(self.policy.parameters(), lr=learning_rate)
             
             if model_path and Path(model_path).exists():
@@ -326,89 +620,124 @@ class TradingAgent:
             'reasoning': self._generate_reasoning(current_weights, adjusted_weights, expected_returns),
         }
     
-    def train(self, n_episodes: int = 1000, save_path: Optional[str] = None) -> Dict[str, List]:
-        """Train the agent using PPO."""
+    def train(
+        self,
+        n_episodes: int = 1000,
+        save_path: Optional[str] = None,
+        n_envs: int = 8,
+        n_workers: int = 0,
+        panel: Optional[Any] = None,
+    ) -> Dict[str, List]:
+        """
+        Train the agent using PPO.
+        
+        Each of the n_episodes iterations collects one 252-step rollout from
+        n_envs environments in parallel and runs one PPO update on it.
+        With n_workers > 0, collection runs in that many worker processes
+        (see rl.rollout_workers), each stepping n_envs environments, and the
+        updated weights are broadcast to them after every update.
+        
+        With a panel (rl.market_data.MarketDataPanel or the path of its
+        .npy file), environments replay random windows of that historical
+        return panel instead of simulated returns; workers map the file
+        themselves.
+        
+        history['rewards'] holds the mean reward per environment and
+        history['steps_per_second'] the collection throughput in
+        environment steps per second.
+        """
         if not TORCH_AVAILABLE:
-            return {'rewards': [], 'values': []}
+            return {'rewards': [], 'values': [], 'steps_per_second': []}
         
-        history = {'rewards': [], 'values': []}
+        history = {'rewards': [], 'values': [], 'steps_per_second': []}
         
-        for episode in range(n_episodes):
-            states, actions, rewards, log_probs, values, dones = self._collect_trajectory()
-            
-            # Calculate advantages using GAE
-            advantages = self._compute_gae(rewards, values, dones)
-            returns = advantages + values[:-1]
-            
-            # PPO update
-            self._ppo_update(states, actions, log_probs, returns, advantages)
-            
-            episode_reward = sum(rewards)
-            history['rewards'].append(episode_reward)
-            history['values'].append(values[-1].item())
-            
-            if episode % 100 == 0:
-                avg_reward = np.mean(history['rewards'][-100:])
-                logger.info(f"Episode {episode}, Avg Reward: {avg_reward:.4f}")
+        workers = None
+        if n_workers > 0:
+            from rl.rollout_workers import RolloutWorkerPool
+            workers = RolloutWorkerPool(
+                self.policy, n_workers=n_workers, n_envs=n_envs, n_assets=self.n_assets, panel=panel,
+            )
+        elif panel is not None:
+            from rl.market_data import VectorizedReplayEnvironment
+            vec_env = VectorizedReplayEnvironment(panel, n_envs=n_envs, n_assets=self.n_assets)
+        else:
+            vec_env = VectorizedTradingEnvironment(n_envs=n_envs, n_assets=self.n_assets)
+        
+        try:
+            for episode in range(n_episodes):
+                started = time.perf_counter()
+                if workers is not None:
+                    rollout = workers.collect()
+                    states, actions, rewards, log_probs, values, dones = (rollout[name] for name in ROLLOUT_FIELDS)
+                else:
+                    states, actions, rewards, log_probs, values, dones = self._collect_rollout(vec_env)
+                history['steps_per_second'].append(rewards.numel() / (time.perf_counter() - started))
+                
+                self._train_on_rollout(states, actions, rewards, log_probs, values, dones)
+                if workers is not None:
+                    workers.broadcast(self.policy)
+                
+                episode_reward = rewards.sum(dim=0).mean().item()
+                history['rewards'].append(episode_reward)
+                history['values'].append(values[-1].mean().item())
+                
+                if episode % 100 == 0:
+                    avg_reward = np.mean(history['rewards'][-100:])
+                    logger.info(
+                        f"Episode {episode}, Avg Reward: {avg_reward:.4f}, "
+                        f"{history['steps_per_second'][-1]:.0f} env steps/s")
+        finally:
+            if workers is not None:
+                workers.close()
         
         if save_path:
             self.save_model(save_path)
         
         return history
     
-    def _collect_trajectory(self, max_steps: int = 252):
-        """Collect a trajectory using current policy."""
-        states, actions, rewards, log_probs, values, dones = [], [], [], [], [], []
-        
-        state = self.env.reset()
-        
-        for _ in range(max_steps):
-            state_tensor = torch.FloatTensor(state).unsqueeze(0)
-            action, log_prob, value = self.policy.get_action(state_tensor)
-            
-            next_state, reward, done, _ = self.env.step(action.squeeze().numpy())
-            
-            states.append(state)
-            actions.append(action.squeeze().numpy())
-            rewards.append(reward)
-            log_probs.append(log_prob)
-            values.append(value)
-            dones.append(done)
-            
-            state = next_state
-            
-            if done:
-                break
-        
-        # Final value for GAE
-        with torch.no_grad():
-            _, _, final_value = self.policy(torch.FloatTensor(state).unsqueeze(0))
-        values.append(final_value)
-        
-        return states, actions, rewards, log_probs, values, dones
+    def _train_on_rollout(self, states, actions, rewards, log_probs, values, dones):
+        """GAE and one PPO update on a (steps, envs) rollout."""
+        # Calculate advantages using GAE
+        advantages = self._compute_gae_batch(rewards, values, dones)
+        returns = advantages + values[:-1]
+        
+        # PPO update on the flattened (steps * envs) batch
+        self._ppo_update(
+            states.reshape(-1, states.shape[-1]),
+            actions.reshape(-1, actions.shape[-1]),
+            log_probs.reshape(-1),
+            returns.reshape(-1),
+            advantages.reshape(-1),
+        )
     
-    def _compute_gae(self, rewards, values, dones):
-        """Compute Generalized Advantage Estimation."""
-        advantages = []
-        gae = 0
-        
-        for t in reversed(range(len(rewards))):
-            if t == len(rewards) - 1:
-                next_value = values[t + 1]
-            else:
-                next_value = values[t + 1]
-            
-            delta = rewards[t] + self.gamma * next_value * (1 - dones[t]) - values[t]
-            gae = delta + self.gamma * self.gae_lambda * (1 - dones[t]) * gae
-            advantages.insert(0, gae)
+    def _collect_rollout(self, vec_env: VectorizedTradingEnvironment, n_steps: int = 252):
+        """
+        Step every environment n_steps times with the current policy.
         
-        return torch.FloatTensor(advantages)
+        Returns:
+            Tensors shaped (n_steps, n_envs, ...): states, actions, rewards,
+            log_probs, values (n_steps + 1 rows, with the bootstrap value)
+            and dones
+        """
+        rollout = collect_rollout(self.policy, vec_env, n_steps)
+        return tuple(torch.from_numpy(rollout[name]) for name in ROLLOUT_FIELDS)
+    
+    def _compute_gae_batch(self, rewards: torch.Tensor, values: torch.Tensor, dones: torch.Tensor) -> torch.Tensor:
+        """GAE over (n_steps, n_envs) tensors, all environments at once."""
+        advantages = torch.zeros_like(rewards)
+        gae = torch.zeros(rewards.shape[1])
+        for t in reversed(range(rewards.shape[0])):
+            not_done = 1.0 - dones[t]
+            delta = rewards[t] + self.gamma * values[t + 1] * not_done - values[t]
+            gae = delta + self.gamma * self.gae_lambda * not_done * gae
+            advantages[t] = gae
+        return advantages
     
     def _ppo_update(self, states, actions, old_log_probs, returns, advantages, epochs: int = 4):
         """Perform PPO policy update."""
-        states = torch.FloatTensor(np.array(states))
-        actions = torch.FloatTensor(np.array(actions))
-        old_log_probs = torch.cat(old_log_probs)
+        states = torch.as_tensor(states, dtype=torch.float32)
+        actions = torch.as_tensor(actions, dtype=torch.float32)
+        old_log_probs = old_log_probs.detach()
         
         # Normalize advantages
         advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
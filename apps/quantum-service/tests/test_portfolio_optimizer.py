@@ -149,6 +149,222 @@ class TestPortfolioOptimizer:
         total_allocation = sum(result["allocations"].values())
         assert abs(total_allocation - budget) < 0.01
 
+    def test_respects_min_max_constraints(self, optimizer, sample_portfolio_data):
+        """Test that per-asset min/max constraints bound the native solution."""
+        result = optimizer.optimize(
+            assets=sample_portfolio_data["assets"],
+            expected_returns=sample_portfolio_data["expected_returns"],
+            covariance_matrix=sample_portfolio_data["covariance_matrix"],
+            risk_tolerance=0.9,
+            budget=1.0,
+            constraints={"min_USDC": 0.2, "max_ARC": 0.3},
+        )
+        
+        assert result["allocations"]["USDC"] >= 0.2 - 1e-9
+        assert result["allocations"]["ARC"] <= 0.3 + 1e-9
+        assert abs(sum(result["allocations"].values()) - 1.0) < 1e-9
+        assert result["convergence_achieved"]
+    
+    def test_infeasible_constraints_rejected(self, optimizer, sample_portfolio_data):
+        """Test that bounds which cannot meet the budget raise ValueError."""
+        with pytest.raises(ValueError):
+            optimizer.optimize(
+                assets=sample_portfolio_data["assets"],
+                expected_returns=sample_portfolio_data["expected_returns"],
+                covariance_matrix=sample_portfolio_data["covariance_matrix"],
+                constraints={"min_USDC": 0.6, "min_ETH": 0.6},
+            )
+    
+    def test_vqe_solver_still_available(self, optimizer, sample_portfolio_data):
+        """Test that the QUBO/VQE path can still be selected explicitly."""
+        result = optimizer.optimize(
+            assets=sample_portfolio_data["assets"],
+            expected_returns=sample_portfolio_data["expected_returns"],
+            covariance_matrix=sample_portfolio_data["covariance_matrix"],
+            solver="vqe",
+        )
+        
+        assert len(result["allocations"]) == 4
+        assert abs(sum(result["allocations"].values()) - 1.0) < 0.01
+
+
+class TestEfficientFrontier:
+    """Tests for the efficient frontier sweep."""
+    
+    def test_frontier_matches_pointwise_optimize(self, optimizer, sample_portfolio_data):
+        """Test that warm-started points equal independent solves and risk rises."""
+        frontier = optimizer.efficient_frontier(
+            assets=sample_portfolio_data["assets"],
+            expected_returns=sample_portfolio_data["expected_returns"],
+            covariance_matrix=sample_portfolio_data["covariance_matrix"],
+            n_points=11,
+        )
+        
+        points = frontier["points"]
+        assert len(points) == 11
+        risks = [point["expected_risk"] for point in points]
+        assert all(later >= earlier - 1e-9 for earlier, later in zip(risks, risks[1:]))
+        
+        for point in points[::5]:
+            expected = optimizer.optimize(
+                assets=sample_portfolio_data["assets"],
+                expected_returns=sample_portfolio_data["expected_returns"],
+                covariance_matrix=sample_portfolio_data["covariance_matrix"],
+                risk_tolerance=point["risk_tolerance"],
+            )
+            assert abs(point["expected_return"] - expected["expected_return"]) < 1e-8
+            assert abs(point["expected_risk"] - expected["expected_risk"]) < 1e-8
+
+
+class TestResultCache:
+    """Tests for the optimizer result cache."""
+    
+    def test_repeated_request_hits_cache(self, sample_portfolio_data):
+        """Test that numerically identical requests are served from the cache."""
+        optimizer = PortfolioOptimizer(max_iterations=100, num_qubits_per_asset=2)
+        first = optimizer.optimize(
+            assets=sample_portfolio_data["assets"],
+            expected_returns=sample_portfolio_data["expected_returns"],
+            covariance_matrix=sample_portfolio_data["covariance_matrix"],
+        )
+        # Differences below the rounding precision address the same entry
+        jittered = [r + 1e-13 for r in sample_portfolio_data["expected_returns"]]
+        second = optimizer.optimize(
+            assets=sample_portfolio_data["assets"],
+            expected_returns=jittered,
+            covariance_matrix=sample_portfolio_data["covariance_matrix"],
+        )
+        
+        stats = optimizer.cache_stats()
+        assert second == first
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["entries"][0]["age_seconds"] >= 0
+    
+    def test_use_cache_false_bypasses_cache(self, sample_portfolio_data):
+        """Test that the opt-out flag neither reads nor writes the cache."""
+        optimizer = PortfolioOptimizer(max_iterations=100, num_qubits_per_asset=2)
+        for _ in range(2):
+            optimizer.analyze_risk(
+                assets=sample_portfolio_data["assets"],
+                expected_returns=sample_portfolio_data["expected_returns"],
+                covariance_matrix=sample_portfolio_data["covariance_matrix"],
+                use_cache=False,
+            )
+        
+        stats = optimizer.cache_stats()
+        assert stats["hits"] == 0 and stats["misses"] == 0 and stats["size"] == 0
+    
+    def test_lru_eviction_and_ttl(self):
+        """Test that entries expire after the TTL and the LRU entry is evicted."""
+        from quantum.result_cache import ResultCache
+        
+        now = [0.0]
+        cache = ResultCache(max_entries=2, ttl_seconds=10.0, clock=lambda: now[0])
+        cache.put("a", {"v": 1})
+        cache.put("b", {"v": 2})
+        assert cache.get("a") == {"v": 1}
+        cache.put("c", {"v": 3})  # evicts "b", the least recently used
+        
+        assert cache.get("b") is None
+        now[0] = 11.0
+        assert cache.get("a") is None
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["expirations"] >= 1
+
+
+class TestOptimizeMany:
+    """Tests for batched portfolio optimization."""
+    
+    def test_results_match_single_optimize_in_order(self, optimizer, sample_portfolio_data):
+        """Test that mixed-size batches come back in order and match optimize()."""
+        problems = [
+            {
+                "assets": sample_portfolio_data["assets"],
+                "expected_returns": sample_portfolio_data["expected_returns"],
+                "covariance_matrix": sample_portfolio_data["covariance_matrix"],
+                "risk_tolerance": tolerance,
+            }
+            for tolerance in (0.1, 0.5, 0.9)
+        ]
+        problems.insert(1, {
+            "assets": ["USDC", "ETH"],
+            "expected_returns": [0.0, 0.15],
+            "covariance_matrix": [[0.0001, 0.0], [0.0, 0.04]],
+            "budget": 0.5,
+        })
+        
+        results = list(optimizer.optimize_many(problems, chunk_size=3))
+        
+        assert len(results) == len(problems)
+        for problem, result in zip(problems, results):
+            expected = optimizer.optimize(**problem, use_cache=False)
+            assert list(result["allocations"]) == problem["assets"]
+            for asset in problem["assets"]:
+                assert abs(result["allocations"][asset] - expected["allocations"][asset]) < 1e-8
+            assert abs(result["expected_risk"] - expected["expected_risk"]) < 1e-8
+    
+    def test_bad_problem_does_not_fail_batch(self, optimizer, sample_portfolio_data):
+        """Test that an infeasible problem yields an error entry only."""
+        good = {
+            "assets": sample_portfolio_data["assets"],
+            "expected_returns": sample_portfolio_data["expected_returns"],
+            "covariance_matrix": sample_portfolio_data["covariance_matrix"],
+        }
+        bad = dict(good, constraints={"max_USDC": 0.1, "max_ETH": 0.1, "max_BTC": 0.1, "max_ARC": 0.1})
+        
+        results = list(optimizer.optimize_many([good, bad, good]))
+        
+        assert "error" in results[1]
+        assert "allocations" in results[0] and "allocations" in results[2]
+
+
+class TestMeanVarianceSolver:
+    """Tests for the native mean-variance QP solver."""
+    
+    def test_matches_reference_solver(self):
+        """Test that the native solution is at least as good as SLSQP."""
+        from scipy.optimize import minimize
+        from quantum.mean_variance import solve_mean_variance
+        
+        rng = np.random.default_rng(7)
+        n = 30
+        factors = rng.normal(size=(n, n)) * 0.1
+        cov = factors @ factors.T / n + np.diag(rng.uniform(1e-4, 1e-2, n))
+        returns = rng.uniform(0.0, 0.3, n)
+        lower, upper = np.zeros(n), np.full(n, 0.1)
+        
+        result = solve_mean_variance(cov, returns, 1.0, lower, upper, 1.0)
+        
+        objective = lambda w: w @ cov @ w - returns @ w
+        reference = minimize(
+            objective,
+            np.ones(n) / n,
+            jac=lambda w: 2 * cov @ w - returns,
+            bounds=list(zip(lower, upper)),
+            constraints=[{"type": "eq", "fun": lambda w: w.sum() - 1.0}],
+            method="SLSQP",
+            options={"maxiter": 1000, "ftol": 1e-14},
+        )
+        
+        weights = result["solution"]
+        assert result["converged"]
+        assert abs(weights.sum() - 1.0) < 1e-9
+        assert weights.min() >= -1e-12 and weights.max() <= 0.1 + 1e-12
+        assert objective(weights) <= objective(reference.x) + 1e-9
+    
+    def test_projection_onto_bounded_simplex(self):
+        """Test that projection respects bounds and budget row by row."""
+        from quantum.mean_variance import project_bounded_simplex
+        
+        rng = np.random.default_rng(3)
+        v = rng.normal(size=(5, 8))
+        projected = project_bounded_simplex(
+            v, np.zeros((5, 8)), np.full((5, 8), 0.25), np.full(5, 1.0)
+        )
+        
+        assert np.allclose(projected.sum(axis=1), 1.0)
+        assert projected.min() >= 0.0 and projected.max() <= 0.25
+
 
 class TestQRNGService:
     """Tests for QRNG Service."""
@@ -172,6 +388,101 @@ class TestQRNGService:
         assert len(result) == 32
         assert isinstance(result, bytes)
     
+    def test_bulk_harvest_is_packed_and_balanced(self):
+        from quantum.qrng_service import QRNGService
+        
+        service = QRNGService()
+        result = service.generate_bytes(4096)
+        bits = service._generate_quantum_bits(1001)
+        
+        assert len(result) == 4096
+        ones_ratio = np.unpackbits(np.frombuffer(result, dtype=np.uint8)).mean()
+        assert 0.48 < ones_ratio < 0.52
+        assert bits.dtype == np.uint8 and bits.shape == (1001,)
+        assert set(np.unique(bits)) <= {0, 1}
+
+    def test_entropy_pool_serves_and_reports_underruns(self):
+        from quantum.qrng_service import QRNGService
+
+        service = QRNGService(pool_size=1024, pool_prefill=1024, background_refill=False)
+        quantum, source = service.draw_bytes(512)
+        assert source == "quantum_superposition"
+        assert service.pool_stats()["level"] == 512
+
+        mixed, source = service.draw_bytes(1024)
+        stats = service.pool_stats()
+        assert len(mixed) == 1024
+        assert source == "quantum_superposition+secure_pseudo_random_fallback"
+        assert stats["underruns"] == 1 and stats["underrun_bytes"] == 512
+        assert stats["level"] == 0
+
+        # The ring buffer wraps around when refilled after partial draws
+        service.pool.fill(700)
+        service.draw_bytes(600)
+        service.pool.fill()
+        assert service.pool_stats()["level"] == 1024
+        assert len(service.pool.take(1024)) == 1024
+
+    def test_vectorized_conversion_is_unbiased(self):
+        from quantum.random_conversion import uniform_floats, uniform_integers
+
+        rng = np.random.default_rng(7)
+        values = uniform_integers(rng.bytes, 300000, -1, 1)
+        counts = np.bincount(values + 1, minlength=3)
+        assert values.min() == -1 and values.max() == 1
+        assert np.all(np.abs(counts / 300000 - 1 / 3) < 0.005)
+
+        wide = uniform_integers(rng.bytes, 1000, -(1 << 62), (1 << 62) + 5)
+        assert wide.min() >= -(1 << 62) and wide.max() <= (1 << 62) + 5
+
+        floats = uniform_floats(rng.bytes, 100000)
+        assert floats.min() >= 0.0 and floats.max() < 1.0
+        # 53-bit resolution, not a coarse grid
+        assert len(np.unique(floats)) == 100000
+
+    def test_generate_large_count_reports_entropy(self):
+        from quantum.qrng_service import QRNGService
+
+        service = QRNGService(pool_size=1 << 16, background_refill=False)
+        result = service.generate(count=200000, min_value=1, max_value=6)
+        values = np.asarray(result["random_values"])
+
+        assert len(values) == 200000
+        assert values.min() == 1 and values.max() == 6
+        # 8-bit words with 4/256 rejected: a little over one byte per value
+        assert 200000 * 8 <= result["entropy_bits_used"] < 200000 * 8 * 1.05
+
+        floats = service.generate(count=10, format="float")
+        assert all(0.0 <= v < 1.0 for v in floats["random_values"])
+        assert floats["entropy_bits_used"] == 10 * 64
+
+    def test_iter_bytes_streams_exact_length(self):
+        from quantum.qrng_service import QRNGService
+
+        service = QRNGService(pool_size=4096, background_refill=False)
+        chunks = list(service.iter_bytes(10000, chunk_size=4096))
+
+        assert [len(c) for c in chunks] == [4096, 4096, 1808]
+
+    def test_drbg_mode_reseeds_by_bytes(self):
+        from quantum.qrng_service import QRNGService
+
+        service = QRNGService(pool_size=1024, background_refill=False, drbg_reseed_bytes=1 << 16)
+        result = service.generate(count=1000, entropy_source="drbg")
+        assert result["mode"] == "drbg"
+        assert result["entropy_source"] == "quantum_seeded_chacha20_drbg"
+        assert len(set(result["random_values"])) > 200
+
+        first = service.generate_bytes(16)
+        for _ in range(3):
+            service.draw_bytes(1 << 15, entropy_source="drbg")
+        stats = service.drbg_stats()
+        assert stats["reseeds"] == 2 and stats["fallback_seeds"] == 0
+        assert service.draw_bytes(16, entropy_source="drbg")[0] != first
+
+        with pytest.raises(ValueError):
+            service.generate(count=1, entropy_source="urandom")
+
     def test_generate_nonce(self):
         from quantum.qrng_service import QRNGService
         
@@ -184,6 +495,188 @@ class TestQRNGService:
         assert len(nonce1) == 64  # Hex encoding doubles length
 
 
+def make_stuck_source():
+    """An entropy source whose output is stuck at zero."""
+    from quantum.entropy_sources import EntropySource
+
+    class Stuck(EntropySource):
+        name = "stuck"
+
+        def _read(self, n_bytes):
+            return np.zeros(n_bytes, dtype=np.uint8)
+
+    return Stuck()
+
+
+class TestEntropyHealthTests:
+    """Tests for SP 800-90B continuous tests and the SP 800-22 subset."""
+
+    def test_repetition_run_across_blocks_quarantines(self):
+        """Test that a run split over two blocks fails and the source cools down."""
+        from quantum.health_tests import EntropySourceQuarantined, HealthMonitor
+
+        now = [0.0]
+        monitor = HealthMonitor(cooldown_seconds=30.0, clock=lambda: now[0])
+        block = np.array([1, 0] * 100 + [1] * 25, dtype=np.uint8)
+        monitor.check(block)
+
+        with pytest.raises(EntropySourceQuarantined):
+            monitor.check(np.ones(20, dtype=np.uint8))
+        with pytest.raises(EntropySourceQuarantined):
+            monitor.ensure_available()
+        assert monitor.stats()["repetition_count"]["failures"] == 1
+
+        now[0] = 31.0
+        monitor.ensure_available()
+        assert monitor.stats()["healthy"]
+
+    def test_biased_source_fails_proportion_and_sp800_22(self):
+        """Test that a 60/40 biased source is caught and a uniform one passes."""
+        from quantum.health_tests import EntropySourceQuarantined, HealthMonitor, sp800_22_suite
+
+        rng = np.random.default_rng(3)
+        uniform = rng.integers(0, 2, 1 << 20, dtype=np.uint8)
+        biased = (rng.random(1 << 20) < 0.6).astype(np.uint8)
+
+        monitor = HealthMonitor()
+        monitor.check(uniform)
+        with pytest.raises(EntropySourceQuarantined):
+            monitor.check(biased)
+        assert monitor.stats()["adaptive_proportion"]["failures"] == 1
+
+        assert sp800_22_suite(uniform)["overall_pass"]
+        report = sp800_22_suite(biased)
+        assert not report["overall_pass"]
+        assert not report["tests"]["frequency"]["pass"]
+
+    def test_stuck_source_never_reaches_the_pool(self):
+        """Test that a failing source is quarantined and requests fall back visibly."""
+        from quantum.health_tests import EntropySourceQuarantined
+        from quantum.qrng_service import QRNGService
+
+        service = QRNGService(entropy_sources=[make_stuck_source()], pool_size=4096,
+                              pool_prefill=0, background_refill=False)
+
+        with pytest.raises(EntropySourceQuarantined):
+            service.pool.fill()
+        assert service.pool_stats()["level"] == 0
+        assert not service.health_stats()["healthy"]
+
+        result = service.generate(count=5)
+        assert result["entropy_source"] == "secure_pseudo_random_fallback"
+
+    def test_stuck_source_is_dropped_from_the_mix(self):
+        """Test that only the failing source is quarantined while the others keep serving."""
+        from quantum.entropy_sources import NumpyMeasurementSource
+        from quantum.qrng_service import QRNGService
+
+        stuck, numpy_source = make_stuck_source(), NumpyMeasurementSource(seed=4)
+        stuck.throughput, numpy_source.throughput = 1e15, 1.0  # Stuck source takes the whole split
+        service = QRNGService(entropy_sources=[stuck, numpy_source], pool_size=4096,
+                              pool_prefill=0, background_refill=False)
+        service.pool.fill()
+
+        assert service.pool_stats()["level"] == 4096
+        health = service.health_stats()
+        assert health["healthy"]
+        assert [s["healthy"] for s in health["sources"]] == [False, True]
+        stats = service.source_stats()
+        assert stats[0]["quarantined"] and stats[0]["share"] == 0.0
+        assert stats[1]["share"] == 1.0
+        assert service.generate(count=5)["entropy_source"] == "quantum_superposition"
+
+
+class TestExtractor:
+    """Tests for the conditioning stage."""
+
+    def test_toeplitz_fft_matches_dense_product(self):
+        """Test that the FFT evaluation equals T x mod 2 with the explicit matrix."""
+        from quantum.extractor import ToeplitzExtractor
+
+        extractor = ToeplitzExtractor(block_bytes=16, ratio=0.5, seed=bytes(range(1, 25)))
+        data = np.frombuffer(bytes(range(100, 164)), dtype=np.uint8)
+        n, m = 128, 64
+        seed = extractor.seed_bits.astype(int)
+        matrix = np.array([[seed[i - j + n - 1] for j in range(n)] for i in range(m)])
+        expected = np.packbits(np.unpackbits(data).reshape(4, n) @ matrix.T % 2, axis=1).ravel()
+
+        assert np.array_equal(extractor.condition(data), expected)
+        assert extractor.stats()["bytes_in"] == 64 and extractor.stats()["bytes_out"] == 32
+
+    def test_pipeline_reports_conditioning_ratio(self):
+        """Test that the pool is filled through the conditioner at the configured ratio."""
+        from quantum.qrng_service import QRNGService
+
+        service = QRNGService(pool_size=4096, pool_prefill=0, background_refill=False,
+                              conditioner="sha3", conditioning_ratio=0.25)
+        service.pool.fill()
+        stats = service.conditioner_stats()
+
+        assert service.pool_stats()["level"] == 4096
+        assert stats["ratio"] == 0.25
+        assert stats["bytes_in"] == 4 * stats["bytes_out"] >= 4 * 4096
+        assert service.benchmark_conditioner(0.25)["input_mb_per_sec"] > 0
+
+
+class TestEntropySources:
+    """Tests for pluggable entropy source backends."""
+
+    def test_file_source_and_numpy_source_feed_the_service(self, tmp_path):
+        """Test that generate works unchanged on non-Aer sources."""
+        from quantum.entropy_sources import FileSource
+        from quantum.qrng_service import QRNGService
+
+        capture = tmp_path / "qrng.bin"
+        capture.write_bytes(np.random.default_rng(5).bytes(1 << 16))
+        service = QRNGService(entropy_sources=[FileSource(str(capture), loop=True), "numpy"],
+                              pool_size=1 << 14, background_refill=False)
+        service.pool.fill()
+
+        result = service.generate(count=100, min_value=1, max_value=6)
+        stats = {s["source"]: s for s in service.source_stats()}
+
+        assert result["entropy_source"] == "quantum_superposition"
+        assert all(1 <= v <= 6 for v in result["random_values"])
+        assert stats["numpy"]["bytes_read"] > 0 and stats[f"file:{capture}"]["bytes_read"] > 0
+        assert abs(sum(s["share"] for s in stats.values()) - 1.0) < 1e-9
+
+    def test_mixer_weights_by_throughput_and_benches_failures(self):
+        """Test that faster sources get larger shares and failing ones are left out."""
+        from quantum.entropy_sources import EntropySource, NumpyMeasurementSource, SourceMixer
+
+        class BrokenSource(EntropySource):
+            name = "broken"
+
+            def _read(self, n_bytes):
+                raise IOError("device unplugged")
+
+        fast, slow = NumpyMeasurementSource(seed=1), NumpyMeasurementSource(seed=2)
+        fast.throughput, slow.throughput = 9e6, 1e6
+        mixer = SourceMixer([fast, slow, BrokenSource()])
+        mixer.sources[2].throughput = 1e6
+
+        assert np.allclose(mixer.shares(), [9 / 11, 1 / 11, 1 / 11])
+
+        data = mixer.read(9000)
+        assert len(data) == 9000
+        assert mixer.shares()[2] == 0.0
+        assert mixer.stats()[2]["benched"] and mixer.stats()[2]["errors"] == 1
+
+        before = [(s.throughput, s.bytes_read) for s in mixer.sources]
+        assert [r["source"] for r in mixer.benchmark(0.01)][:2] == ["numpy", "numpy"]
+        assert [(s.throughput, s.bytes_read) for s in mixer.sources] == before
+
+    def test_entropy_source_requires_read(self):
+        """Test that a backend without _read cannot be instantiated."""
+        from quantum.entropy_sources import EntropySource
+
+        class Incomplete(EntropySource):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+
 class TestDilithiumService:
     """Tests for Post-Quantum Cryptography Service."""
     
@@ -245,10 +738,10 @@ class TestDilithiumService:
         
         typed_data = EIP712TypedData.create_payment_request(
             amount="1000000",
-            currency="0x1234...",
-            recipient="0x5678...",
+            currency="0x" + "12" * 20,
+            recipient="0x" + "56" * 20,
             description="Test payment",
-            nonce="abc123",
+            nonce="0x" + "ab" * 32,
             deadline=1700000000,
         )
         
@@ -257,6 +750,319 @@ class TestDilithiumService:
         assert "message_hash" in result
         assert "signature" in result
         assert "domain" in result
+    
+    def test_eip712_hash_matches_spec_example(self):
+        """Digest of the EIP-712 specification's Mail example."""
+        from crypto import eip712
+        
+        assert eip712.keccak_256(b"").hex() == (
+            "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+        )
+        typed_data = {
+            "types": {
+                "EIP712Domain": [
+                    {"name": "name", "type": "string"},
+                    {"name": "version", "type": "string"},
+                    {"name": "chainId", "type": "uint256"},
+                    {"name": "verifyingContract", "type": "address"},
+                ],
+                "Person": [{"name": "name", "type": "string"}, {"name": "wallet", "type": "address"}],
+                "Mail": [
+                    {"name": "from", "type": "Person"},
+                    {"name": "to", "type": "Person"},
+                    {"name": "contents", "type": "string"},
+                ],
+            },
+            "primaryType": "Mail",
+            "domain": {
+                "name": "Ether Mail", "version": "1", "chainId": 1,
+                "verifyingContract": "0xCcCCccccCCCCcCCCCCCcCcCccCcCCCcCcccccccC",
+            },
+            "message": {
+                "from": {"name": "Cow", "wallet": "0xCD2a3d9F938E13CD947Ec05AbC7FE734Df8DD826"},
+                "to": {"name": "Bob", "wallet": "0xbBbBBBBbbBBBbbbBbbBbbbbBBbBbbbbBbBbbBBbB"},
+                "contents": "Hello, Bob!",
+            },
+        }
+        
+        hashes = eip712.hash_typed_data(typed_data)
+        assert hashes["domain_separator"].hex() == (
+            "f2cee375fa42b42143804025fc449deafd50cc031ca257e0b194a650a912090f"
+        )
+        assert hashes["digest"].hex() == (
+            "be609aee343fb3c4b28e1df9e632fca64fcfaede20f02e86244efddf30957bd2"
+        )
+        
+        before = eip712.cache_info()["domain_separators"]["hits"]
+        typed_data["message"]["contents"] = "Hello again"
+        assert eip712.hash_typed_data(typed_data)["digest"] != hashes["digest"]
+        assert eip712.cache_info()["domain_separators"]["hits"] == before + 1
+        
+        typed_data["message"]["to"]["wallet"] = "0x1234..."
+        with pytest.raises(ValueError):
+            eip712.hash_typed_data(typed_data)
+    
+    def test_eip712_replay_rejected(self, tmp_path):
+        """A payment verifies once; replays and expired deadlines are rejected, across restarts."""
+        import time
+        from crypto.dilithium_service import DilithiumService, EIP712TypedData
+        
+        snapshot = str(tmp_path / "nonces.log")
+        service = DilithiumService(keypair_pool_depth=0, replay_snapshot_path=snapshot)
+        keypair = service.generate_keypair()
+        
+        def payment(nonce_byte, deadline):
+            typed_data = EIP712TypedData.create_payment_request(
+                amount="1000000", currency="0x" + "12" * 20, recipient="0x" + "56" * 20,
+                description="Replay test", nonce="0x" + nonce_byte * 32, deadline=deadline,
+            )
+            return typed_data, service.sign_eip712(typed_data, keypair["private_key_hex"])["signature"]
+        
+        typed_data, signature = payment("01", int(time.time()) + 3600)
+        for _ in range(2):  # Every hop may verify before settlement
+            checked = service.verify_eip712(typed_data, signature, keypair["public_key_hex"])
+            assert checked["valid"] and checked["replay_status"] == "accepted"
+        assert service.replay_index_stats()["entries"] == 0
+        
+        first = service.settle_eip712(typed_data, signature, keypair["public_key_hex"])
+        assert first["valid"] and first["replay_status"] == "accepted"
+        replay = service.settle_eip712(typed_data, signature, keypair["public_key_hex"])
+        assert not replay["valid"] and replay["signature_valid"] and replay["replay_status"] == "replayed"
+        
+        stale, stale_signature = payment("02", 1700000000)
+        assert service.verify_eip712(stale, stale_signature, keypair["public_key_hex"])["replay_status"] == "expired"
+        
+        typed_data["message"]["amount"] = "2000000"
+        forged = service.verify_eip712(typed_data, signature, keypair["public_key_hex"])
+        assert not forged["signature_valid"] and forged["replay_status"] == "unchecked"
+        typed_data["message"]["amount"] = "1000000"
+        service.close()
+        
+        restarted = DilithiumService(keypair_pool_depth=0, replay_snapshot_path=snapshot)
+        assert restarted.verify_eip712(typed_data, signature, keypair["public_key_hex"])["replay_status"] == "replayed"
+        assert restarted.replay_index_stats()["entries"] == 1
+    
+    def test_eip712_replay_scope_is_canonical(self):
+        """Respelling the public key or nonce does not reopen a consumed nonce."""
+        import time
+        from crypto.dilithium_service import DilithiumService, EIP712TypedData
+        
+        service = DilithiumService(keypair_pool_depth=0)
+        keypair = service.generate_keypair()
+        typed_data = EIP712TypedData.create_payment_request(
+            amount="1000000", currency="0x" + "12" * 20, recipient="0x" + "56" * 20,
+            description="Replay test", nonce="0x" + "ab" * 32, deadline=int(time.time()) + 3600,
+        )
+        signature = service.sign_eip712(typed_data, keypair["private_key_hex"])["signature"]
+        public_key = keypair["public_key_hex"]
+        assert service.settle_eip712(typed_data, signature, public_key)["replay_status"] == "accepted"
+        
+        for spelling in (public_key[:8] + " " + public_key[8:], public_key.upper(), " " + public_key):
+            replay = service.settle_eip712(typed_data, signature, spelling)
+            assert replay["signature_valid"] and not replay["valid"]
+            assert replay["replay_status"] == "replayed"
+        
+        typed_data["message"]["nonce"] = "0X" + "AB" * 32
+        typed_data["message"]["deadline"] = hex(typed_data["message"]["deadline"])
+        replay = service.verify_eip712(typed_data, signature, public_key)
+        assert replay["signature_valid"] and replay["replay_status"] == "replayed"
+    
+    def test_replay_index_expires_buckets(self):
+        """Buckets are dropped once their deadlines pass, along with their Bloom filter counts."""
+        from crypto.replay_index import ReplayIndex
+        
+        now = [1000.0]
+        index = ReplayIndex(bucket_seconds=10, expected_items=1000, clock=lambda: now[0])
+        assert index.claim("payer", "n1", 1005.0) == "accepted"
+        assert index.claim("payer", "n2", 1100.0) == "accepted"
+        assert index.claim("payer", "n1", 1005.0) == "replayed"
+        assert index.claim("other payer", "n1", 1005.0) == "accepted"
+        
+        now[0] = 1020.0
+        assert index.claim("payer", "n1", 1005.0) == "expired"
+        assert not index.seen("payer", "n1") and index.seen("payer", "n2")
+        assert len(index) == 1
+        assert index.key("payer", "n1") not in index._bloom
+        
+        now[0] = 1200.0
+        assert index.stats()["entries"] == 0 and not any(index._bloom._counters)
+    
+    def test_replay_index_expiry_scales_with_expired_entries(self):
+        """Expiring a bucket only touches its own digests; other buckets stay in the filter."""
+        from crypto.replay_index import ReplayIndex
+        
+        now = [0.0]
+        index = ReplayIndex(bucket_seconds=10, expected_items=50_000, clock=lambda: now[0])
+        for i in range(20_000):
+            assert index.claim("payer", f"n{i}", 5.0 if i % 2 else 25.0) == "accepted"
+        
+        now[0] = 15.0
+        assert index.stats()["entries"] == 10_000
+        assert index._bloom.items == 10_000
+        assert all(index.key("payer", f"n{i}") in index._bloom for i in range(0, 20_000, 2))
+        assert index.claim("payer", "n0", 25.0) == "replayed"
+        assert index.claim("payer", "n1", 25.0) == "accepted"
+    
+    def test_key_cache_reuses_and_evicts(self):
+        """Hot keys are parsed once; the LRU stays within max_entries."""
+        from crypto.dilithium_service import DilithiumService
+        from crypto.key_cache import KeyCache
+        
+        service = DilithiumService(key_cache_size=2, verification_cache_size=0)
+        keypair = service.generate_keypair()
+        first = service.sign("hot path", keypair["private_key_hex"])
+        second = service.sign("hot path", keypair["private_key_hex"])
+        assert first["signature_hex"] == second["signature_hex"]
+        assert service.verify("hot path", first["signature_hex"], keypair["public_key_hex"])
+        assert service.verify("hot path", first["signature_hex"], keypair["public_key_hex"])
+        stats = service.key_cache_stats()
+        assert stats["hits"] == 2 and stats["misses"] == 2
+        
+        cache = KeyCache(max_entries=1)
+        parsed = object()
+        assert cache.get("raw", b"a", lambda _: parsed) is parsed
+        assert cache.get("raw", b"a", lambda _: object()) is parsed
+        cache.get("raw", b"b", lambda _: object())
+        assert cache.get("raw", b"a", lambda _: None) is None
+        assert cache.stats()["evictions"] == 2 and cache.stats()["size"] == 1
+    
+    def test_sign_and_verify_many(self):
+        """Batches keep input order across interleaved keys and isolate bad items."""
+        from crypto.dilithium_service import DilithiumService
+        
+        service = DilithiumService(batch_workers=4)
+        keys = [service.generate_keypair() for _ in range(3)]
+        items = [
+            {"message": f"payment {i}", "private_key_hex": keys[i % 3]["private_key_hex"]}
+            for i in range(200)
+        ]
+        items.append({"message": "bad key", "private_key_hex": "zz"})
+        
+        signed = service.sign_many(items)
+        assert "error" in signed[-1]
+        for item, result in zip(items[:5], signed[:5]):
+            assert result == service.sign(item["message"], item["private_key_hex"])
+        
+        checks = [
+            {"message": item["message"], "signature_hex": result["signature_hex"],
+             "public_key_hex": keys[i % 3]["public_key_hex"]}
+            for i, (item, result) in enumerate(zip(items[:-1], signed[:-1]))
+        ]
+        checks[7]["message"] = "tampered"
+        valid = service.verify_many(checks)
+        assert valid[:7] == [True] * 7 and valid[7] is False and all(valid[8:])
+        service.close()
+    
+    def test_key_store_signs_by_id_and_persists(self, tmp_path):
+        """Registered keys sign by id and reload from the encrypted file."""
+        from crypto.dilithium_service import DilithiumService
+        
+        path = str(tmp_path / "keys.json")
+        service = DilithiumService(key_store_path=path, key_store_passphrase="hunter2")
+        keypair = service.generate_keypair()
+        imported = service.import_key(keypair["private_key_hex"])
+        assert imported["public_key_hex"] == keypair["public_key_hex"]
+        
+        by_id = service.sign("pay 1", key_id=imported["key_id"])
+        assert by_id == service.sign("pay 1", keypair["private_key_hex"])
+        generated = service.generate_key()
+        assert "private_key_hex" not in generated
+        assert keypair["private_key_hex"] not in open(path).read()
+        
+        restarted = DilithiumService(key_store_path=path, key_store_passphrase="hunter2")
+        assert restarted.sign("pay 1", key_id=imported["key_id"]) == by_id
+        signed = restarted.sign("pay 2", key_id=generated["key_id"])
+        assert restarted.verify("pay 2", signed["signature_hex"], generated["public_key_hex"])
+        
+        assert restarted.delete_key(generated["key_id"])
+        with pytest.raises(ValueError):
+            restarted.sign("pay 3", key_id=generated["key_id"])
+        with pytest.raises(ValueError):
+            DilithiumService(key_store_path=path, key_store_passphrase="wrong")
+    
+    def test_key_listing_does_not_expose_ids(self):
+        """Listing keys gives fingerprints that cannot sign or delete."""
+        from crypto.dilithium_service import DilithiumService
+        
+        service = DilithiumService(keypair_pool_depth=0)
+        key_id = service.generate_key()["key_id"]
+        listing = service.list_keys()
+        
+        assert len(listing) == 1
+        assert key_id not in repr(listing)
+        fingerprint = listing[0]["fingerprint"]
+        with pytest.raises(ValueError):
+            service.sign("pay 1", key_id=fingerprint)
+        assert not service.delete_key(fingerprint)
+        assert service.sign("pay 1", key_id=key_id)["signature_hex"]
+    
+    def test_keypair_pool_serves_ready_pairs(self):
+        """Pooled key pairs are unique and generation falls back when empty."""
+        from crypto.dilithium_service import DilithiumService
+        
+        service = DilithiumService(keypair_pool_depth=4, background_refill=False)
+        assert service.keypair_pool.fill() == 4
+        keypairs = [service.generate_keypair() for _ in range(6)]
+        assert len({k["private_key_hex"] for k in keypairs}) == 6
+        
+        stats = service.keypair_pool_stats()
+        assert stats["served_from_pool"] == 4
+        assert stats["generated_on_request"] == 2
+        assert stats["level"] == 0
+        
+        signature = service.sign("pooled", keypairs[0]["private_key_hex"])
+        assert service.verify("pooled", signature["signature_hex"], keypairs[0]["public_key_hex"])
+    
+    def test_merkle_batch_sign_and_verify(self):
+        """Every message verifies against one root signature; tampering fails."""
+        from crypto.dilithium_service import DilithiumService
+        
+        service = DilithiumService(keypair_pool_depth=0)
+        keypair = service.generate_keypair()
+        messages = [f"payment {i}" for i in range(13)]  # Odd sizes exercise carried nodes
+        
+        batch = service.sign_merkle_batch(messages, keypair["private_key_hex"])
+        assert batch["count"] == 13
+        
+        def check(message, proof, root=batch["root_hex"], signature=batch["root_signature_hex"]):
+            return service.verify_merkle(message, proof, root, signature, keypair["public_key_hex"])
+        
+        for message, entry in zip(messages, batch["proofs"]):
+            assert check(message, entry["proof"])
+        stats = service.verification_cache_stats()
+        assert stats["misses"] == 1 and stats["hits"] == 12
+        
+        assert not check("payment 99", batch["proofs"][0]["proof"])
+        assert not check(messages[1], batch["proofs"][0]["proof"])
+        other = service.sign_merkle_batch(messages[:2], keypair["private_key_hex"])
+        assert not check(messages[0], batch["proofs"][0]["proof"], signature=other["root_signature_hex"])
+        # A root signature is not a signature of the root as a plain message
+        assert not service.verify(batch["root_hex"], batch["root_signature_hex"], keypair["public_key_hex"])
+    
+    def test_verification_cache_keeps_only_positive_results(self):
+        """Valid triples are served from the cache until the TTL; failures are never cached."""
+        from crypto.dilithium_service import DilithiumService
+        from crypto.verification_cache import VerificationCache
+        
+        now = [0.0]
+        service = DilithiumService(keypair_pool_depth=0)
+        service.verification_cache = VerificationCache(max_entries=8, ttl_seconds=60, clock=lambda: now[0])
+        keypair = service.generate_keypair()
+        signature = service.sign("settle", keypair["private_key_hex"])["signature_hex"]
+        
+        for _ in range(3):
+            assert service.verify("settle", signature, keypair["public_key_hex"])
+            assert not service.verify("settle!", signature, keypair["public_key_hex"])
+        stats = service.verification_cache_stats()
+        assert stats["hits"] == 2 and stats["misses"] == 4 and stats["size"] == 1
+        
+        checks = [{"message": "settle", "signature_hex": signature, "public_key_hex": keypair["public_key_hex"]}]
+        assert service.verify_many(checks) == [True]
+        assert service.verification_cache_stats()["hits"] == 3
+        
+        now[0] = 61.0
+        assert service.verify("settle", signature, keypair["public_key_hex"])
+        assert service.verification_cache_stats()["expirations"] == 1
 
 
 if __name__ == "__main__":
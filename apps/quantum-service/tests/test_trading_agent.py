@@ -0,0 +1,250 @@
+"""
+Tests for the RL trading environments and agent
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+from rl.market_data import (
+    PARQUET_AVAILABLE,
+    HistoricalReplayEnvironment,
+    MarketDataPanel,
+    VectorizedReplayEnvironment,
+    parquet_to_panel,
+    prices_to_returns,
+    write_panel,
+)
+from rl.trading_agent import (
+    TORCH_AVAILABLE,
+    ReturnGenerator,
+    TradingAgent,
+    TradingEnvironment,
+    VectorizedTradingEnvironment,
+)
+
+
+class TestReturnGenerator:
+    """Tests for episode-level return paths."""
+    
+    def test_seeded_paths_are_reproducible(self):
+        """Test that equal seeds give equal paths and environments."""
+        a, b = ReturnGenerator(seed=7), ReturnGenerator(seed=7)
+        np.testing.assert_array_equal(a.sample(), b.sample())
+        
+        env_a, env_b = TradingEnvironment(seed=7), TradingEnvironment(seed=7)
+        action = np.array([0.4, 0.3, 0.2, 0.1])
+        for _ in range(10):
+            state_a, reward_a, _, _ = env_a.step(action)
+            state_b, reward_b, _, _ = env_b.step(action)
+        np.testing.assert_array_equal(state_a, state_b)
+        assert reward_a == reward_b
+    
+    def test_correlated_paths(self):
+        """Test that sampled paths follow the requested correlation and moments."""
+        correlation = np.array([[1.0, 0.7], [0.7, 1.0]])
+        generator = ReturnGenerator(
+            n_assets=2, mu=[0.001, 0.0], sigma=[0.01, 0.02], correlation=correlation, seed=0,
+        )
+        returns = generator.sample(400).reshape(-1, 2)
+        
+        assert returns.shape == (400 * 252, 2)
+        assert abs(np.corrcoef(returns.T)[0, 1] - 0.7) < 0.02
+        np.testing.assert_allclose(returns.std(axis=0), [0.01, 0.02], rtol=0.02)
+        assert abs(returns[:, 0].mean() - 0.001) < 1e-4
+    
+    def test_rejects_invalid_correlation(self):
+        """Test that a non positive definite correlation matrix is rejected."""
+        with pytest.raises(ValueError):
+            ReturnGenerator(n_assets=2, correlation=np.array([[1.0, 2.0], [2.0, 1.0]]))
+    
+    def test_state_shows_returns_paid_on(self):
+        """Test that the observed returns are the ones the last reward used."""
+        env = TradingEnvironment(seed=0)
+        assert np.all(env.reset()[4:8] == 0)
+        state, _, _, info = env.step(np.array([1.0, 0, 0, 0]))
+        np.testing.assert_allclose(state[4:8], env._returns[0], rtol=1e-6)
+        # Paid on the equal weights held over the day, minus the rebalancing cost
+        expected = 10000 * (1 + env._returns[0].mean()) - info["costs"]
+        np.testing.assert_allclose(info["portfolio_value"], expected)
+
+
+class TestVectorizedTradingEnvironment:
+    """Tests for batched environment stepping."""
+    
+    def test_steps_all_envs_and_auto_resets(self):
+        """Test that one step advances every environment and finished ones restart."""
+        env = VectorizedTradingEnvironment(n_envs=6, n_assets=4, max_steps=3, seed=0)
+        states = env.reset()
+        assert states.shape == (6, env.state_dim)
+        
+        actions = np.random.default_rng(1).random((6, 4))
+        for day in range(1, 3):
+            states, rewards, dones, info = env.step(actions)
+            assert rewards.shape == (6,) and not dones.any()
+            assert np.all(env.day == day)
+        np.testing.assert_allclose(env.weights.sum(axis=1), 1.0)
+        
+        states, rewards, dones, info = env.step(actions)
+        assert dones.all()
+        assert np.all(env.day == 0)
+        np.testing.assert_allclose(states[:, 3 * 4], 1.0)
+        assert not np.allclose(info["portfolio_value"], env.initial_capital)
+    
+    def test_zero_action_falls_back_to_equal_weights(self):
+        """Test that an all-zero action is normalized to equal weights per env."""
+        env = VectorizedTradingEnvironment(n_envs=2, n_assets=4, seed=0)
+        actions = np.array([[0, 0, 0, 0], [1, 0, 0, 0]], dtype=float)
+        env.step(actions)
+        np.testing.assert_allclose(env.weights, [[0.25] * 4, [1, 0, 0, 0]])
+
+
+class TestHistoricalReplay:
+    """Tests for memory-mapped market data replay."""
+    
+    @pytest.fixture
+    def panel(self, tmp_path):
+        returns = np.random.default_rng(0).normal(0, 0.01, (1000, 50))
+        return write_panel(returns, str(tmp_path / "returns.npy"))
+    
+    def test_windows_are_views_of_the_mapping(self, panel):
+        """Test that episodes replay panel windows without copying them."""
+        env = HistoricalReplayEnvironment(panel, n_assets=5, window=100, seed=0)
+        assert isinstance(panel.data, np.memmap)
+        assert np.shares_memory(env._returns, panel.data)
+        
+        start, first = env.episode_start, env.episode_first_asset
+        np.testing.assert_array_equal(env._returns, panel.data[start:start + 100, first:first + 5])
+        
+        state, _, _, _ = env.step(np.ones(5))
+        np.testing.assert_allclose(state[5:10], panel.data[start, first:first + 5])
+        
+        for _ in range(99):
+            _, _, done, _ = env.step(np.ones(5))
+        assert done
+    
+    def test_vectorized_replay_gathers_per_env_windows(self, panel):
+        """Test that every environment replays its own window of the mapped panel."""
+        env = VectorizedReplayEnvironment(panel, n_envs=6, n_assets=5, max_steps=100, seed=0)
+        starts, firsts = env.episode_start.copy(), env.episode_first_asset.copy()
+        assert len(set(starts)) > 1
+        
+        for day in range(3):
+            states, _, _, _ = env.step(np.ones((6, 5)))
+        for i in range(6):
+            expected = panel.data[starts[i] + 2, firsts[i]:firsts[i] + 5]
+            np.testing.assert_allclose(states[i, 5:10], expected)
+        
+        for _ in range(97):
+            _, _, dones, _ = env.step(np.ones((6, 5)))
+        assert dones.all()
+        assert not np.array_equal(env.episode_start, starts)
+    
+    def test_pickles_by_reference(self, panel):
+        """Test that workers receive the file path and episode offsets, not the data."""
+        env = HistoricalReplayEnvironment(panel, window=500, seed=1)
+        env.step(np.ones(50))
+        payload = pickle.dumps(env)
+        assert len(payload) < panel.data[:500].nbytes
+        
+        clone = pickle.loads(payload)
+        assert isinstance(clone.panel.data, np.memmap)
+        np.testing.assert_array_equal(clone._returns, env._returns)
+        assert clone.day == 1
+    
+    def test_rejects_oversized_episode(self, panel):
+        """Test that an episode larger than the panel is rejected."""
+        with pytest.raises(ValueError):
+            HistoricalReplayEnvironment(panel, window=2000)
+        with pytest.raises(ValueError):
+            HistoricalReplayEnvironment(panel, n_assets=51)
+    
+    def test_prices_to_returns_streams_chunks(self, tmp_path):
+        """Test chunked price conversion across chunk boundaries and gaps."""
+        prices = 100 * np.cumprod(1 + np.random.default_rng(2).normal(0, 0.01, (300, 3)), axis=0)
+        prices[40, 1] = np.nan
+        np.save(tmp_path / "prices.npy", prices)
+        
+        panel = prices_to_returns(str(tmp_path / "prices.npy"), str(tmp_path / "returns.npy"), chunk_rows=64)
+        expected = np.nan_to_num(prices[1:] / prices[:-1] - 1)
+        assert panel.data.shape == (299, 3)
+        np.testing.assert_allclose(panel.data, expected, atol=1e-6)
+    
+    @pytest.mark.skipif(not PARQUET_AVAILABLE, reason="pyarrow not installed")
+    def test_parquet_prices_to_panel(self, tmp_path):
+        """Test streaming a wide Parquet price table into a return panel."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        prices = 100 * np.cumprod(1 + np.random.default_rng(3).normal(0, 0.01, (300, 3)), axis=0)
+        table = pa.table({f"asset{i}": prices[:, i] for i in range(3)})
+        pq.write_table(table, tmp_path / "prices.parquet", row_group_size=50)
+        
+        panel = parquet_to_panel(
+            str(tmp_path / "prices.parquet"), str(tmp_path / "returns.npy"), prices=True, chunk_rows=64,
+        )
+        np.testing.assert_allclose(panel.data, prices[1:] / prices[:-1] - 1, atol=1e-6)
+
+
+@pytest.mark.skipif(not TORCH_AVAILABLE, reason="torch not installed")
+class TestTradingAgent:
+    """Tests for PPO training on vectorized rollouts."""
+    
+    def test_rollout_shapes(self):
+        """Test that a rollout evaluates the policy on the whole batch every step."""
+        agent = TradingAgent(n_assets=4)
+        env = VectorizedTradingEnvironment(n_envs=3, n_assets=4, seed=0)
+        states, actions, rewards, log_probs, values, dones = agent._collect_rollout(env, n_steps=10)
+        
+        assert states.shape == (10, 3, env.state_dim)
+        assert actions.shape == (10, 3, 4)
+        assert rewards.shape == log_probs.shape == dones.shape == (10, 3)
+        assert values.shape == (11, 3)
+        assert not log_probs.requires_grad
+    
+    def test_train_with_n_envs(self):
+        """Test a short training run on parallel environments."""
+        agent = TradingAgent(n_assets=4)
+        history = agent.train(n_episodes=2, n_envs=4)
+        assert len(history["rewards"]) == 2
+        assert all(np.isfinite(history["rewards"]))
+    
+    def test_train_on_panel(self, tmp_path):
+        """Test a training iteration replaying a historical panel, in process and in a worker."""
+        returns = np.random.default_rng(4).normal(0, 0.01, (300, 6))
+        panel = write_panel(returns, str(tmp_path / "returns.npy"))
+        panel_values = np.unique(panel.data)
+        
+        agent = TradingAgent(n_assets=4)
+        history = agent.train(n_episodes=1, n_envs=3, panel=panel)
+        assert len(history["rewards"]) == 1 and np.isfinite(history["rewards"][0])
+        
+        from rl.rollout_workers import RolloutWorkerPool
+        pool = RolloutWorkerPool(agent.policy, n_workers=1, n_envs=3, n_steps=5, seed=0, panel=panel.path)
+        try:
+            observed = pool.collect()["states"][1:, :, 4:8].numpy()
+        finally:
+            pool.close()
+        assert np.isin(observed, panel_values).all()
+    
+    def test_rollout_workers_use_broadcast_weights(self):
+        """Test that worker processes act with the weights broadcast after an update."""
+        import torch
+        from rl.rollout_workers import RolloutWorkerPool
+        
+        agent = TradingAgent(n_assets=4)
+        pool = RolloutWorkerPool(agent.policy, n_workers=2, n_envs=3, n_steps=5, seed=0)
+        try:
+            with torch.no_grad():
+                for parameter in agent.policy.parameters():
+                    parameter.add_(0.1)
+            pool.broadcast(agent.policy)
+            rollout = pool.collect()
+            
+            assert rollout["states"].shape == (5, 6, 15)
+            with torch.no_grad():
+                _, _, values = agent.policy(rollout["states"].reshape(-1, 15))
+            torch.testing.assert_close(rollout["values"][:-1].reshape(-1), values.squeeze(-1), rtol=1e-4, atol=1e-5)
+            assert pool.stats()["env_steps"] == 30
+        finally:
+            pool.close()
@@ -0,0 +1,98 @@
+"""
+Tests for the bounded worker pools and rate limiter
+"""
+
+import asyncio
+import threading
+
+import pytest
+from workers import PoolSaturated, PoolUnavailable, RateLimiter, WorkerPool
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A one-slot thread pool with room for one waiting call."""
+    monkeypatch.delenv("TEST_WORKERS", raising=False)
+    pool = WorkerPool.from_env("test", kind="thread", workers=1, max_queue=1)
+    yield pool
+    pool.shutdown()
+
+
+class TestWorkerPool:
+    """Tests for WorkerPool backpressure."""
+    
+    def test_rejects_when_queue_full(self, pool):
+        """Test that calls beyond concurrency + queue are rejected immediately."""
+        release = threading.Event()
+        
+        async def scenario():
+            running = asyncio.ensure_future(pool.run(release.wait, 5))
+            waiting = asyncio.ensure_future(pool.run(lambda: "queued"))
+            await asyncio.sleep(0.05)
+            
+            with pytest.raises(PoolSaturated):
+                await pool.run(lambda: "rejected")
+            
+            release.set()
+            return await running, await waiting
+        
+        assert asyncio.run(scenario()) == (True, "queued")
+        stats = pool.stats()
+        assert stats["completed"] == 2
+        assert stats["rejected"] == 1
+    
+    def test_env_overrides_defaults(self, monkeypatch):
+        """Test that {NAME}_* environment variables configure the pool."""
+        monkeypatch.setenv("SIGNING_WORKERS", "3")
+        monkeypatch.setenv("SIGNING_MAX_QUEUE", "7")
+        pool = WorkerPool.from_env("signing", kind="thread")
+        
+        assert pool.max_workers == 3
+        assert pool.max_concurrency == 3
+        assert pool.max_queue == 7
+        pool.shutdown()
+    
+    def test_shut_down_pool_is_unavailable(self, pool):
+        """Test that a shut down pool refuses calls."""
+        pool.shutdown()
+        
+        with pytest.raises(PoolUnavailable):
+            asyncio.run(pool.run(lambda: None))
+
+
+class TestRateLimiter:
+    """Tests for per-client token buckets."""
+    
+    def test_paces_clients_independently(self):
+        """Test that spending beyond the burst yields a delay at the refill rate."""
+        now = [0.0]
+        limiter = RateLimiter(rate=100.0, burst=200.0, clock=lambda: now[0])
+        
+        assert limiter.reserve("a", 150) == 0.0
+        assert limiter.reserve("a", 100) == pytest.approx(0.5)
+        assert limiter.delay("b") == 0.0
+        
+        now[0] = 0.5
+        assert limiter.delay("a") == 0.0
+        assert limiter.stats()["throttled"] == 1
+
+
+class TestOptimizerWorker:
+    """Tests for the optimizer worker entry points."""
+    
+    def test_worker_optimizer_uses_passed_cache_settings(self, monkeypatch):
+        """Test that process workers build an uncached optimizer with the given TTL."""
+        import workers
+        
+        monkeypatch.setattr(workers, "_optimizer", None)
+        workers.init_optimizer_worker(None, 0, 42.0)
+        
+        assert workers._optimizer.cache.max_entries == 0
+        assert workers._optimizer.cache.ttl_seconds == 42.0
+        result = workers.call_optimizer("optimize", {
+            "assets": ["A", "B"],
+            "expected_returns": [0.1, 0.2],
+            "covariance_matrix": [[0.04, 0.01], [0.01, 0.09]],
+        })
+        assert abs(sum(result["allocations"].values()) - 1.0) < 1e-6
+        assert workers._optimizer.cache_stats(include_entries=False)["size"] == 0
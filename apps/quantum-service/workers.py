@@ -0,0 +1,326 @@
+"""
+Bounded Worker Pools
+
+The FastAPI handlers are async, but portfolio optimization, QRNG simulation
+and signing are synchronous CPU-bound calls. Running them inline blocks the
+event loop, so one slow optimization stalls health checks and signing for
+every client.
+
+Each endpoint class gets its own WorkerPool: an executor (process pool for
+NumPy/Qiskit work, thread pool for crypto primitives that release the GIL),
+a concurrency limit and a bounded wait queue. When the queue is full the
+pool rejects the call immediately instead of letting latency grow without
+bound; the API turns that into 429/503 backpressure.
+
+Pools are configured from the environment, e.g. for the "OPTIMIZER" pool:
+    OPTIMIZER_EXECUTOR          "process" or "thread"
+    OPTIMIZER_WORKERS           executor size
+    OPTIMIZER_MAX_CONCURRENCY   calls running at once
+    OPTIMIZER_MAX_QUEUE         calls allowed to wait for a slot
+
+Long-running streams are paced per client with a RateLimiter (token bucket),
+configured the same way: {NAME}_RATE units per second and {NAME}_BURST.
+"""
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPoolError(Exception):
+    """Base class for calls a worker pool refused to run."""
+
+
+class PoolSaturated(WorkerPoolError):
+    """All slots are busy and the wait queue is full (retry later)."""
+
+
+class PoolUnavailable(WorkerPoolError):
+    """The pool is shut down or its executor is broken."""
+
+
+class WorkerPool:
+    """
+    Executor with a concurrency limit and a bounded wait queue.
+
+    Attributes:
+        name: Endpoint class served by the pool
+        kind: "process" or "thread"
+        max_concurrency: Calls allowed to run at once
+        max_queue: Calls allowed to wait for a free slot
+    """
+
+    def __init__(
+        self,
+        name: str,
+        executor: Executor,
+        kind: str,
+        max_workers: int,
+        max_concurrency: int,
+        max_queue: int,
+    ):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._executor = executor
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._closed = False
+
+        self.running = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(
+        cls,
+        name: str,
+        kind: str = "thread",
+        workers: int = 4,
+        max_concurrency: Optional[int] = None,
+        max_queue: int = 64,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+    ) -> "WorkerPool":
+        """
+        Build a pool from {NAME}_* environment variables, falling back to the given defaults.
+
+        Args:
+            name: Pool name, also the environment variable prefix
+            kind: Default executor kind, "process" or "thread"
+            workers: Default executor size
+            max_concurrency: Default concurrency limit (defaults to workers)
+            max_queue: Default wait-queue length
+            initializer: Called once in every process worker (process pools only)
+            initargs: Arguments for initializer
+        """
+        prefix = name.upper()
+        kind = os.environ.get(f"{prefix}_EXECUTOR", kind)
+        workers = _env_int(f"{prefix}_WORKERS", workers)
+        max_concurrency = _env_int(f"{prefix}_MAX_CONCURRENCY", max_concurrency or workers)
+        max_queue = _env_int(f"{prefix}_MAX_QUEUE", max_queue)
+
+        if kind == "process":
+            # spawn: forking a process that already runs background threads is unsafe
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs,
+            )
+        elif kind == "thread":
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-worker")
+        else:
+            raise ValueError(f"Unknown executor kind '{kind}' for pool {name}")
+
+        logger.info(
+            f"Worker pool {name}: {kind} x{workers}, "
+            f"concurrency={max_concurrency}, queue={max_queue}")
+        return cls(name, executor, kind, workers, max_concurrency, max_queue)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on the pool's executor.
+
+        Raises:
+            PoolSaturated: If max_concurrency calls are running and max_queue are waiting
+            PoolUnavailable: If the pool is shut down or its executor broke
+        """
+        if self._closed:
+            raise PoolUnavailable(f"{self.name} pool is shut down")
+        if self.running + self.queued >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise PoolSaturated(f"{self.name} pool is saturated, retry later")
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        except BrokenProcessPool as e:
+            self.failed += 1
+            raise PoolUnavailable(f"{self.name} pool is unavailable: {e}") from e
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+        self.completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool configuration and live counters."""
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting calls and shut the executor down."""
+        self._closed = True
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class RateLimiter:
+    """
+    Per-client token buckets.
+
+    Every client starts with burst tokens that refill at rate per second.
+    reserve() always succeeds but may leave the bucket in debt; the returned
+    delay is how long the caller should wait before using what it reserved,
+    which paces a stream to the configured rate.
+
+    Attributes:
+        rate: Tokens added per second
+        burst: Bucket capacity
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_clients: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: Dict[str, list] = {}  # client -> [tokens, last refill time]
+        self._lock = threading.Lock()
+
+        self.reserved = 0.0
+        self.throttled = 0
+
+    @classmethod
+    def from_env(cls, name: str, rate: float, burst: float) -> "RateLimiter":
+        """Build a limiter from {NAME}_RATE and {NAME}_BURST, falling back to the given defaults."""
+        prefix = name.upper()
+        return cls(
+            rate=float(os.environ.get(f"{prefix}_RATE") or rate),
+            burst=float(os.environ.get(f"{prefix}_BURST") or burst),
+        )
+
+    def _refill(self, client: str, now: float) -> list:
+        """Bucket for client, topped up to now (caller holds the lock)."""
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            if len(self._buckets) >= self.max_clients:
+                self._prune(now)
+            bucket = self._buckets[client] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def _prune(self, now: float):
+        """Forget clients whose bucket has refilled completely."""
+        full = [c for c, (tokens, last) in self._buckets.items()
+                if tokens + (now - last) * self.rate >= self.burst]
+        for client in full:
+            del self._buckets[client]
+
+    def delay(self, client: str) -> float:
+        """Seconds until the client's bucket is out of debt."""
+        with self._lock:
+            tokens = self._refill(client, self._clock())[0]
+        return max(0.0, -tokens / self.rate)
+
+    def reserve(self, client: str, amount: float) -> float:
+        """
+        Take amount tokens from the client's bucket.
+
+        Returns:
+            Seconds to wait before consuming them (0 if within budget)
+        """
+        with self._lock:
+            bucket = self._refill(client, self._clock())
+            bucket[0] -= amount
+            self.reserved += amount
+            wait = max(0.0, -bucket[0] / self.rate)
+            if wait > 0:
+                self.throttled += 1
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """Configuration and counters."""
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "clients": len(self._buckets),
+                "reserved": self.reserved,
+                "throttled": self.throttled,
+            }
+
+
+def _env_int(name: str, default: int) -> int:
+    """Integer environment variable with a default."""
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+# === Worker-side entry points ===
+#
+# Process pools pickle the function by reference, so these must live in a
+# light module that a spawned worker can import without starting the API.
+
+_optimizer = None
+
+
+def init_optimizer_worker(optimizer: Any = None, cache_size: int = 0, cache_ttl: float = 300.0):
+    """
+    Set up the PortfolioOptimizer used by call_optimizer in this process.
+
+    Process workers build their own instance; thread pools share the API's.
+    The result cache lives in the API process (which checks it before
+    dispatching), so worker instances default to cache_size=0.
+
+    Args:
+        optimizer: Instance to use (thread pools)
+        cache_size: Result cache entries of a worker-built instance
+        cache_ttl: Result cache TTL of a worker-built instance
+    """
+    global _optimizer
+    if optimizer is None:
+        from quantum.portfolio_optimizer import PortfolioOptimizer
+        optimizer = PortfolioOptimizer(cache_size=cache_size, cache_ttl=cache_ttl)
+    _optimizer = optimizer
+
+
+def call_optimizer(method: str, params: Dict[str, Any]) -> Any:
+    """Call a PortfolioOptimizer method in the worker (list() for generators)."""
+    if _optimizer is None:
+        init_optimizer_worker()
+    if method == "optimize_many":
+        return list(_optimizer.optimize_many(**params))
+    return getattr(_optimizer, method)(**params)